@@ -1,3 +1,7 @@
+DROP TABLE IF EXISTS HealthMetricWeekly CASCADE;
+DROP TABLE IF EXISTS HealthMetricDaily CASCADE;
+DROP TABLE IF EXISTS MemberDashboard CASCADE;
+DROP TABLE IF EXISTS ClassWaitlist CASCADE;
 DROP TABLE IF EXISTS ClassRegistration CASCADE;
 DROP TABLE IF EXISTS PersonalTrainingSession CASCADE;
 DROP TABLE IF EXISTS TrainerAvailability CASCADE;
@@ -8,14 +12,22 @@ DROP TABLE IF EXISTS Member CASCADE;
 DROP TABLE IF EXISTS Trainer CASCADE;
 DROP TABLE IF EXISTS Admin CASCADE;
 
+-- Lets GiST exclusion constraints combine equality on ids with range overlap
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+-- Trigram matching for fuzzy member name search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
+
+-- password holds a pbkdf2_sha256 hash (see app/auth.py). The plaintext
+-- defaults only serve the seed data and are hashed on first login or by
+-- `python app/auth.py migrate-passwords`.
 CREATE TABLE Admin (
     admin_id      SERIAL PRIMARY KEY,
     first_name    VARCHAR(50) NOT NULL,
     last_name     VARCHAR(50) NOT NULL,
     email         VARCHAR(100) UNIQUE NOT NULL,
     phone         VARCHAR(20),
-    password      VARCHAR(100) NOT NULL DEFAULT 'admin123'
+    password      VARCHAR(255) NOT NULL DEFAULT 'admin123'
 );
 
 
@@ -29,7 +41,7 @@ CREATE TABLE Member (
     phone         VARCHAR(20),
     fitness_goal  TEXT,
     created_at    TIMESTAMP DEFAULT NOW(),
-    password      VARCHAR(100) NOT NULL DEFAULT 'member123'
+    password      VARCHAR(255) NOT NULL DEFAULT 'member123'
 );
 
 
@@ -40,30 +52,69 @@ CREATE TABLE Trainer (
     email         VARCHAR(100) UNIQUE NOT NULL,
     specialty     VARCHAR(100),
     hourly_rate   NUMERIC(8,2),
-    password      VARCHAR(100) NOT NULL DEFAULT 'trainer123'
+    password      VARCHAR(255) NOT NULL DEFAULT 'trainer123'
 );
 
 
+-- Range-partitioned by month on recorded_at; the primary key has to
+-- include the partition key. Rows outside every monthly partition land in
+-- HealthMetric_default until create_health_metric_partitions() covers them.
 CREATE TABLE HealthMetric (
-    metric_id          SERIAL PRIMARY KEY,
+    metric_id          SERIAL,
     member_id          INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
     recorded_at        TIMESTAMP NOT NULL DEFAULT NOW(),
     weight_kg          NUMERIC(5,2),
     body_fat_pct       NUMERIC(5,2),
     resting_heart_rate INT,
     systolic_bp        INT,
-    diastolic_bp       INT
-);
+    diastolic_bp       INT,
+    PRIMARY KEY (metric_id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+CREATE TABLE HealthMetric_default PARTITION OF HealthMetric DEFAULT;
+
+-- B-tree for per-member "latest"/range lookups, BRIN for time-range scans
+CREATE INDEX idx_healthmetric_member_recorded ON HealthMetric (member_id, recorded_at DESC);
+CREATE INDEX idx_healthmetric_recorded_brin ON HealthMetric USING BRIN (recorded_at);
+
+
+-- Creates the monthly HealthMetric partitions for p_from through p_to,
+-- moving any rows already sitting in the default partition into them.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION create_health_metric_partitions(p_from DATE, p_to DATE)
+RETURNS INT AS $$
+DECLARE
+    v_month   DATE := date_trunc('month', p_from)::date;
+    v_next    DATE;
+    v_name    TEXT;
+    v_created INT := 0;
+BEGIN
+    WHILE v_month <= p_to LOOP
+        v_next := (v_month + INTERVAL '1 month')::date;
+        v_name := 'healthmetric_' || to_char(v_month, 'YYYY_MM');
+        IF to_regclass(v_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE HealthMetric INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM HealthMetric_default WHERE recorded_at >= %L AND recorded_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved', v_month, v_next, v_name);
+            EXECUTE format('ALTER TABLE HealthMetric ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', v_name, v_month, v_next);
+            v_created := v_created + 1;
+        END IF;
+        v_month := v_next;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
 
+SELECT create_health_metric_partitions('2025-01-01', (NOW() + INTERVAL '12 months')::date);
 
+
+-- A trainer's open (unbooked) time as one coalesced range set: adding a
+-- window merges it with adjacent or overlapping ones, and booking a PT
+-- session subtracts just the session's interval.
 CREATE TABLE TrainerAvailability (
-    availability_id SERIAL PRIMARY KEY,
-    trainer_id      INT NOT NULL REFERENCES Trainer(trainer_id) ON DELETE CASCADE,
-    admin_id        INT REFERENCES Admin(admin_id),
-    start_time      TIMESTAMP NOT NULL,
-    end_time        TIMESTAMP NOT NULL,
-    is_booked       BOOLEAN NOT NULL DEFAULT FALSE,
-    CHECK (end_time > start_time)
+    trainer_id   INT PRIMARY KEY REFERENCES Trainer(trainer_id) ON DELETE CASCADE,
+    open_slots   TSMULTIRANGE NOT NULL DEFAULT '{}'
 );
 
 CREATE TABLE PersonalTrainingSession (
@@ -73,7 +124,9 @@ CREATE TABLE PersonalTrainingSession (
     start_time   TIMESTAMP NOT NULL,
     end_time     TIMESTAMP NOT NULL,
     status       VARCHAR(20) NOT NULL DEFAULT 'scheduled',
-    CHECK (end_time > start_time)
+    slot         TSRANGE GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED,
+    CHECK (end_time > start_time),
+    CONSTRAINT pt_session_trainer_no_overlap EXCLUDE USING gist (trainer_id WITH =, slot WITH &&)
 );
 
 CREATE TABLE Room (
@@ -94,7 +147,11 @@ CREATE TABLE Class (
     start_time   TIMESTAMP NOT NULL,
     end_time     TIMESTAMP NOT NULL,
     capacity     INT NOT NULL CHECK (capacity > 0),
-    CHECK (end_time > start_time)
+    registered_count INT NOT NULL DEFAULT 0 CHECK (registered_count >= 0),
+    slot         TSRANGE GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED,
+    CHECK (end_time > start_time),
+    CONSTRAINT class_trainer_no_overlap EXCLUDE USING gist (trainer_id WITH =, slot WITH &&),
+    CONSTRAINT class_room_no_overlap EXCLUDE USING gist (room_id WITH =, slot WITH &&)
 );
 
 
@@ -106,43 +163,265 @@ CREATE TABLE ClassRegistration (
 );
 
 
+-- Members queued for a full class, promoted in waitlist_id order when a
+-- registration is cancelled
+CREATE TABLE ClassWaitlist (
+    waitlist_id  SERIAL PRIMARY KEY,
+    class_id     INT NOT NULL REFERENCES Class(class_id) ON DELETE CASCADE,
+    member_id    INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    joined_at    TIMESTAMP NOT NULL DEFAULT NOW(),
+    UNIQUE (class_id, member_id)
+);
+
+
+-- One row per member, kept current by the statement-level triggers below,
+-- so the dashboard is a primary-key lookup however much history exists
+CREATE TABLE MemberDashboard (
+    member_id                INT PRIMARY KEY REFERENCES Member(member_id) ON DELETE CASCADE,
+    total_classes_registered INT NOT NULL DEFAULT 0,
+    total_training_sessions  INT NOT NULL DEFAULT 0,
+    last_metric_timestamp    TIMESTAMP,
+    weight_kg                NUMERIC(5,2),
+    body_fat_pct             NUMERIC(5,2)
+);
+
+
+-- Daily and weekly per-member rollups of HealthMetric for trend views,
+-- recomputed for the touched days/weeks by rollup_health_metrics()
+CREATE TABLE HealthMetricDaily (
+    member_id              INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    day                    DATE NOT NULL,
+    samples                INT NOT NULL,
+    avg_weight_kg          NUMERIC(5,2),
+    min_weight_kg          NUMERIC(5,2),
+    max_weight_kg          NUMERIC(5,2),
+    avg_body_fat_pct       NUMERIC(5,2),
+    avg_resting_heart_rate NUMERIC(5,1),
+    avg_systolic_bp        NUMERIC(5,1),
+    avg_diastolic_bp       NUMERIC(5,1),
+    PRIMARY KEY (member_id, day)
+);
+
+
+CREATE TABLE HealthMetricWeekly (
+    member_id              INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    week_start             DATE NOT NULL,
+    samples                INT NOT NULL,
+    avg_weight_kg          NUMERIC(5,2),
+    min_weight_kg          NUMERIC(5,2),
+    max_weight_kg          NUMERIC(5,2),
+    avg_body_fat_pct       NUMERIC(5,2),
+    avg_resting_heart_rate NUMERIC(5,1),
+    avg_systolic_bp        NUMERIC(5,1),
+    avg_diastolic_bp       NUMERIC(5,1),
+    PRIMARY KEY (member_id, week_start)
+);
+
+
 CREATE OR REPLACE VIEW member_dashboard AS
 SELECT m.member_id, CONCAT(m.first_name, ' ', m.last_name) AS full_name,
     m.fitness_goal,
-    COUNT(DISTINCT cr.class_id) AS total_classes_registered,
-    COUNT(DISTINCT pts.session_id) AS total_training_sessions,
-    MAX(h.recorded_at) AS last_metric_timestamp,
-    h.weight_kg,
-    h.body_fat_pct
+    d.total_classes_registered,
+    d.total_training_sessions,
+    d.last_metric_timestamp,
+    d.weight_kg,
+    d.body_fat_pct
 FROM Member AS m
-LEFT JOIN ClassRegistration AS cr ON m.member_id = cr.member_id
-LEFT JOIN PersonalTrainingSession AS pts ON m.member_id = pts.member_id
-LEFT JOIN HealthMetric AS h ON m.member_id = h.member_id
-GROUP BY m.member_id, m.first_name, m.last_name, m.fitness_goal, h.weight_kg, h.body_fat_pct;
+JOIN MemberDashboard AS d ON m.member_id = d.member_id;
+
+
+-- Books a PT session in a single statement so callers need one round trip.
+-- result_code is one of 'booked', 'not_available', 'pt_conflict' or
+-- 'class_conflict'; new_session_id is only set when the session was booked.
+DROP FUNCTION IF EXISTS book_pt_session(INT, INT, TIMESTAMP, TIMESTAMP);
+CREATE OR REPLACE FUNCTION book_pt_session(p_member_id INT, p_trainer_id INT, p_start TIMESTAMP, p_end TIMESTAMP)
+RETURNS TABLE (result_code TEXT, new_session_id INT) AS $$
+DECLARE
+    v_slot TSRANGE := tsrange(p_start, p_end);
+    v_open TSMULTIRANGE;
+    v_session_id INT;
+BEGIN
+    -- Locking the trainer's row serializes bookings for that trainer
+    SELECT open_slots INTO v_open
+    FROM TrainerAvailability
+    WHERE trainer_id = p_trainer_id
+    FOR UPDATE;
+
+    -- Booked time has already left open_slots, so sessions are checked
+    -- first for a clash with one to be reported as such
+    IF EXISTS (SELECT 1 FROM PersonalTrainingSession
+               WHERE trainer_id = p_trainer_id AND slot && v_slot) THEN
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF v_open IS NULL OR NOT v_open @> v_slot THEN
+        RETURN QUERY SELECT 'not_available'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM Class
+               WHERE trainer_id = p_trainer_id AND slot && v_slot) THEN
+        RETURN QUERY SELECT 'class_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    BEGIN
+        INSERT INTO PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
+        VALUES (p_member_id, p_trainer_id, p_start, p_end, 'scheduled')
+        RETURNING session_id INTO v_session_id;
+    EXCEPTION WHEN exclusion_violation THEN
+        -- A concurrent booking won the race for this trainer's time
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END;
+
+    -- Only the booked interval leaves the trainer's open time
+    UPDATE TrainerAvailability
+    SET open_slots = open_slots - tsmultirange(v_slot)
+    WHERE trainer_id = p_trainer_id;
+
+    RETURN QUERY SELECT 'booked'::TEXT, v_session_id;
+END;
+$$ LANGUAGE plpgsql;
 
 
+-- Claims a seat with one conditional update on the class row instead of
+-- counting registrations; the update also locks the row, so concurrent
+-- registrations for the same class cannot overbook it. A full class raises
+-- check_violation so callers can tell it apart from a duplicate.
 CREATE OR REPLACE FUNCTION enforce_class_capacity()
 RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Class
+    SET registered_count = registered_count + 1
+    WHERE class_id = NEW.class_id
+      AND registered_count < capacity;
+
+    -- A missing class is left for the foreign key to report
+    IF NOT FOUND AND EXISTS (SELECT 1 FROM Class WHERE class_id = NEW.class_id) THEN
+        RAISE EXCEPTION 'Class is full. Cannot register.' USING ERRCODE = 'check_violation';
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Gives a freed seat to the head of the class's waitlist. The class row is
+-- still locked by the decrement, so no new registrant can take the seat
+-- first; SKIP LOCKED passes over a waitlist entry another cancellation is
+-- already promoting. A class whose capacity was lowered below its
+-- registrations has no seat to give until enough members leave.
+CREATE OR REPLACE FUNCTION release_class_seat()
+RETURNS TRIGGER AS $$
 DECLARE
-    current_count INT;
-    max_capacity INT;
+    v_member_id INT;
+    v_has_seat BOOLEAN;
 BEGIN
-    
-    SELECT COUNT(*) INTO current_count
-    FROM ClassRegistration
-    WHERE class_id = NEW.class_id;
+    UPDATE Class
+    SET registered_count = registered_count - 1
+    WHERE class_id = OLD.class_id
+    RETURNING registered_count < capacity INTO v_has_seat;
 
-    
-    SELECT capacity INTO max_capacity
+    -- Nothing to promote into when the class itself is being deleted
+    IF NOT FOUND OR NOT v_has_seat THEN
+        RETURN OLD;
+    END IF;
+
+    DELETE FROM ClassWaitlist
+    WHERE waitlist_id = (
+        SELECT w.waitlist_id
+        FROM ClassWaitlist w
+        WHERE w.class_id = OLD.class_id
+          AND w.member_id <> OLD.member_id
+          AND NOT EXISTS (SELECT 1 FROM ClassRegistration r
+                          WHERE r.class_id = w.class_id AND r.member_id = w.member_id)
+        ORDER BY w.waitlist_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING member_id INTO v_member_id;
+
+    IF v_member_id IS NOT NULL THEN
+        INSERT INTO ClassRegistration (class_id, member_id)
+        VALUES (OLD.class_id, v_member_id);
+    END IF;
+
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Registers a member in one round trip. result_code is one of
+-- 'registered', 'duplicate', 'waitlisted', 'full' or 'not_found';
+-- new_registration_id is set when registered and waitlist_position when
+-- waitlisted. A class that already looks full is answered from a plain
+-- read, so a rush of late registrants never queues on the class row lock.
+CREATE OR REPLACE FUNCTION register_for_class(p_member_id INT, p_class_id INT, p_waitlist BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (result_code TEXT, new_registration_id INT, waitlist_position INT) AS $$
+DECLARE
+    v_full BOOLEAN;
+    v_registration_id INT;
+    v_waitlist_id INT;
+BEGIN
+    SELECT registered_count >= capacity INTO v_full
     FROM Class
-    WHERE class_id = NEW.class_id;
+    WHERE class_id = p_class_id;
 
- 
-    IF current_count >= max_capacity THEN
-        RAISE EXCEPTION 'Class is full. Cannot register.';
+    IF v_full IS NULL OR NOT EXISTS (SELECT 1 FROM Member WHERE member_id = p_member_id) THEN
+        RETURN QUERY SELECT 'not_found'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
     END IF;
 
-    RETURN NEW;
+    IF EXISTS (SELECT 1 FROM ClassRegistration WHERE class_id = p_class_id AND member_id = p_member_id) THEN
+        RETURN QUERY SELECT 'duplicate'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF NOT v_full THEN
+        BEGIN
+            INSERT INTO ClassRegistration (class_id, member_id)
+            VALUES (p_class_id, p_member_id)
+            RETURNING registration_id INTO v_registration_id;
+        EXCEPTION
+            WHEN unique_violation THEN
+                -- A concurrent request for the same member got there first
+                RETURN QUERY SELECT 'duplicate'::TEXT, NULL::INT, NULL::INT;
+                RETURN;
+            WHEN check_violation THEN
+                -- The last seats went while this request waited for the row lock
+                v_full := TRUE;
+        END;
+    END IF;
+
+    IF NOT v_full THEN
+        DELETE FROM ClassWaitlist WHERE class_id = p_class_id AND member_id = p_member_id;
+        RETURN QUERY SELECT 'registered'::TEXT, v_registration_id, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF NOT p_waitlist THEN
+        RETURN QUERY SELECT 'full'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    INSERT INTO ClassWaitlist (class_id, member_id)
+    VALUES (p_class_id, p_member_id)
+    ON CONFLICT (class_id, member_id) DO NOTHING
+    RETURNING waitlist_id INTO v_waitlist_id;
+
+    -- Asking again keeps the member's original place
+    IF v_waitlist_id IS NULL THEN
+        SELECT waitlist_id INTO v_waitlist_id
+        FROM ClassWaitlist
+        WHERE class_id = p_class_id AND member_id = p_member_id;
+    END IF;
+
+    RETURN QUERY
+    SELECT 'waitlisted'::TEXT, NULL::INT, COUNT(*)::INT
+    FROM ClassWaitlist
+    WHERE class_id = p_class_id AND waitlist_id <= v_waitlist_id;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -153,5 +432,314 @@ FOR EACH ROW
 EXECUTE FUNCTION enforce_class_capacity();
 
 
+CREATE TRIGGER trg_release_class_seat
+AFTER DELETE ON ClassRegistration
+FOR EACH ROW
+EXECUTE FUNCTION release_class_seat();
+
+
+CREATE OR REPLACE FUNCTION dashboard_add_members()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO MemberDashboard (member_id)
+    SELECT member_id FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION dashboard_count_registrations()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE MemberDashboard d
+        SET total_classes_registered = d.total_classes_registered + changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM new_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    ELSE
+        UPDATE MemberDashboard d
+        SET total_classes_registered = d.total_classes_registered - changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM old_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION dashboard_count_sessions()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE MemberDashboard d
+        SET total_training_sessions = d.total_training_sessions + changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM new_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    ELSE
+        UPDATE MemberDashboard d
+        SET total_training_sessions = d.total_training_sessions - changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM old_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- New metrics only replace the stored one when they are at least as recent,
+-- so back-filled history does not overwrite the latest reading
+CREATE OR REPLACE FUNCTION dashboard_add_metrics()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE MemberDashboard d
+    SET last_metric_timestamp = latest.recorded_at,
+        weight_kg = latest.weight_kg,
+        body_fat_pct = latest.body_fat_pct
+    FROM (
+        SELECT DISTINCT ON (member_id) member_id, recorded_at, weight_kg, body_fat_pct
+        FROM new_rows
+        ORDER BY member_id, recorded_at DESC
+    ) latest
+    WHERE d.member_id = latest.member_id
+      AND (d.last_metric_timestamp IS NULL OR latest.recorded_at >= d.last_metric_timestamp);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Updated or deleted metrics may have been the latest one, so look it up again
+CREATE OR REPLACE FUNCTION dashboard_recompute_metrics()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE MemberDashboard d
+    SET last_metric_timestamp = latest.recorded_at,
+        weight_kg = latest.weight_kg,
+        body_fat_pct = latest.body_fat_pct
+    FROM (SELECT DISTINCT member_id FROM old_rows) changed
+    LEFT JOIN LATERAL (
+        SELECT h.recorded_at, h.weight_kg, h.body_fat_pct
+        FROM HealthMetric h
+        WHERE h.member_id = changed.member_id
+        ORDER BY h.recorded_at DESC
+        LIMIT 1
+    ) latest ON TRUE
+    WHERE d.member_id = changed.member_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Recomputes the daily and weekly rollups for the given (member, day)
+-- pairs from HealthMetric, dropping rollup rows whose metrics are all gone
+CREATE OR REPLACE FUNCTION rollup_health_metrics(p_members INT[], p_days DATE[])
+RETURNS VOID AS $$
+BEGIN
+    -- Concurrent writers for the same member take turns, so each recompute
+    -- starts after the previous one committed and sees its rows
+    PERFORM pg_advisory_xact_lock(hashtext('health_metric_rollup'), members.member_id)
+    FROM (SELECT DISTINCT unnest(p_members) AS member_id ORDER BY 1) members;
+
+    WITH touched AS (
+        SELECT DISTINCT member_id, day FROM unnest(p_members, p_days) AS t(member_id, day)
+    ), fresh AS (
+        SELECT t.member_id, t.day, COUNT(*) AS samples,
+            ROUND(AVG(h.weight_kg), 2) AS avg_weight_kg,
+            MIN(h.weight_kg) AS min_weight_kg,
+            MAX(h.weight_kg) AS max_weight_kg,
+            ROUND(AVG(h.body_fat_pct), 2) AS avg_body_fat_pct,
+            ROUND(AVG(h.resting_heart_rate), 1) AS avg_resting_heart_rate,
+            ROUND(AVG(h.systolic_bp), 1) AS avg_systolic_bp,
+            ROUND(AVG(h.diastolic_bp), 1) AS avg_diastolic_bp
+        FROM touched t
+        JOIN HealthMetric h ON h.member_id = t.member_id
+         AND h.recorded_at >= t.day AND h.recorded_at < t.day + 1
+        GROUP BY t.member_id, t.day
+    ), emptied AS (
+        DELETE FROM HealthMetricDaily d
+        USING touched t
+        WHERE d.member_id = t.member_id AND d.day = t.day
+          AND NOT EXISTS (SELECT 1 FROM fresh f WHERE f.member_id = t.member_id AND f.day = t.day)
+    )
+    INSERT INTO HealthMetricDaily
+    SELECT * FROM fresh
+    ON CONFLICT (member_id, day) DO UPDATE
+    SET samples = EXCLUDED.samples,
+        avg_weight_kg = EXCLUDED.avg_weight_kg,
+        min_weight_kg = EXCLUDED.min_weight_kg,
+        max_weight_kg = EXCLUDED.max_weight_kg,
+        avg_body_fat_pct = EXCLUDED.avg_body_fat_pct,
+        avg_resting_heart_rate = EXCLUDED.avg_resting_heart_rate,
+        avg_systolic_bp = EXCLUDED.avg_systolic_bp,
+        avg_diastolic_bp = EXCLUDED.avg_diastolic_bp;
+
+    WITH touched AS (
+        SELECT DISTINCT member_id, date_trunc('week', day)::date AS week_start
+        FROM unnest(p_members, p_days) AS t(member_id, day)
+    ), fresh AS (
+        SELECT t.member_id, t.week_start, COUNT(*) AS samples,
+            ROUND(AVG(h.weight_kg), 2) AS avg_weight_kg,
+            MIN(h.weight_kg) AS min_weight_kg,
+            MAX(h.weight_kg) AS max_weight_kg,
+            ROUND(AVG(h.body_fat_pct), 2) AS avg_body_fat_pct,
+            ROUND(AVG(h.resting_heart_rate), 1) AS avg_resting_heart_rate,
+            ROUND(AVG(h.systolic_bp), 1) AS avg_systolic_bp,
+            ROUND(AVG(h.diastolic_bp), 1) AS avg_diastolic_bp
+        FROM touched t
+        JOIN HealthMetric h ON h.member_id = t.member_id
+         AND h.recorded_at >= t.week_start AND h.recorded_at < t.week_start + 7
+        GROUP BY t.member_id, t.week_start
+    ), emptied AS (
+        DELETE FROM HealthMetricWeekly w
+        USING touched t
+        WHERE w.member_id = t.member_id AND w.week_start = t.week_start
+          AND NOT EXISTS (SELECT 1 FROM fresh f WHERE f.member_id = t.member_id AND f.week_start = t.week_start)
+    )
+    INSERT INTO HealthMetricWeekly
+    SELECT * FROM fresh
+    ON CONFLICT (member_id, week_start) DO UPDATE
+    SET samples = EXCLUDED.samples,
+        avg_weight_kg = EXCLUDED.avg_weight_kg,
+        min_weight_kg = EXCLUDED.min_weight_kg,
+        max_weight_kg = EXCLUDED.max_weight_kg,
+        avg_body_fat_pct = EXCLUDED.avg_body_fat_pct,
+        avg_resting_heart_rate = EXCLUDED.avg_resting_heart_rate,
+        avg_systolic_bp = EXCLUDED.avg_systolic_bp,
+        avg_diastolic_bp = EXCLUDED.avg_diastolic_bp;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION rollup_changed_health_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_members INT[];
+    v_days    DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(member_id), array_agg(day) INTO v_members, v_days
+        FROM (SELECT DISTINCT member_id, recorded_at::date AS day FROM new_rows) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(member_id), array_agg(day) INTO v_members, v_days
+        FROM (SELECT DISTINCT member_id, recorded_at::date AS day FROM old_rows) changed;
+    ELSE
+        SELECT array_agg(member_id), array_agg(day) INTO v_members, v_days
+        FROM (
+            SELECT member_id, recorded_at::date AS day FROM old_rows
+            UNION
+            SELECT member_id, recorded_at::date AS day FROM new_rows
+        ) changed;
+    END IF;
+    IF v_members IS NOT NULL THEN
+        PERFORM rollup_health_metrics(v_members, v_days);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER trg_dashboard_add_members
+AFTER INSERT ON Member
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_add_members();
+
+
+CREATE TRIGGER trg_dashboard_registrations_insert
+AFTER INSERT ON ClassRegistration
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_registrations();
+
+
+CREATE TRIGGER trg_dashboard_registrations_delete
+AFTER DELETE ON ClassRegistration
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_registrations();
+
+
+CREATE TRIGGER trg_dashboard_sessions_insert
+AFTER INSERT ON PersonalTrainingSession
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_sessions();
+
+
+CREATE TRIGGER trg_dashboard_sessions_delete
+AFTER DELETE ON PersonalTrainingSession
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_sessions();
+
+
+CREATE TRIGGER trg_dashboard_metrics_insert
+AFTER INSERT ON HealthMetric
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_add_metrics();
+
+
+CREATE TRIGGER trg_dashboard_metrics_update
+AFTER UPDATE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_recompute_metrics();
+
+
+CREATE TRIGGER trg_dashboard_metrics_delete
+AFTER DELETE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_recompute_metrics();
+
+
+CREATE TRIGGER trg_rollup_metrics_insert
+AFTER INSERT ON HealthMetric
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_changed_health_metrics();
+
+
+CREATE TRIGGER trg_rollup_metrics_update
+AFTER UPDATE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_changed_health_metrics();
+
+
+CREATE TRIGGER trg_rollup_metrics_delete
+AFTER DELETE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_changed_health_metrics();
+
+
 CREATE INDEX idx_classregistration_class_member
 ON ClassRegistration (class_id, member_id);
+
+CREATE INDEX idx_classwaitlist_class_order
+ON ClassWaitlist (class_id, waitlist_id);
+
+
+-- Trigram index for ranked fuzzy member search, and text_pattern_ops
+-- indexes so prefix typeahead (LIKE 'abc%') is an index range scan
+CREATE INDEX idx_member_full_name_trgm
+ON Member USING GIN (lower(first_name || ' ' || last_name) gin_trgm_ops);
+
+CREATE INDEX idx_member_full_name_prefix
+ON Member (lower(first_name || ' ' || last_name) text_pattern_ops);
+
+CREATE INDEX idx_member_last_name_prefix
+ON Member (lower(last_name) text_pattern_ops);
+
+
+-- Keyset pagination indexes: each matches a listing's ORDER BY so a page
+-- is an index range scan starting right after the previous page's last row
+CREATE INDEX idx_class_start_id ON Class (start_time, class_id);
+
+CREATE INDEX idx_class_trainer_start_id ON Class (trainer_id, start_time, class_id);
+
+CREATE INDEX idx_pt_session_trainer_start_id
+ON PersonalTrainingSession (trainer_id, start_time, session_id);
+
+CREATE INDEX idx_member_name_id ON Member (last_name, first_name, member_id);
@@ -26,12 +26,12 @@ VALUES
 (2, '2025-10-10 18:00', 80.2, 20.0, 68, 120, 80),
 (3, '2025-10-12 08:30', 60.0, 22.0, 75, 115, 73);
 
-INSERT INTO TrainerAvailability (trainer_id, admin_id, start_time, end_time, is_booked)
+-- Open time left after the PT sessions below
+INSERT INTO TrainerAvailability (trainer_id, open_slots)
 VALUES
-(1, 1, '2025-10-20 09:00', '2025-10-20 11:00', FALSE),
-(1, 1, '2025-10-21 14:00', '2025-10-21 16:00', TRUE),
-(2, 2, '2025-10-20 08:00', '2025-10-20 10:00', FALSE),
-(3, 2, '2025-10-22 18:00', '2025-10-22 20:00', FALSE);
+(1, '{[2025-10-20 10:00, 2025-10-20 11:00)}'),
+(2, '{[2025-10-20 09:00, 2025-10-20 10:00)}'),
+(3, '{[2025-10-22 19:00, 2025-10-22 20:00)}');
 
 INSERT INTO Class (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity)
 VALUES
@@ -0,0 +1,50 @@
+-- Adds tsrange slot columns and GiST exclusion constraints so the database
+-- itself rejects overlapping bookings per room and per trainer.
+-- Run once against an existing database created from the original DDL.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE Class
+    ADD COLUMN slot TSRANGE GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED;
+ALTER TABLE TrainerAvailability
+    ADD COLUMN slot TSRANGE GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED;
+ALTER TABLE PersonalTrainingSession
+    ADD COLUMN slot TSRANGE GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED;
+
+-- Existing overlaps would make the constraints below fail; list them and
+-- stop so they can be resolved by hand first.
+DO $$
+DECLARE
+    conflicts INT;
+BEGIN
+    SELECT COUNT(*) INTO conflicts FROM (
+        SELECT 1 FROM Class a JOIN Class b
+          ON a.class_id < b.class_id AND a.trainer_id = b.trainer_id AND a.slot && b.slot
+        UNION ALL
+        SELECT 1 FROM Class a JOIN Class b
+          ON a.class_id < b.class_id AND a.room_id = b.room_id AND a.slot && b.slot
+        UNION ALL
+        SELECT 1 FROM TrainerAvailability a JOIN TrainerAvailability b
+          ON a.availability_id < b.availability_id AND a.trainer_id = b.trainer_id AND a.slot && b.slot
+        UNION ALL
+        SELECT 1 FROM PersonalTrainingSession a JOIN PersonalTrainingSession b
+          ON a.session_id < b.session_id AND a.trainer_id = b.trainer_id AND a.slot && b.slot
+    ) overlaps;
+
+    IF conflicts > 0 THEN
+        RAISE EXCEPTION '% overlapping booking pair(s) found; resolve them before running this migration.', conflicts;
+    END IF;
+END;
+$$;
+
+ALTER TABLE Class
+    ADD CONSTRAINT class_trainer_no_overlap EXCLUDE USING gist (trainer_id WITH =, slot WITH &&),
+    ADD CONSTRAINT class_room_no_overlap EXCLUDE USING gist (room_id WITH =, slot WITH &&);
+ALTER TABLE TrainerAvailability
+    ADD CONSTRAINT trainer_availability_no_overlap EXCLUDE USING gist (trainer_id WITH =, slot WITH &&);
+ALTER TABLE PersonalTrainingSession
+    ADD CONSTRAINT pt_session_trainer_no_overlap EXCLUDE USING gist (trainer_id WITH =, slot WITH &&);
+
+COMMIT;
@@ -0,0 +1,54 @@
+-- Adds the single-round-trip PT booking function used by
+-- MemberOperations.book_personal_training. Requires migration 001.
+
+-- Books a PT session in a single statement so callers need one round trip.
+-- result_code is one of 'booked', 'not_available', 'pt_conflict' or
+-- 'class_conflict'; the ids are only set when the session was booked.
+CREATE OR REPLACE FUNCTION book_pt_session(p_member_id INT, p_trainer_id INT, p_start TIMESTAMP, p_end TIMESTAMP)
+RETURNS TABLE (result_code TEXT, new_session_id INT, booked_availability_id INT) AS $$
+DECLARE
+    v_availability_id INT;
+    v_session_id INT;
+BEGIN
+    SELECT availability_id INTO v_availability_id
+    FROM TrainerAvailability
+    WHERE trainer_id = p_trainer_id
+      AND slot @> tsrange(p_start, p_end)
+      AND is_booked = FALSE
+    LIMIT 1
+    FOR UPDATE;
+
+    IF v_availability_id IS NULL THEN
+        RETURN QUERY SELECT 'not_available'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM PersonalTrainingSession
+               WHERE trainer_id = p_trainer_id AND slot && tsrange(p_start, p_end)) THEN
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM Class
+               WHERE trainer_id = p_trainer_id AND slot && tsrange(p_start, p_end)) THEN
+        RETURN QUERY SELECT 'class_conflict'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    BEGIN
+        INSERT INTO PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
+        VALUES (p_member_id, p_trainer_id, p_start, p_end, 'scheduled')
+        RETURNING session_id INTO v_session_id;
+    EXCEPTION WHEN exclusion_violation THEN
+        -- A concurrent booking won the race for this trainer's time
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END;
+
+    UPDATE TrainerAvailability
+    SET is_booked = TRUE
+    WHERE availability_id = v_availability_id;
+
+    RETURN QUERY SELECT 'booked'::TEXT, v_session_id, v_availability_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,52 @@
+-- Replaces COUNT(*) in the capacity trigger and the class listings with a
+-- registered_count column on Class, maintained by triggers.
+
+BEGIN;
+
+ALTER TABLE Class
+    ADD COLUMN registered_count INT NOT NULL DEFAULT 0 CHECK (registered_count >= 0);
+
+UPDATE Class c
+SET registered_count = counts.total
+FROM (SELECT class_id, COUNT(*) AS total FROM ClassRegistration GROUP BY class_id) counts
+WHERE c.class_id = counts.class_id;
+
+-- Claims a seat with one conditional update on the class row instead of
+-- counting registrations; the update also locks the row, so concurrent
+-- registrations for the same class cannot overbook it.
+CREATE OR REPLACE FUNCTION enforce_class_capacity()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Class
+    SET registered_count = registered_count + 1
+    WHERE class_id = NEW.class_id
+      AND registered_count < capacity;
+
+    -- A missing class is left for the foreign key to report
+    IF NOT FOUND AND EXISTS (SELECT 1 FROM Class WHERE class_id = NEW.class_id) THEN
+        RAISE EXCEPTION 'Class is full. Cannot register.';
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION release_class_seat()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Class
+    SET registered_count = registered_count - 1
+    WHERE class_id = OLD.class_id;
+
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_release_class_seat ON ClassRegistration;
+CREATE TRIGGER trg_release_class_seat
+AFTER DELETE ON ClassRegistration
+FOR EACH ROW
+EXECUTE FUNCTION release_class_seat();
+
+COMMIT;
@@ -0,0 +1,191 @@
+-- Replaces the aggregating member_dashboard view with a MemberDashboard
+-- summary table maintained by statement-level triggers.
+
+BEGIN;
+
+-- One row per member, kept current by the statement-level triggers below,
+-- so the dashboard is a primary-key lookup however much history exists
+CREATE TABLE MemberDashboard (
+    member_id                INT PRIMARY KEY REFERENCES Member(member_id) ON DELETE CASCADE,
+    total_classes_registered INT NOT NULL DEFAULT 0,
+    total_training_sessions  INT NOT NULL DEFAULT 0,
+    last_metric_timestamp    TIMESTAMP,
+    weight_kg                NUMERIC(5,2),
+    body_fat_pct             NUMERIC(5,2)
+);
+
+INSERT INTO MemberDashboard (member_id, total_classes_registered, total_training_sessions,
+                             last_metric_timestamp, weight_kg, body_fat_pct)
+SELECT m.member_id,
+    (SELECT COUNT(*) FROM ClassRegistration cr WHERE cr.member_id = m.member_id),
+    (SELECT COUNT(*) FROM PersonalTrainingSession pts WHERE pts.member_id = m.member_id),
+    latest.recorded_at,
+    latest.weight_kg,
+    latest.body_fat_pct
+FROM Member m
+LEFT JOIN LATERAL (
+    SELECT h.recorded_at, h.weight_kg, h.body_fat_pct
+    FROM HealthMetric h
+    WHERE h.member_id = m.member_id
+    ORDER BY h.recorded_at DESC
+    LIMIT 1
+) latest ON TRUE;
+
+DROP VIEW IF EXISTS member_dashboard;
+CREATE OR REPLACE VIEW member_dashboard AS
+SELECT m.member_id, CONCAT(m.first_name, ' ', m.last_name) AS full_name,
+    m.fitness_goal,
+    d.total_classes_registered,
+    d.total_training_sessions,
+    d.last_metric_timestamp,
+    d.weight_kg,
+    d.body_fat_pct
+FROM Member AS m
+JOIN MemberDashboard AS d ON m.member_id = d.member_id;
+
+CREATE OR REPLACE FUNCTION dashboard_add_members()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO MemberDashboard (member_id)
+    SELECT member_id FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION dashboard_count_registrations()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE MemberDashboard d
+        SET total_classes_registered = d.total_classes_registered + changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM new_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    ELSE
+        UPDATE MemberDashboard d
+        SET total_classes_registered = d.total_classes_registered - changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM old_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION dashboard_count_sessions()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE MemberDashboard d
+        SET total_training_sessions = d.total_training_sessions + changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM new_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    ELSE
+        UPDATE MemberDashboard d
+        SET total_training_sessions = d.total_training_sessions - changed.total
+        FROM (SELECT member_id, COUNT(*) AS total FROM old_rows GROUP BY member_id) changed
+        WHERE d.member_id = changed.member_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- New metrics only replace the stored one when they are at least as recent,
+-- so back-filled history does not overwrite the latest reading
+CREATE OR REPLACE FUNCTION dashboard_add_metrics()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE MemberDashboard d
+    SET last_metric_timestamp = latest.recorded_at,
+        weight_kg = latest.weight_kg,
+        body_fat_pct = latest.body_fat_pct
+    FROM (
+        SELECT DISTINCT ON (member_id) member_id, recorded_at, weight_kg, body_fat_pct
+        FROM new_rows
+        ORDER BY member_id, recorded_at DESC
+    ) latest
+    WHERE d.member_id = latest.member_id
+      AND (d.last_metric_timestamp IS NULL OR latest.recorded_at >= d.last_metric_timestamp);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Updated or deleted metrics may have been the latest one, so look it up again
+CREATE OR REPLACE FUNCTION dashboard_recompute_metrics()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE MemberDashboard d
+    SET last_metric_timestamp = latest.recorded_at,
+        weight_kg = latest.weight_kg,
+        body_fat_pct = latest.body_fat_pct
+    FROM (SELECT DISTINCT member_id FROM old_rows) changed
+    LEFT JOIN LATERAL (
+        SELECT h.recorded_at, h.weight_kg, h.body_fat_pct
+        FROM HealthMetric h
+        WHERE h.member_id = changed.member_id
+        ORDER BY h.recorded_at DESC
+        LIMIT 1
+    ) latest ON TRUE
+    WHERE d.member_id = changed.member_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_dashboard_add_members
+AFTER INSERT ON Member
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_add_members();
+
+
+CREATE TRIGGER trg_dashboard_registrations_insert
+AFTER INSERT ON ClassRegistration
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_registrations();
+
+
+CREATE TRIGGER trg_dashboard_registrations_delete
+AFTER DELETE ON ClassRegistration
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_registrations();
+
+
+CREATE TRIGGER trg_dashboard_sessions_insert
+AFTER INSERT ON PersonalTrainingSession
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_sessions();
+
+
+CREATE TRIGGER trg_dashboard_sessions_delete
+AFTER DELETE ON PersonalTrainingSession
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_count_sessions();
+
+
+CREATE TRIGGER trg_dashboard_metrics_insert
+AFTER INSERT ON HealthMetric
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_add_metrics();
+
+
+CREATE TRIGGER trg_dashboard_metrics_update
+AFTER UPDATE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_recompute_metrics();
+
+
+CREATE TRIGGER trg_dashboard_metrics_delete
+AFTER DELETE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_recompute_metrics();
+
+COMMIT;
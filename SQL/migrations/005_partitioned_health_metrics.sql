@@ -0,0 +1,279 @@
+-- Moves HealthMetric to a table range-partitioned by month on recorded_at,
+-- adds time-series indexes and daily/weekly rollup tables kept current by
+-- statement-level triggers.
+
+BEGIN;
+
+ALTER TABLE HealthMetric RENAME TO HealthMetric_legacy;
+ALTER INDEX healthmetric_pkey RENAME TO healthmetric_legacy_pkey;
+ALTER SEQUENCE healthmetric_metric_id_seq RENAME TO healthmetric_legacy_metric_id_seq;
+DROP TRIGGER trg_dashboard_metrics_insert ON HealthMetric_legacy;
+DROP TRIGGER trg_dashboard_metrics_update ON HealthMetric_legacy;
+DROP TRIGGER trg_dashboard_metrics_delete ON HealthMetric_legacy;
+
+-- Range-partitioned by month on recorded_at; the primary key has to
+-- include the partition key. Rows outside every monthly partition land in
+-- HealthMetric_default until create_health_metric_partitions() covers them.
+CREATE TABLE HealthMetric (
+    metric_id          SERIAL,
+    member_id          INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    recorded_at        TIMESTAMP NOT NULL DEFAULT NOW(),
+    weight_kg          NUMERIC(5,2),
+    body_fat_pct       NUMERIC(5,2),
+    resting_heart_rate INT,
+    systolic_bp        INT,
+    diastolic_bp       INT,
+    PRIMARY KEY (metric_id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+CREATE TABLE HealthMetric_default PARTITION OF HealthMetric DEFAULT;
+
+-- B-tree for per-member "latest"/range lookups, BRIN for time-range scans
+CREATE INDEX idx_healthmetric_member_recorded ON HealthMetric (member_id, recorded_at DESC);
+CREATE INDEX idx_healthmetric_recorded_brin ON HealthMetric USING BRIN (recorded_at);
+
+-- Creates the monthly HealthMetric partitions for p_from through p_to,
+-- moving any rows already sitting in the default partition into them.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION create_health_metric_partitions(p_from DATE, p_to DATE)
+RETURNS INT AS $$
+DECLARE
+    v_month   DATE := date_trunc('month', p_from)::date;
+    v_next    DATE;
+    v_name    TEXT;
+    v_created INT := 0;
+BEGIN
+    WHILE v_month <= p_to LOOP
+        v_next := (v_month + INTERVAL '1 month')::date;
+        v_name := 'healthmetric_' || to_char(v_month, 'YYYY_MM');
+        IF to_regclass(v_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE HealthMetric INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM HealthMetric_default WHERE recorded_at >= %L AND recorded_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved', v_month, v_next, v_name);
+            EXECUTE format('ALTER TABLE HealthMetric ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', v_name, v_month, v_next);
+            v_created := v_created + 1;
+        END IF;
+        v_month := v_next;
+    END LOOP;
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_health_metric_partitions(
+    COALESCE((SELECT MIN(recorded_at) FROM HealthMetric_legacy)::date, CURRENT_DATE),
+    (NOW() + INTERVAL '12 months')::date
+);
+
+INSERT INTO HealthMetric (metric_id, member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
+SELECT metric_id, member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp
+FROM HealthMetric_legacy;
+
+SELECT setval(pg_get_serial_sequence('healthmetric', 'metric_id'), COALESCE(MAX(metric_id), 0) + 1, false)
+FROM HealthMetric;
+
+DROP TABLE HealthMetric_legacy;
+
+-- Daily and weekly per-member rollups of HealthMetric for trend views,
+-- recomputed for the touched days/weeks by rollup_health_metrics()
+CREATE TABLE HealthMetricDaily (
+    member_id              INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    day                    DATE NOT NULL,
+    samples                INT NOT NULL,
+    avg_weight_kg          NUMERIC(5,2),
+    min_weight_kg          NUMERIC(5,2),
+    max_weight_kg          NUMERIC(5,2),
+    avg_body_fat_pct       NUMERIC(5,2),
+    avg_resting_heart_rate NUMERIC(5,1),
+    avg_systolic_bp        NUMERIC(5,1),
+    avg_diastolic_bp       NUMERIC(5,1),
+    PRIMARY KEY (member_id, day)
+);
+
+
+CREATE TABLE HealthMetricWeekly (
+    member_id              INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    week_start             DATE NOT NULL,
+    samples                INT NOT NULL,
+    avg_weight_kg          NUMERIC(5,2),
+    min_weight_kg          NUMERIC(5,2),
+    max_weight_kg          NUMERIC(5,2),
+    avg_body_fat_pct       NUMERIC(5,2),
+    avg_resting_heart_rate NUMERIC(5,1),
+    avg_systolic_bp        NUMERIC(5,1),
+    avg_diastolic_bp       NUMERIC(5,1),
+    PRIMARY KEY (member_id, week_start)
+);
+
+INSERT INTO HealthMetricDaily
+SELECT member_id, recorded_at::date, COUNT(*),
+    ROUND(AVG(weight_kg), 2),
+    MIN(weight_kg),
+    MAX(weight_kg),
+    ROUND(AVG(body_fat_pct), 2),
+    ROUND(AVG(resting_heart_rate), 1),
+    ROUND(AVG(systolic_bp), 1),
+    ROUND(AVG(diastolic_bp), 1)
+FROM HealthMetric
+GROUP BY member_id, recorded_at::date;
+
+INSERT INTO HealthMetricWeekly
+SELECT member_id, date_trunc('week', recorded_at)::date, COUNT(*),
+    ROUND(AVG(weight_kg), 2),
+    MIN(weight_kg),
+    MAX(weight_kg),
+    ROUND(AVG(body_fat_pct), 2),
+    ROUND(AVG(resting_heart_rate), 1),
+    ROUND(AVG(systolic_bp), 1),
+    ROUND(AVG(diastolic_bp), 1)
+FROM HealthMetric
+GROUP BY member_id, date_trunc('week', recorded_at)::date;
+
+-- Recomputes the daily and weekly rollups for the given (member, day)
+-- pairs from HealthMetric, dropping rollup rows whose metrics are all gone
+CREATE OR REPLACE FUNCTION rollup_health_metrics(p_members INT[], p_days DATE[])
+RETURNS VOID AS $$
+BEGIN
+    -- Concurrent writers for the same member take turns, so each recompute
+    -- starts after the previous one committed and sees its rows
+    PERFORM pg_advisory_xact_lock(hashtext('health_metric_rollup'), members.member_id)
+    FROM (SELECT DISTINCT unnest(p_members) AS member_id ORDER BY 1) members;
+
+    WITH touched AS (
+        SELECT DISTINCT member_id, day FROM unnest(p_members, p_days) AS t(member_id, day)
+    ), fresh AS (
+        SELECT t.member_id, t.day, COUNT(*) AS samples,
+            ROUND(AVG(h.weight_kg), 2) AS avg_weight_kg,
+            MIN(h.weight_kg) AS min_weight_kg,
+            MAX(h.weight_kg) AS max_weight_kg,
+            ROUND(AVG(h.body_fat_pct), 2) AS avg_body_fat_pct,
+            ROUND(AVG(h.resting_heart_rate), 1) AS avg_resting_heart_rate,
+            ROUND(AVG(h.systolic_bp), 1) AS avg_systolic_bp,
+            ROUND(AVG(h.diastolic_bp), 1) AS avg_diastolic_bp
+        FROM touched t
+        JOIN HealthMetric h ON h.member_id = t.member_id
+         AND h.recorded_at >= t.day AND h.recorded_at < t.day + 1
+        GROUP BY t.member_id, t.day
+    ), emptied AS (
+        DELETE FROM HealthMetricDaily d
+        USING touched t
+        WHERE d.member_id = t.member_id AND d.day = t.day
+          AND NOT EXISTS (SELECT 1 FROM fresh f WHERE f.member_id = t.member_id AND f.day = t.day)
+    )
+    INSERT INTO HealthMetricDaily
+    SELECT * FROM fresh
+    ON CONFLICT (member_id, day) DO UPDATE
+    SET samples = EXCLUDED.samples,
+        avg_weight_kg = EXCLUDED.avg_weight_kg,
+        min_weight_kg = EXCLUDED.min_weight_kg,
+        max_weight_kg = EXCLUDED.max_weight_kg,
+        avg_body_fat_pct = EXCLUDED.avg_body_fat_pct,
+        avg_resting_heart_rate = EXCLUDED.avg_resting_heart_rate,
+        avg_systolic_bp = EXCLUDED.avg_systolic_bp,
+        avg_diastolic_bp = EXCLUDED.avg_diastolic_bp;
+
+    WITH touched AS (
+        SELECT DISTINCT member_id, date_trunc('week', day)::date AS week_start
+        FROM unnest(p_members, p_days) AS t(member_id, day)
+    ), fresh AS (
+        SELECT t.member_id, t.week_start, COUNT(*) AS samples,
+            ROUND(AVG(h.weight_kg), 2) AS avg_weight_kg,
+            MIN(h.weight_kg) AS min_weight_kg,
+            MAX(h.weight_kg) AS max_weight_kg,
+            ROUND(AVG(h.body_fat_pct), 2) AS avg_body_fat_pct,
+            ROUND(AVG(h.resting_heart_rate), 1) AS avg_resting_heart_rate,
+            ROUND(AVG(h.systolic_bp), 1) AS avg_systolic_bp,
+            ROUND(AVG(h.diastolic_bp), 1) AS avg_diastolic_bp
+        FROM touched t
+        JOIN HealthMetric h ON h.member_id = t.member_id
+         AND h.recorded_at >= t.week_start AND h.recorded_at < t.week_start + 7
+        GROUP BY t.member_id, t.week_start
+    ), emptied AS (
+        DELETE FROM HealthMetricWeekly w
+        USING touched t
+        WHERE w.member_id = t.member_id AND w.week_start = t.week_start
+          AND NOT EXISTS (SELECT 1 FROM fresh f WHERE f.member_id = t.member_id AND f.week_start = t.week_start)
+    )
+    INSERT INTO HealthMetricWeekly
+    SELECT * FROM fresh
+    ON CONFLICT (member_id, week_start) DO UPDATE
+    SET samples = EXCLUDED.samples,
+        avg_weight_kg = EXCLUDED.avg_weight_kg,
+        min_weight_kg = EXCLUDED.min_weight_kg,
+        max_weight_kg = EXCLUDED.max_weight_kg,
+        avg_body_fat_pct = EXCLUDED.avg_body_fat_pct,
+        avg_resting_heart_rate = EXCLUDED.avg_resting_heart_rate,
+        avg_systolic_bp = EXCLUDED.avg_systolic_bp,
+        avg_diastolic_bp = EXCLUDED.avg_diastolic_bp;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION rollup_changed_health_metrics()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_members INT[];
+    v_days    DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(member_id), array_agg(day) INTO v_members, v_days
+        FROM (SELECT DISTINCT member_id, recorded_at::date AS day FROM new_rows) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(member_id), array_agg(day) INTO v_members, v_days
+        FROM (SELECT DISTINCT member_id, recorded_at::date AS day FROM old_rows) changed;
+    ELSE
+        SELECT array_agg(member_id), array_agg(day) INTO v_members, v_days
+        FROM (
+            SELECT member_id, recorded_at::date AS day FROM old_rows
+            UNION
+            SELECT member_id, recorded_at::date AS day FROM new_rows
+        ) changed;
+    END IF;
+    IF v_members IS NOT NULL THEN
+        PERFORM rollup_health_metrics(v_members, v_days);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_dashboard_metrics_insert
+AFTER INSERT ON HealthMetric
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_add_metrics();
+
+
+CREATE TRIGGER trg_dashboard_metrics_update
+AFTER UPDATE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_recompute_metrics();
+
+
+CREATE TRIGGER trg_dashboard_metrics_delete
+AFTER DELETE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION dashboard_recompute_metrics();
+
+CREATE TRIGGER trg_rollup_metrics_insert
+AFTER INSERT ON HealthMetric
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_changed_health_metrics();
+
+
+CREATE TRIGGER trg_rollup_metrics_update
+AFTER UPDATE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_changed_health_metrics();
+
+
+CREATE TRIGGER trg_rollup_metrics_delete
+AFTER DELETE ON HealthMetric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_changed_health_metrics();
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- Indexes Member names for trigram fuzzy search and prefix typeahead.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Trigram index for ranked fuzzy member search, and text_pattern_ops
+-- indexes so prefix typeahead (LIKE 'abc%') is an index range scan
+CREATE INDEX idx_member_full_name_trgm
+ON Member USING GIN (lower(first_name || ' ' || last_name) gin_trgm_ops);
+
+CREATE INDEX idx_member_full_name_prefix
+ON Member (lower(first_name || ' ' || last_name) text_pattern_ops);
+
+CREATE INDEX idx_member_last_name_prefix
+ON Member (lower(last_name) text_pattern_ops);
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- Indexes backing the keyset-paginated listing queries.
+
+BEGIN;
+
+-- Keyset pagination indexes: each matches a listing's ORDER BY so a page
+-- is an index range scan starting right after the previous page's last row
+CREATE INDEX idx_class_start_id ON Class (start_time, class_id);
+
+CREATE INDEX idx_class_trainer_start_id ON Class (trainer_id, start_time, class_id);
+
+CREATE INDEX idx_availability_open_start_id
+ON TrainerAvailability (start_time, availability_id)
+WHERE is_booked = FALSE;
+
+CREATE INDEX idx_pt_session_trainer_start_id
+ON PersonalTrainingSession (trainer_id, start_time, session_id);
+
+CREATE INDEX idx_member_name_id ON Member (last_name, first_name, member_id);
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- Widens the password columns for pbkdf2_sha256 hashes.
+--
+-- Hashing needs the application's PBKDF2 settings, so after this migration
+-- run `python app/auth.py migrate-passwords` to hash the existing
+-- plaintext values. Until then they still verify and are re-hashed on each
+-- account's next successful login.
+
+BEGIN;
+
+ALTER TABLE Admin ALTER COLUMN password TYPE VARCHAR(255);
+ALTER TABLE Member ALTER COLUMN password TYPE VARCHAR(255);
+ALTER TABLE Trainer ALTER COLUMN password TYPE VARCHAR(255);
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- Index for the earliest-PT-slot search, which scans open availability
+-- windows overlapping a time span across all trainers.
+
+BEGIN;
+
+CREATE INDEX idx_availability_open_slot
+ON TrainerAvailability USING gist (slot)
+WHERE is_booked = FALSE;
+
+COMMIT;
@@ -0,0 +1,80 @@
+-- Stores trainer availability as one coalesced tsmultirange of open time
+-- per trainer instead of one row per window. Requires PostgreSQL 14.
+--
+-- Existing open windows are merged per trainer; windows already marked
+-- booked are dropped, since their time is no longer open. book_pt_session
+-- now subtracts only the booked interval and no longer returns an
+-- availability id.
+
+BEGIN;
+
+ALTER TABLE TrainerAvailability RENAME TO TrainerAvailability_old;
+
+CREATE TABLE TrainerAvailability (
+    trainer_id   INT PRIMARY KEY REFERENCES Trainer(trainer_id) ON DELETE CASCADE,
+    open_slots   TSMULTIRANGE NOT NULL DEFAULT '{}'
+);
+
+INSERT INTO TrainerAvailability (trainer_id, open_slots)
+SELECT trainer_id, range_agg(slot)
+FROM TrainerAvailability_old
+WHERE is_booked = FALSE
+GROUP BY trainer_id;
+
+-- Also drops idx_availability_open_start_id and idx_availability_open_slot
+DROP TABLE TrainerAvailability_old;
+
+-- Books a PT session in a single statement so callers need one round trip.
+-- result_code is one of 'booked', 'not_available', 'pt_conflict' or
+-- 'class_conflict'; new_session_id is only set when the session was booked.
+DROP FUNCTION IF EXISTS book_pt_session(INT, INT, TIMESTAMP, TIMESTAMP);
+CREATE OR REPLACE FUNCTION book_pt_session(p_member_id INT, p_trainer_id INT, p_start TIMESTAMP, p_end TIMESTAMP)
+RETURNS TABLE (result_code TEXT, new_session_id INT) AS $$
+DECLARE
+    v_slot TSRANGE := tsrange(p_start, p_end);
+    v_open TSMULTIRANGE;
+    v_session_id INT;
+BEGIN
+    -- Locking the trainer's row serializes bookings for that trainer
+    SELECT open_slots INTO v_open
+    FROM TrainerAvailability
+    WHERE trainer_id = p_trainer_id
+    FOR UPDATE;
+
+    IF v_open IS NULL OR NOT v_open @> v_slot THEN
+        RETURN QUERY SELECT 'not_available'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM PersonalTrainingSession
+               WHERE trainer_id = p_trainer_id AND slot && v_slot) THEN
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM Class
+               WHERE trainer_id = p_trainer_id AND slot && v_slot) THEN
+        RETURN QUERY SELECT 'class_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    BEGIN
+        INSERT INTO PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
+        VALUES (p_member_id, p_trainer_id, p_start, p_end, 'scheduled')
+        RETURNING session_id INTO v_session_id;
+    EXCEPTION WHEN exclusion_violation THEN
+        -- A concurrent booking won the race for this trainer's time
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END;
+
+    -- Only the booked interval leaves the trainer's open time
+    UPDATE TrainerAvailability
+    SET open_slots = open_slots - tsmultirange(v_slot)
+    WHERE trainer_id = p_trainer_id;
+
+    RETURN QUERY SELECT 'booked'::TEXT, v_session_id;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
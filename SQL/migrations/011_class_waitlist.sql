@@ -0,0 +1,157 @@
+-- Distinct registration outcomes and a per-class waitlist: a full class now
+-- raises check_violation, register_for_class() registers or waitlists in
+-- one round trip, and a cancelled registration promotes the head of the
+-- waitlist.
+
+BEGIN;
+
+-- Members queued for a full class, promoted in waitlist_id order when a
+-- registration is cancelled
+CREATE TABLE ClassWaitlist (
+    waitlist_id  SERIAL PRIMARY KEY,
+    class_id     INT NOT NULL REFERENCES Class(class_id) ON DELETE CASCADE,
+    member_id    INT NOT NULL REFERENCES Member(member_id) ON DELETE CASCADE,
+    joined_at    TIMESTAMP NOT NULL DEFAULT NOW(),
+    UNIQUE (class_id, member_id)
+);
+
+CREATE INDEX idx_classwaitlist_class_order
+ON ClassWaitlist (class_id, waitlist_id);
+
+-- Claims a seat with one conditional update on the class row instead of
+-- counting registrations; the update also locks the row, so concurrent
+-- registrations for the same class cannot overbook it. A full class raises
+-- check_violation so callers can tell it apart from a duplicate.
+CREATE OR REPLACE FUNCTION enforce_class_capacity()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE Class
+    SET registered_count = registered_count + 1
+    WHERE class_id = NEW.class_id
+      AND registered_count < capacity;
+
+    -- A missing class is left for the foreign key to report
+    IF NOT FOUND AND EXISTS (SELECT 1 FROM Class WHERE class_id = NEW.class_id) THEN
+        RAISE EXCEPTION 'Class is full. Cannot register.' USING ERRCODE = 'check_violation';
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Gives a freed seat to the head of the class's waitlist. The class row is
+-- still locked by the decrement, so no new registrant can take the seat
+-- first; SKIP LOCKED passes over a waitlist entry another cancellation is
+-- already promoting.
+CREATE OR REPLACE FUNCTION release_class_seat()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_member_id INT;
+BEGIN
+    UPDATE Class
+    SET registered_count = registered_count - 1
+    WHERE class_id = OLD.class_id;
+
+    -- Nothing to promote into when the class itself is being deleted
+    IF NOT FOUND THEN
+        RETURN OLD;
+    END IF;
+
+    DELETE FROM ClassWaitlist
+    WHERE waitlist_id = (
+        SELECT w.waitlist_id
+        FROM ClassWaitlist w
+        WHERE w.class_id = OLD.class_id
+          AND w.member_id <> OLD.member_id
+          AND NOT EXISTS (SELECT 1 FROM ClassRegistration r
+                          WHERE r.class_id = w.class_id AND r.member_id = w.member_id)
+        ORDER BY w.waitlist_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING member_id INTO v_member_id;
+
+    IF v_member_id IS NOT NULL THEN
+        INSERT INTO ClassRegistration (class_id, member_id)
+        VALUES (OLD.class_id, v_member_id);
+    END IF;
+
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Registers a member in one round trip. result_code is one of
+-- 'registered', 'duplicate', 'waitlisted', 'full' or 'not_found';
+-- new_registration_id is set when registered and waitlist_position when
+-- waitlisted. A class that already looks full is answered from a plain
+-- read, so a rush of late registrants never queues on the class row lock.
+CREATE OR REPLACE FUNCTION register_for_class(p_member_id INT, p_class_id INT, p_waitlist BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (result_code TEXT, new_registration_id INT, waitlist_position INT) AS $$
+DECLARE
+    v_full BOOLEAN;
+    v_registration_id INT;
+    v_waitlist_id INT;
+BEGIN
+    SELECT registered_count >= capacity INTO v_full
+    FROM Class
+    WHERE class_id = p_class_id;
+
+    IF v_full IS NULL OR NOT EXISTS (SELECT 1 FROM Member WHERE member_id = p_member_id) THEN
+        RETURN QUERY SELECT 'not_found'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM ClassRegistration WHERE class_id = p_class_id AND member_id = p_member_id) THEN
+        RETURN QUERY SELECT 'duplicate'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF NOT v_full THEN
+        BEGIN
+            INSERT INTO ClassRegistration (class_id, member_id)
+            VALUES (p_class_id, p_member_id)
+            RETURNING registration_id INTO v_registration_id;
+        EXCEPTION
+            WHEN unique_violation THEN
+                -- A concurrent request for the same member got there first
+                RETURN QUERY SELECT 'duplicate'::TEXT, NULL::INT, NULL::INT;
+                RETURN;
+            WHEN check_violation THEN
+                -- The last seats went while this request waited for the row lock
+                v_full := TRUE;
+        END;
+    END IF;
+
+    IF NOT v_full THEN
+        DELETE FROM ClassWaitlist WHERE class_id = p_class_id AND member_id = p_member_id;
+        RETURN QUERY SELECT 'registered'::TEXT, v_registration_id, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF NOT p_waitlist THEN
+        RETURN QUERY SELECT 'full'::TEXT, NULL::INT, NULL::INT;
+        RETURN;
+    END IF;
+
+    INSERT INTO ClassWaitlist (class_id, member_id)
+    VALUES (p_class_id, p_member_id)
+    ON CONFLICT (class_id, member_id) DO NOTHING
+    RETURNING waitlist_id INTO v_waitlist_id;
+
+    -- Asking again keeps the member's original place
+    IF v_waitlist_id IS NULL THEN
+        SELECT waitlist_id INTO v_waitlist_id
+        FROM ClassWaitlist
+        WHERE class_id = p_class_id AND member_id = p_member_id;
+    END IF;
+
+    RETURN QUERY
+    SELECT 'waitlisted'::TEXT, NULL::INT, COUNT(*)::INT
+    FROM ClassWaitlist
+    WHERE class_id = p_class_id AND waitlist_id <= v_waitlist_id;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
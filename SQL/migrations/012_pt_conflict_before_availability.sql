@@ -0,0 +1,62 @@
+-- book_pt_session now checks the trainer's existing sessions before their
+-- open time. A booked interval is subtracted from open_slots, so with the
+-- old order a request overlapping a session always got 'not_available'
+-- and 'pt_conflict' was only returned after a lost race.
+
+BEGIN;
+
+-- Books a PT session in a single statement so callers need one round trip.
+-- result_code is one of 'booked', 'not_available', 'pt_conflict' or
+-- 'class_conflict'; new_session_id is only set when the session was booked.
+CREATE OR REPLACE FUNCTION book_pt_session(p_member_id INT, p_trainer_id INT, p_start TIMESTAMP, p_end TIMESTAMP)
+RETURNS TABLE (result_code TEXT, new_session_id INT) AS $$
+DECLARE
+    v_slot TSRANGE := tsrange(p_start, p_end);
+    v_open TSMULTIRANGE;
+    v_session_id INT;
+BEGIN
+    -- Locking the trainer's row serializes bookings for that trainer
+    SELECT open_slots INTO v_open
+    FROM TrainerAvailability
+    WHERE trainer_id = p_trainer_id
+    FOR UPDATE;
+
+    -- Booked time has already left open_slots, so sessions are checked
+    -- first for a clash with one to be reported as such
+    IF EXISTS (SELECT 1 FROM PersonalTrainingSession
+               WHERE trainer_id = p_trainer_id AND slot && v_slot) THEN
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF v_open IS NULL OR NOT v_open @> v_slot THEN
+        RETURN QUERY SELECT 'not_available'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM Class
+               WHERE trainer_id = p_trainer_id AND slot && v_slot) THEN
+        RETURN QUERY SELECT 'class_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END IF;
+
+    BEGIN
+        INSERT INTO PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
+        VALUES (p_member_id, p_trainer_id, p_start, p_end, 'scheduled')
+        RETURNING session_id INTO v_session_id;
+    EXCEPTION WHEN exclusion_violation THEN
+        -- A concurrent booking won the race for this trainer's time
+        RETURN QUERY SELECT 'pt_conflict'::TEXT, NULL::INT;
+        RETURN;
+    END;
+
+    -- Only the booked interval leaves the trainer's open time
+    UPDATE TrainerAvailability
+    SET open_slots = open_slots - tsmultirange(v_slot)
+    WHERE trainer_id = p_trainer_id;
+
+    RETURN QUERY SELECT 'booked'::TEXT, v_session_id;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,52 @@
+-- release_class_seat only promotes from the waitlist when the cancellation
+-- leaves a free seat. Promoting into a class whose capacity had been
+-- lowered below its registrations raised check_violation and rolled back
+-- the member's cancellation.
+
+BEGIN;
+
+-- Gives a freed seat to the head of the class's waitlist. The class row is
+-- still locked by the decrement, so no new registrant can take the seat
+-- first; SKIP LOCKED passes over a waitlist entry another cancellation is
+-- already promoting. A class whose capacity was lowered below its
+-- registrations has no seat to give until enough members leave.
+CREATE OR REPLACE FUNCTION release_class_seat()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_member_id INT;
+    v_has_seat BOOLEAN;
+BEGIN
+    UPDATE Class
+    SET registered_count = registered_count - 1
+    WHERE class_id = OLD.class_id
+    RETURNING registered_count < capacity INTO v_has_seat;
+
+    -- Nothing to promote into when the class itself is being deleted
+    IF NOT FOUND OR NOT v_has_seat THEN
+        RETURN OLD;
+    END IF;
+
+    DELETE FROM ClassWaitlist
+    WHERE waitlist_id = (
+        SELECT w.waitlist_id
+        FROM ClassWaitlist w
+        WHERE w.class_id = OLD.class_id
+          AND w.member_id <> OLD.member_id
+          AND NOT EXISTS (SELECT 1 FROM ClassRegistration r
+                          WHERE r.class_id = w.class_id AND r.member_id = w.member_id)
+        ORDER BY w.waitlist_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING member_id INTO v_member_id;
+
+    IF v_member_id IS NOT NULL THEN
+        INSERT INTO ClassRegistration (class_id, member_id)
+        VALUES (OLD.class_id, v_member_id);
+    END IF;
+
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
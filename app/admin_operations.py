@@ -1,197 +1,345 @@
-from psycopg2 import Error, IntegrityError
+from datetime import date, datetime, timedelta
+from psycopg2 import DataError, Error, IntegrityError
+from psycopg2.errors import CheckViolation, ExclusionViolation, ForeignKeyViolation
+from psycopg2.extras import RealDictCursor
+from records import CONFLICT, DATABASE_ERROR, DONE, INVALID, NOT_FOUND, Outcome, Room, ScheduledClass, Trainer
+import pagination
+import queries
+import read_cache
+import render
+import screens
+
+# Upper bound on one series, about ten years of weekly classes
+MAX_SERIES_OCCURRENCES = 520
+
+def _parse_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value).strip())
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else date.fromisoformat(str(value).strip())
+
+
+def series_occurrences(start_time, end_time, until, every_weeks=1, exceptions=()):
+    """Expands a weekly or biweekly class into [(start, end), ...].
+
+    The first occurrence is start_time-end_time; the series repeats every
+    every_weeks weeks up to and including the date until, skipping dates in
+    exceptions. Raises ValueError for an invalid series.
+    """
+    start, end = _parse_datetime(start_time), _parse_datetime(end_time)
+    until = _parse_date(until)
+    skip = {_parse_date(day) for day in exceptions}
+    if every_weeks not in (1, 2):
+        raise ValueError("Recurrence must be every 1 (weekly) or 2 (biweekly) weeks")
+    if end <= start:
+        raise ValueError("End time must be after start time")
+    step = timedelta(weeks=every_weeks)
+    if end - start >= step:
+        raise ValueError("A class cannot run longer than its recurrence interval")
+    if until < start.date():
+        raise ValueError("The series must end on or after its first class")
+
+    occurrences = []
+    while start.date() <= until:
+        if start.date() not in skip:
+            occurrences.append((start, end))
+            if len(occurrences) > MAX_SERIES_OCCURRENCES:
+                raise ValueError(f"A series can have at most {MAX_SERIES_OCCURRENCES} classes")
+        start, end = start + step, end + step
+    if not occurrences:
+        raise ValueError("Every date in the series is an exception")
+    return occurrences
+
 
 class AdminOperations:
     """Handles all administrative database operations"""
     
-    def __init__(self, db):
+    def __init__(self, db, schedule=None, cache=None):
         self.db = db
-        self.cursor = db.get_cursor()
-        self.connection = db.get_connection()
+        self.schedule = schedule
+        self.cache = cache
+
+    def _cached(self, key, loader, *args):
+        """Serve loader(*args) through the read cache when one is configured"""
+        if self.cache is None:
+            return loader(*args)
+        return self.cache.get_or_load(key, lambda: loader(*args))
+
+    def _fetch_all(self, record, query):
+        with self.db.connection() as conn, conn.cursor(cursor_factory=pagination.record_cursor(record)) as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+
+    def _invalidate(self, *namespaces):
+        if self.cache is not None:
+            self.cache.invalidate(*namespaces)
     
     def manage_room_booking(self, room_id, class_id, start_time, end_time):
         """Assign room to a class with conflict checking"""
-        # Check for room booking conflicts
-        conflict_query = """
-        SELECT 1
-        FROM Class
-        WHERE room_id = %s
-          AND (%s < end_time AND %s > start_time)
-          AND class_id != %s;
-        """
-        try:
-            self.cursor.execute(conflict_query, (room_id, end_time, start_time, class_id))
-            if self.cursor.fetchone():
-                print("Error: Room is already booked during this time.")
-                return False
+        if self.schedule is not None:
+            conflict = self.schedule.room_conflict(room_id, class_id, start_time, end_time)
+            if conflict:
+                return Outcome(False, CONFLICT, conflict)
             
-            # Update class with room assignment
-            update_query = """
-            UPDATE Class
-            SET room_id = %s
-            WHERE class_id = %s;
-            """
-            self.cursor.execute(update_query, (room_id, class_id))
-            self.connection.commit()
-            print(f"Room {room_id} successfully assigned to class {class_id}")
-            return True
+        try:
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                # Update class with room assignment; class_room_no_overlap
+                # rejects it if the room is booked during the class
+                cursor.execute(queries.ASSIGN_ROOM, (room_id, class_id))
+                conn.commit()
+            if self.schedule is not None:
+                self.schedule.move_class_room(class_id, room_id)
+            self._invalidate(read_cache.ALL_CLASSES)
+            return Outcome(True, DONE, f"Room {room_id} successfully assigned to class {class_id}")
             
+        except ExclusionViolation as e:
+            return Outcome(False, CONFLICT, queries.conflict_message(e))
+        except ForeignKeyViolation:
+            return Outcome(False, NOT_FOUND, f"No room found with ID {room_id}")
         except Error as e:
-            print(f"Database Error: {e}")
-            self.connection.rollback()
-            return False
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
     
     def create_class(self, trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity):
         """Create a new group fitness class"""
-        query = """
-        INSERT INTO Class (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING class_id;
-        """
-        try:
-            # Check trainer availability
-            trainer_check = """
-            SELECT 1 FROM Class
-            WHERE trainer_id = %s AND (%s < end_time AND %s > start_time);
-            """
-            self.cursor.execute(trainer_check, (trainer_id, end_time, start_time))
-            if self.cursor.fetchone():
-                print("Error: Trainer has conflicting class during this time.")
-                return False
-            
-            # Check room availability
-            room_check = """
-            SELECT 1 FROM Class
-            WHERE room_id = %s AND (%s < end_time AND %s > start_time);
-            """
-            self.cursor.execute(room_check, (room_id, end_time, start_time))
-            if self.cursor.fetchone():
-                print("Error: Room is already booked during this time.")
-                return False
+        if self.schedule is not None:
+            conflict = self.schedule.class_conflict(trainer_id, room_id, start_time, end_time)
+            if conflict:
+                return Outcome(False, CONFLICT, conflict)
             
-            # Insert the class
-            self.cursor.execute(query, (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity))
-            class_id = self.cursor.fetchone()[0]
-            self.connection.commit()
-            print(f"Class '{class_name}' created successfully! Class ID: {class_id}")
-            return True
+        try:
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                # Insert the class; the class_trainer_no_overlap and
+                # class_room_no_overlap constraints reject conflicting times
+                self.db.execute_prepared(cursor, "insert_class", (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity))
+                class_id = cursor.fetchone()[0]
+                conn.commit()
+            if self.schedule is not None:
+                self.schedule.record_class(class_id, trainer_id, room_id, start_time, end_time)
+            self._invalidate(read_cache.CLASSES, read_cache.ALL_CLASSES)
+            return Outcome(True, DONE, f"Class '{class_name}' created successfully! Class ID: {class_id}")
             
+        except ExclusionViolation as e:
+            return Outcome(False, CONFLICT, queries.conflict_message(e))
+        except ForeignKeyViolation as e:
+            return Outcome(False, NOT_FOUND, f"Unknown trainer, admin or room: {e.diag.message_detail}")
+        except (CheckViolation, DataError) as e:
+            return Outcome(False, INVALID, f"Invalid value: {e.diag.message_primary}")
+        except Error as e:
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
+
+    def book_class_series(self, trainer_id, admin_id, room_id, class_name, description, start_time, end_time,
+                          capacity, until, every_weeks=1, exceptions=()):
+        """Create every class of a recurring series, or none of them.
+
+        All occurrences are checked for trainer and room conflicts in one
+        query and inserted in one statement. Returns (classes, conflicts):
+        the created (class_id, start, end) rows, or an empty list and one
+        conflict row per clash. Raises ValueError for an invalid series.
+        """
+        occurrences = series_occurrences(start_time, end_time, until, every_weeks, exceptions)
+        starts = [start for start, _ in occurrences]
+        ends = [end for _, end in occurrences]
+
+        with self.db.connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(queries.CLASS_SERIES_CONFLICTS, (starts, ends, trainer_id, room_id, trainer_id))
+            conflicts = cursor.fetchall()
+            if conflicts:
+                return [], conflicts
+            # A booking committed since the check still trips the exclusion
+            # constraints, which roll back the whole series
+            cursor.execute(queries.INSERT_CLASS_SERIES, (trainer_id, admin_id, room_id, class_name, description, capacity, starts, ends))
+            classes = sorted(cursor.fetchall(), key=lambda row: row["start_time"])
+            conn.commit()
+
+        if self.schedule is not None:
+            for row in classes:
+                self.schedule.record_class(row["class_id"], trainer_id, room_id, row["start_time"], row["end_time"])
+        self._invalidate(read_cache.CLASSES, read_cache.ALL_CLASSES)
+        return classes, []
+
+    def create_class_series(self, trainer_id, admin_id, room_id, class_name, description, start_time, end_time,
+                            capacity, until, every_weeks=1, exceptions=()):
+        """Create a weekly or biweekly class series, reporting every conflict at once"""
+        try:
+            classes, conflicts = self.book_class_series(trainer_id, admin_id, room_id, class_name, description,
+                                                        start_time, end_time, capacity, until, every_weeks, exceptions)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+        except ExclusionViolation as e:
+            print(queries.conflict_message(e))
+            return False
         except Error as e:
             print(f"Database Error: {e}")
-            self.connection.rollback()
             return False
+
+        if conflicts:
+            print(f"Series not created: {len(conflicts)} conflict(s) found.")
+            for conflict in conflicts:
+                message = queries.SERIES_CONFLICT_MESSAGES[conflict["conflict"]].format(**conflict)
+                print(f"  {conflict['start_time']}: {message}")
+            return False
+
+        print(f"Class series '{class_name}' created: {len(classes)} classes from {classes[0]['start_time']} to {classes[-1]['start_time']}.")
+        return True
     
     def update_class(self, class_id, field, new_value):
         """Update class details (name, description, capacity, etc.)"""
         allowed_fields = ['class_name', 'description', 'start_time', 'end_time', 'capacity', 'room_id', 'trainer_id']
         if field not in allowed_fields:
-            print(f"Error: Cannot update '{field}'. Allowed fields: {', '.join(allowed_fields)}")
-            return False
+            return Outcome(False, INVALID, f"Error: Cannot update '{field}'. Allowed fields: {', '.join(allowed_fields)}")
         
-        query = f"UPDATE Class SET {field} = %s WHERE class_id = %s;"
         try:
-            self.cursor.execute(query, (new_value, class_id))
-            if self.cursor.rowcount == 0:
-                print(f"No class found with ID {class_id}")
-                return False
-            self.connection.commit()
-            print(f"Class {class_id} updated: {field} = {new_value}")
-            return True
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                if field == 'capacity':
+                    cursor.execute(queries.UPDATE_CLASS_CAPACITY, (new_value, class_id, new_value))
+                else:
+                    cursor.execute(queries.UPDATE_CLASS_FIELD.format(field=field), (new_value, class_id))
+                if cursor.rowcount == 0:
+                    cursor.execute(queries.CLASS_REGISTERED_COUNT, (class_id,))
+                    row = cursor.fetchone()
+                    if row is None:
+                        return Outcome(False, NOT_FOUND, f"No class found with ID {class_id}")
+                    return Outcome(False, INVALID, f"Error: Capacity cannot be below the {row[0]} member(s) already registered.")
+                cursor.execute(queries.CLASS_SLOT, (class_id,))
+                slot = cursor.fetchone()
+                conn.commit()
+            if self.schedule is not None:
+                self.schedule.record_class(class_id, *slot)
+            self._invalidate(read_cache.CLASSES, read_cache.ALL_CLASSES)
+            return Outcome(True, DONE, f"Class {class_id} updated: {field} = {new_value}")
+        except ExclusionViolation as e:
+            return Outcome(False, CONFLICT, queries.conflict_message(e))
+        except ForeignKeyViolation as e:
+            return Outcome(False, NOT_FOUND, f"Unknown {field}: {e.diag.message_detail}")
+        except (CheckViolation, DataError) as e:
+            return Outcome(False, INVALID, f"Invalid {field}: {e.diag.message_primary}")
         except Error as e:
-            print(f"Database Error: {e}")
-            self.connection.rollback()
-            return False
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
     
     def cancel_class(self, class_id):
         """Cancel/delete a class"""
-        query = "DELETE FROM Class WHERE class_id = %s;"
         try:
-            self.cursor.execute(query, (class_id,))
-            if self.cursor.rowcount == 0:
-                print(f"No class found with ID {class_id}")
-                return False
-            self.connection.commit()
-            print(f"Class {class_id} has been cancelled and removed.")
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(queries.DELETE_CLASS, (class_id,))
+                if cursor.rowcount == 0:
+                    return Outcome(False, NOT_FOUND, f"No class found with ID {class_id}")
+                conn.commit()
+            if self.schedule is not None:
+                self.schedule.remove_class(class_id)
+            self._invalidate(read_cache.CLASSES, read_cache.ALL_CLASSES)
+            return Outcome(True, DONE, f"Class {class_id} has been cancelled and removed.")
+        except Error as e:
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
+    
+    def get_class_times(self, class_id):
+        """Return (start_time, end_time) for a class, or None if it does not exist"""
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.CLASS_TIMES, (class_id,))
+            return cursor.fetchone()
+
+    def list_all_classes(self):
+        """Return all scheduled classes with registration counts as ScheduledClass records"""
+        return self._cached((read_cache.ALL_CLASSES,), self._fetch_all, ScheduledClass, queries.ALL_CLASSES)
+
+    def page_all_classes(self, page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None):
+        """Return one keyset page of all classes and the cursor for the next page"""
+        return self._cached((read_cache.ALL_CLASSES, page_size, cursor), pagination.fetch_page,
+                            self.db, ScheduledClass, queries.ALL_CLASSES_PAGE, (), ("start_time", "class_id"), page_size, cursor)
+
+    def iter_all_classes(self, itersize=pagination.DEFAULT_ITERSIZE):
+        """Stream all classes through a server-side cursor"""
+        return pagination.stream(self.db, ScheduledClass, queries.ALL_CLASSES, (), itersize)
+
+    def list_rooms(self):
+        """Return all rooms as Room records"""
+        return self._cached((read_cache.ROOMS,), self._fetch_all, Room, queries.ALL_ROOMS)
+
+    def list_trainers(self):
+        """Return all trainers as Trainer records"""
+        return self._cached((read_cache.TRAINERS,), self._fetch_all, Trainer, queries.ALL_TRAINERS)
+
+    def load_room_management(self):
+        """Return {"rooms": [Room], "classes": [ScheduledClass]} in at most one round trip"""
+        return screens.load(self.db, screens.ROOM_MANAGEMENT, cache=self.cache)
+
+    def load_class_setup(self):
+        """Return {"trainers": [Trainer], "rooms": [Room]} in at most one round trip"""
+        return screens.load(self.db, screens.CLASS_SETUP, cache=self.cache)
+
+    def view_room_management(self):
+        """View all rooms and all scheduled classes for assigning a room"""
+        try:
+            screen = self.load_room_management()
+            render.print_records(screen["rooms"], "\n=== AVAILABLE ROOMS ===", "No rooms available.")
+            render.print_records(screen["classes"], "\n=== ALL CLASSES ===", "No classes scheduled.")
             return True
         except Error as e:
             print(f"Database Error: {e}")
-            self.connection.rollback()
             return False
-    
-    def view_all_classes(self):
+
+    def view_class_setup(self):
+        """View all trainers and rooms for creating a class"""
+        try:
+            screen = self.load_class_setup()
+            render.print_records(screen["trainers"], "\n=== ALL TRAINERS ===", "No trainers found.")
+            render.print_records(screen["rooms"], "\n=== AVAILABLE ROOMS ===", "No rooms available.")
+            return True
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    def view_all_classes(self, itersize=pagination.DEFAULT_ITERSIZE):
         """View all scheduled classes with registration counts"""
-        query = """
-        SELECT 
-            c.class_id, 
-            c.class_name, 
-            t.first_name || ' ' || t.last_name AS trainer_name,
-            r.room_name,
-            c.start_time,
-            c.end_time,
-            COUNT(cr.member_id) AS registered,
-            c.capacity
-        FROM Class c
-        LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
-        LEFT JOIN Room r ON c.room_id = r.room_id
-        LEFT JOIN ClassRegistration cr ON c.class_id = cr.class_id
-        GROUP BY c.class_id, c.class_name, t.first_name, t.last_name, r.room_name, c.start_time, c.end_time, c.capacity
-        ORDER BY c.start_time;
-        """
         try:
-            self.cursor.execute(query)
-            classes = self.cursor.fetchall()
+            # A cached listing is already in memory; otherwise stream it
+            classes = self.list_all_classes() if self.cache is not None else self.iter_all_classes(itersize)
+            return render.print_records(classes, "\n=== ALL CLASSES ===", "No classes scheduled.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
             
-            if classes:
-                print("\n=== ALL CLASSES ===")
-                for cls in classes:
-                    print(f"ID: {cls[0]} | {cls[1]} | Trainer: {cls[2]} | Room: {cls[3]}")
-                    print(f"  Time: {cls[4]} to {cls[5]} | Registered: {cls[6]}/{cls[7]}")
-                    print()
+    def check_registration_counts(self, repair=False):
+        """Report (and optionally fix) classes whose registered_count has drifted"""
+        try:
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                # Lock out registrations while counting so the figures are stable
+                cursor.execute("LOCK TABLE ClassRegistration IN SHARE MODE;")
+                cursor.execute(queries.REGISTRATION_COUNT_DRIFT)
+                drift = cursor.fetchall()
+                if repair and drift:
+                    cursor.execute(queries.REPAIR_REGISTRATION_COUNTS)
+                conn.commit()
+
+            if not drift:
+                print("All class registration counts are consistent.")
                 return True
-            else:
-                print("No classes scheduled.")
-                return False
+
+            for class_id, stored, actual in drift:
+                print(f"Class {class_id}: registered_count={stored}, actual registrations={actual}")
+            if repair:
+                print(f"Repaired {len(drift)} class registration count(s).")
+                return True
+            return False
         except Error as e:
             print(f"Database Error: {e}")
             return False
     
     def view_all_rooms(self):
         """View all available rooms"""
-        query = "SELECT room_id, room_name, room_type, capacity, location FROM Room ORDER BY room_id;"
         try:
-            self.cursor.execute(query)
-            rooms = self.cursor.fetchall()
-            
-            if rooms:
-                print("\n=== AVAILABLE ROOMS ===")
-                for room in rooms:
-                    print(f"ID: {room[0]} | {room[1]} | Type: {room[2]} | Capacity: {room[3]} | Location: {room[4]}")
-                return True
-            else:
-                print("No rooms available.")
-                return False
+            return render.print_records(self.list_rooms(), "\n=== AVAILABLE ROOMS ===", "No rooms available.")
         except Error as e:
             print(f"Database Error: {e}")
             return False
     
     def view_all_trainers(self):
         """View all trainers"""
-        query = """
-        SELECT trainer_id, first_name, last_name, specialty, hourly_rate, email
-        FROM Trainer
-        ORDER BY trainer_id;
-        """
         try:
-            self.cursor.execute(query)
-            trainers = self.cursor.fetchall()
-            
-            if trainers:
-                print("\n=== ALL TRAINERS ===")
-                for trainer in trainers:
-                    print(f"ID: {trainer[0]} | {trainer[1]} {trainer[2]} | Specialty: {trainer[3]} | Rate: ${trainer[4]}/hr | Email: {trainer[5]}")
-                return True
-            else:
-                print("No trainers found.")
-                return False
+            return render.print_records(self.list_trainers(), "\n=== ALL TRAINERS ===", "No trainers found.")
         except Error as e:
             print(f"Database Error: {e}")
-            return False
\ No newline at end of file
+            return False
@@ -1,11 +1,20 @@
 import sys
+from psycopg2 import Error
 from database import Database
-from member_operations import MemberOperations
-from trainer_operations import TrainerOperations
-from admin_operations import AdminOperations
-from utils import Utils
+from service import build_service
+import render
 
-def login_menu(utils, db):
+def login(service, role, email, password):
+    """Log in through the service and report the result"""
+    try:
+        user_id = service.login(role, email, password)
+    except Error as e:
+        print(f"Database Error: {e}")
+        return None
+    print("Login successful!" if user_id is not None else "Invalid email or password.")
+    return user_id
+
+def login_menu(service):
     """Display login menu and handle authentication"""
     print("\n" + "="*50)
     print("   HEALTH & FITNESS CLUB MANAGEMENT SYSTEM")
@@ -26,7 +35,7 @@ def login_menu(utils, db):
         if sub_choice == "1":
             email = input("Email: ")
             password = input("Password: ")
-            return ("member", utils.login_user(email, password, "Member"))
+            return ("member", login(service, "member", email, password))
         elif sub_choice == "2":
             print("\n--- NEW MEMBER REGISTRATION ---")
             first_name = input("First Name: ")
@@ -39,26 +48,20 @@ def login_menu(utils, db):
             fitness_goal = input("Fitness Goal: ")
             
             # Register with password
-            db.cursor.execute("""
-                INSERT INTO Member (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-            """, (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password))
-            db.commit()
-            
-            print("\nRegistration successful! Please log in.")
-            return login_menu(utils, db)
+            render.print_outcome(service.register_member(first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password))
+            return login_menu(service)
     
     elif choice == "2":
         print("\n--- TRAINER LOGIN ---")
         email = input("Email: ")
         password = input("Password: ")
-        return ("trainer", utils.login_user(email, password, "Trainer"))
+        return ("trainer", login(service, "trainer", email, password))
     
     elif choice == "3":
         print("\n--- ADMIN LOGIN ---")
         email = input("Email: ")
         password = input("Password: ")
-        return ("admin", utils.login_user(email, password, "Admin"))
+        return ("admin", login(service, "admin", email, password))
     
     elif choice == "4":
         print("\nThank you for using the Fitness Club Management System!")
@@ -68,7 +71,7 @@ def login_menu(utils, db):
         print("Invalid option. Please try again.")
         return (None, None)
 
-def member_menu(member_ops, utils, user_id):
+def member_menu(service, user_id):
     """Member dashboard menu"""
     while True:
         print("\n" + "="*50)
@@ -92,11 +95,11 @@ def member_menu(member_ops, utils, user_id):
             if pm_choice == "1":
                 trait = input("Field to update (first_name, last_name, email, phone): ")
                 new_value = input(f"Enter new value for {trait}: ")
-                member_ops.update_personal_details(user_id, trait, new_value)
+                render.print_outcome(service.update_personal_details(user_id, trait, new_value))
             
             elif pm_choice == "2":
                 goal = input("Enter new fitness goal: ")
-                member_ops.update_fitness_goal(user_id, goal)
+                render.print_outcome(service.update_fitness_goal(user_id, goal))
             
             elif pm_choice == "3":
                 print("\n--- LOG HEALTH METRICS ---")
@@ -106,30 +109,45 @@ def member_menu(member_ops, utils, user_id):
                     heart_rate = int(input("Resting Heart Rate (bpm): "))
                     systolic = int(input("Systolic BP (mmHg): "))
                     diastolic = int(input("Diastolic BP (mmHg): "))
-                    member_ops.input_new_health_metric(user_id, "NOW()", weight, body_fat, heart_rate, systolic, diastolic)
+                    render.print_outcome(service.log_health_metric(user_id, weight, body_fat, heart_rate, systolic, diastolic))
                 except ValueError:
                     print("Invalid input. Please enter numeric values.")
         
         elif choice == "2":
-            utils.get_classes()
+            service.utils.get_classes()
+            print("\n1. Register for a Class")
+            print("2. Cancel a Registration")
+            reg_choice = input("Choose: ")
             try:
-                class_id = int(input("\nEnter Class ID to register: "))
-                member_ops.register_member_to_class(user_id, class_id)
+                if reg_choice == "1":
+                    class_id = int(input("\nEnter Class ID to register: "))
+                    service.member_ops.register_member_to_class(user_id, class_id)
+                elif reg_choice == "2":
+                    class_id = int(input("\nEnter Class ID to cancel: "))
+                    render.print_outcome(service.member_ops.cancel_class_registration(user_id, class_id))
             except ValueError:
                 print("Invalid class ID.")
         
         elif choice == "3":
-            utils.get_trainer_availability()
+            if input("Search for the earliest open slots? (yes/no): ").lower() == "yes":
+                try:
+                    duration = int(input("Session length in minutes: "))
+                    specialty = input("Specialty (blank for any): ")
+                    service.utils.show_pt_slots(duration, specialty or None)
+                except ValueError:
+                    print("Invalid input.")
+            else:
+                service.utils.get_trainer_availability()
             try:
                 trainer_id = int(input("\nEnter Trainer ID: "))
                 start_time = input("Start Time (YYYY-MM-DD HH:MM:SS): ")
                 end_time = input("End Time (YYYY-MM-DD HH:MM:SS): ")
-                member_ops.schedule_personal_training_session(user_id, trainer_id, start_time, end_time)
+                service.member_ops.schedule_personal_training_session(user_id, trainer_id, start_time, end_time)
             except ValueError:
                 print("Invalid input.")
         
         elif choice == "4":
-            member_ops.fetch_member_dashboard(user_id)
+            service.member_ops.fetch_member_dashboard(user_id)
         
         elif choice == "5":
             print("\nLogging out...")
@@ -138,7 +156,7 @@ def member_menu(member_ops, utils, user_id):
         else:
             print("Invalid option.")
 
-def trainer_menu(trainer_ops, utils, user_id):
+def trainer_menu(service, user_id):
     """Trainer dashboard menu"""
     while True:
         print("\n" + "="*50)
@@ -155,15 +173,14 @@ def trainer_menu(trainer_ops, utils, user_id):
             print("\n--- SET AVAILABILITY ---")
             start_time = input("Start Time (YYYY-MM-DD HH:MM:SS): ")
             end_time = input("End Time (YYYY-MM-DD HH:MM:SS): ")
-            trainer_ops.set_trainer_availability(user_id, start_time, end_time)
+            render.print_outcome(service.set_availability(user_id, start_time, end_time))
         
         elif choice == "2":
-            trainer_ops.view_schedule(user_id)
+            service.trainer_ops.view_schedule(user_id)
         
         elif choice == "3":
-            utils.get_member_names_for_lookup()
-            name = input("\nEnter member's first or last name: ")
-            trainer_ops.member_lookup_by_name(name)
+            name = input("\nEnter member's name (or part of it): ")
+            service.trainer_ops.member_lookup_by_name(name)
         
         elif choice == "4":
             print("\nLogging out...")
@@ -171,7 +188,7 @@ def trainer_menu(trainer_ops, utils, user_id):
         
         else:
             print("Invalid option.")
-def admin_menu(admin_ops, utils, user_id, db):
+def admin_menu(service, user_id):
     """Admin dashboard menu"""
     while True:
         print("\n" + "="*50)
@@ -190,12 +207,13 @@ def admin_menu(admin_ops, utils, user_id, db):
             print("2. Update Class")
             print("3. Cancel Class")
             print("4. View All Classes")
+            print("5. Check Registration Counts")
+            print("6. Create Recurring Class Series")
             cm_choice = input("Choose: ")
             
             if cm_choice == "1":
                 print("\n--- CREATE NEW CLASS ---")
-                admin_ops.view_all_trainers()
-                admin_ops.view_all_rooms()
+                service.admin_ops.view_class_setup()
                 try:
                     trainer_id = int(input("Trainer ID: "))
                     room_id = int(input("Room ID: "))
@@ -204,52 +222,71 @@ def admin_menu(admin_ops, utils, user_id, db):
                     start_time = input("Start Time (YYYY-MM-DD HH:MM:SS): ")
                     end_time = input("End Time (YYYY-MM-DD HH:MM:SS): ")
                     capacity = int(input("Capacity: "))
-                    admin_ops.create_class(trainer_id, user_id, room_id, class_name, description, start_time, end_time, capacity)
+                    render.print_outcome(service.create_class(trainer_id, user_id, room_id, class_name, description, start_time, end_time, capacity))
                 except ValueError:
                     print("Invalid input.")
             
             elif cm_choice == "2":
-                admin_ops.view_all_classes()
+                service.admin_ops.view_all_classes()
                 try:
                     class_id = int(input("\nClass ID to update: "))
                     field = input("Field to update (class_name, description, capacity, start_time, end_time): ")
                     new_value = input(f"New value for {field}: ")
-                    admin_ops.update_class(class_id, field, new_value)
+                    render.print_outcome(service.update_class(class_id, field, new_value))
                 except ValueError:
                     print("Invalid input.")
             
             elif cm_choice == "3":
-                admin_ops.view_all_classes()
+                service.admin_ops.view_all_classes()
                 try:
                     class_id = int(input("\nClass ID to cancel: "))
                     confirm = input(f"Confirm cancellation of class {class_id}? (yes/no): ")
                     if confirm.lower() == "yes":
-                        admin_ops.cancel_class(class_id)
+                        render.print_outcome(service.cancel_class(class_id))
                 except ValueError:
                     print("Invalid input.")
             
             elif cm_choice == "4":
-                admin_ops.view_all_classes()
+                service.admin_ops.view_all_classes()
+
+            elif cm_choice == "5":
+                if not service.admin_ops.check_registration_counts():
+                    confirm = input("Repair these counts? (yes/no): ")
+                    if confirm.lower() == "yes":
+                        service.admin_ops.check_registration_counts(repair=True)
+
+            elif cm_choice == "6":
+                print("\n--- CREATE RECURRING CLASS SERIES ---")
+                service.admin_ops.view_class_setup()
+                try:
+                    trainer_id = int(input("Trainer ID: "))
+                    room_id = int(input("Room ID: "))
+                    class_name = input("Class Name: ")
+                    description = input("Description: ")
+                    start_time = input("First Class Start Time (YYYY-MM-DD HH:MM:SS): ")
+                    end_time = input("First Class End Time (YYYY-MM-DD HH:MM:SS): ")
+                    capacity = int(input("Capacity: "))
+                    until = input("Repeat Until (YYYY-MM-DD): ")
+                    every_weeks = int(input("Repeat every 1 (weekly) or 2 (biweekly) weeks: "))
+                    skipped = input("Dates to skip (YYYY-MM-DD, comma-separated, blank for none): ")
+                    exceptions = [day for day in skipped.replace(" ", "").split(",") if day]
+                    service.admin_ops.create_class_series(trainer_id, user_id, room_id, class_name, description,
+                                                          start_time, end_time, capacity, until, every_weeks, exceptions)
+                except ValueError:
+                    print("Invalid input.")
         
         elif choice == "2":
             print("\n--- ROOM MANAGEMENT ---")
-            admin_ops.view_all_rooms()
-            admin_ops.view_all_classes()
+            service.admin_ops.view_room_management()
             try:
                 class_id = int(input("\nClass ID to assign room: "))
                 room_id = int(input("Room ID: "))
-                # Get class times
-                db.cursor.execute("SELECT start_time, end_time FROM Class WHERE class_id = %s", (class_id,))
-                times = db.cursor.fetchone()
-                if times:
-                    admin_ops.manage_room_booking(room_id, class_id, times[0], times[1])
-                else:
-                    print("Class not found.")
+                render.print_outcome(service.book_room(class_id, room_id))
             except ValueError:
                 print("Invalid input.")
         
         elif choice == "3":
-            admin_ops.view_all_trainers()
+            service.admin_ops.view_all_trainers()
         
         elif choice == "4":
             print("\nLogging out...")
@@ -259,19 +296,22 @@ def admin_menu(admin_ops, utils, user_id, db):
             print("Invalid option.")
 
 if __name__ == "__main__":
-    # Initialize database connection
+    # Initialize database connection pool
     db = Database()
+    try:
+        db.connect()
+    except Error as e:
+        print(f"Failed to connect to database: {e}")
+        sys.exit(1)
+    print("Database connection pool established successfully.")
     
-    # Initialize operation modules
-    member_ops = MemberOperations(db)
-    trainer_ops = TrainerOperations(db)
-    admin_ops = AdminOperations(db)
-    utils = Utils(db)
+    # Initialize the service layer shared with the HTTP server
+    service = build_service(db)
     
     try:
         # Main application loop
         while True:
-            role, user_id = login_menu(utils, db)
+            role, user_id = login_menu(service)
             
             if user_id is None:
                 continue
@@ -279,11 +319,11 @@ if __name__ == "__main__":
             print(f"\nWelcome! Logged in as {role} (ID: {user_id})")
             
             if role == "member":
-                member_menu(member_ops, utils, user_id)
+                member_menu(service, user_id)
             elif role == "trainer":
-                trainer_menu(trainer_ops, utils, user_id)
+                trainer_menu(service, user_id)
             elif role == "admin":
-                admin_menu(admin_ops, utils, user_id, db)
+                admin_menu(service, user_id)
     
     except KeyboardInterrupt:
         print("\n\nApplication interrupted by user.")
@@ -291,4 +331,5 @@ if __name__ == "__main__":
     finally:
         # Close database connection
         db.close()
-        print("Goodbye!")
\ No newline at end of file
+        print("Database connection closed.")
+        print("Goodbye!")
@@ -0,0 +1,55 @@
+from contextlib import asynccontextmanager
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+class AsyncDatabase:
+    """Manages an asyncio connection pool for the async operation classes"""
+
+    def __init__(self, minconn=1, maxconn=20, dbname="Final Project", user="postgres",
+                 password="postgres", host="localhost", port="5432"):
+        conninfo = make_conninfo(dbname=dbname, user=user, password=password, host=host, port=port)
+        self.pool = AsyncConnectionPool(
+            conninfo,
+            min_size=minconn,
+            max_size=maxconn,
+            check=AsyncConnectionPool.check_connection,
+            open=False
+        )
+
+    async def open(self):
+        """Opens the pool and waits for the minimum number of connections"""
+        await self.pool.open(wait=True)
+        print("Async database connection pool established successfully.")
+
+    @asynccontextmanager
+    async def connection(self, autocommit=False):
+        """Checks out a connection as an async context manager.
+
+        The connection is rolled back if the block raises and returned to
+        the pool afterwards. With autocommit=True each statement commits on
+        its own for the duration of the block.
+        """
+        async with self.pool.connection() as conn:
+            if autocommit:
+                await conn.set_autocommit(True)
+            try:
+                yield conn
+            finally:
+                if autocommit and not conn.closed:
+                    await conn.set_autocommit(False)
+
+    def stats(self):
+        """Returns a snapshot of pool usage statistics"""
+        return self.pool.get_stats()
+
+    async def close(self):
+        """Closes all pooled connections"""
+        await self.pool.close()
+        print("Async database connection closed.")
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
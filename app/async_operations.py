@@ -0,0 +1,425 @@
+from psycopg import Error, IntegrityError
+from psycopg.errors import ExclusionViolation
+from psycopg.rows import args_row
+from auth import shared_hasher
+from records import (AvailabilitySlot, ClassListing, Dashboard, MemberMatch, MemberName, Room, ScheduledClass,
+                     Session, Trainer, TrainerClass)
+import queries
+import render
+
+# Asyncio counterparts of MemberOperations, TrainerOperations,
+# AdminOperations and Utils. They run the same SQL from queries.py and keep
+# the same return values and record types, so the two APIs behave identically.
+
+async def _fetch_all(db, record, query, params=()):
+    """Runs query and returns its rows as record instances"""
+    async with db.connection() as conn, conn.cursor(row_factory=args_row(record)) as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+class AsyncMemberOperations:
+    """Handles all member-related database operations (asyncio)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def get_member_dashboard(self, member_id):
+        """Return the member's Dashboard records"""
+        return await _fetch_all(self.db, Dashboard, queries.MEMBER_DASHBOARD, (member_id,))
+
+    async def fetch_member_dashboard(self, member_id):
+        """Display member dashboard with health metrics, goals, and activity summary"""
+        try:
+            return render.print_records(await self.get_member_dashboard(member_id), "\n=== MEMBER DASHBOARD ===",
+                                        "No dashboard data found.")
+        except Error as e:
+            print(f"Error fetching dashboard: {e}")
+            return False
+
+    async def claim_class_seat(self, member_id, class_id, waitlist=True):
+        """Register or waitlist a member in a single round trip; returns (result_code, registration_id, waitlist_position)"""
+        async with self.db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+            await cursor.execute(queries.REGISTER_FOR_CLASS, (member_id, class_id, waitlist))
+            return await cursor.fetchone()
+
+    async def register_member_to_class(self, member_id, class_id, waitlist=True):
+        """Register a member to a group fitness class"""
+        try:
+            result, _, position = await self.claim_class_seat(member_id, class_id, waitlist)
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+        if result == queries.WAITLISTED:
+            print(f"Class {class_id} is full. You are number {position} on the waitlist.")
+            return False
+        if result != queries.REGISTERED:
+            print(queries.REGISTRATION_MESSAGES[result])
+            return False
+
+        print(f"Successfully registered to class {class_id}!")
+        return True
+
+    async def cancel_class_registration(self, member_id, class_id):
+        """Cancel a class registration or leave its waitlist; a freed seat goes to the next waitlisted member"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(queries.CANCEL_CLASS_REGISTRATION, (class_id, member_id, class_id, member_id))
+                registrations, waitlisted = await cursor.fetchone()
+                await conn.commit()
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+        if registrations:
+            print(f"Registration for class {class_id} cancelled.")
+            return True
+        if waitlisted:
+            print(f"Removed from the waitlist for class {class_id}.")
+            return True
+        print(f"No registration found for class {class_id}.")
+        return False
+
+    async def add_user(self, first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at):
+        """Register a new member to the system"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(queries.ADD_MEMBER, (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at))
+                await conn.commit()
+            print("User registration successful!")
+            return True
+        except IntegrityError as e:
+            print(f"Registration failed - Email already exists: {e}")
+            return False
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def update_personal_details(self, member_id, trait, updated_value):
+        """Update member personal information (name, email, phone)"""
+        allowed_traits = ['first_name', 'last_name', 'email', 'phone', 'date_of_birth', 'gender']
+        if trait not in allowed_traits:
+            print(f"Error: Cannot update '{trait}'. Allowed fields: {', '.join(allowed_traits)}")
+            return False
+
+        query = queries.UPDATE_MEMBER_FIELD.format(field=trait)
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(query, (updated_value, member_id))
+                await conn.commit()
+            print(f"Successfully updated {trait} to '{updated_value}'")
+            return True
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def update_fitness_goal(self, member_id, fitness_goal):
+        """Update member's fitness goal"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(queries.UPDATE_FITNESS_GOAL, (fitness_goal, member_id))
+                await conn.commit()
+            print(f"Fitness goal updated to: '{fitness_goal}'")
+            return True
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def input_new_health_metric(self, member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp):
+        """Log new health metrics for progress tracking"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(queries.INSERT_HEALTH_METRIC, (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp))
+                await conn.commit()
+            print("Health metrics recorded successfully!")
+            return True
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def book_personal_training(self, member_id, trainer_id, start_time, end_time):
+        """Book a PT session in a single round trip; returns (result_code, session_id)"""
+        async with self.db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+            await cursor.execute(queries.BOOK_PT_SESSION, (member_id, trainer_id, start_time, end_time))
+            result, session_id = await cursor.fetchone()
+        return result, session_id
+
+    async def schedule_personal_training_session(self, member_id, trainer_id, start_time, end_time):
+        """Schedule a personal training session with availability validation"""
+        try:
+            result, session_id = await self.book_personal_training(member_id, trainer_id, start_time, end_time)
+        except Exception as e:
+            print(f"Database Error: {e}")
+            return False
+
+        if result != queries.PT_BOOKED:
+            print(queries.PT_BOOKING_MESSAGES[result])
+            return False
+
+        print(f"PT session booked successfully! Session ID: {session_id}")
+        return True
+
+
+class AsyncTrainerOperations:
+    """Handles all trainer-related database operations (asyncio)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def set_trainer_availability(self, trainer_id, start_time, end_time):
+        """Add an availability period, merging it with adjacent or overlapping ones"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(queries.ADD_TRAINER_AVAILABILITY, (trainer_id, start_time, end_time))
+                windows = await cursor.fetchall()
+                await conn.commit()
+            if not windows:
+                print("Error: The availability window is empty; end time must be after start time.")
+                return False
+            print(f"Availability set successfully from {start_time} to {end_time}")
+            print(f"You now have {len(windows)} open window(s).")
+            return True
+
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def get_schedule(self, trainer_id):
+        """Return the trainer's PT sessions and classes as Session and TrainerClass records, in one round trip"""
+        async with self.db.connection() as conn, conn.pipeline():
+            # Both queries are sent before the first result is read
+            sessions = conn.cursor(row_factory=args_row(Session))
+            classes = conn.cursor(row_factory=args_row(TrainerClass))
+            await sessions.execute(queries.TRAINER_PT_SESSIONS, (trainer_id,))
+            await classes.execute(queries.TRAINER_CLASSES, (trainer_id,))
+            return {"pt_sessions": await sessions.fetchall(), "classes": await classes.fetchall()}
+
+    async def view_schedule(self, trainer_id):
+        """View all upcoming PT sessions and classes for the trainer"""
+        print("\n=== SCHEDULE ===")
+
+        try:
+            schedule = await self.get_schedule(trainer_id)
+            render.print_records(schedule["pt_sessions"], "\n--- Personal Training Sessions ---", "\nNo upcoming PT sessions.")
+            render.print_records(schedule["classes"], "\n--- Group Classes ---", "\nNo upcoming classes.")
+            return True
+
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def find_members_by_name(self, name, page=1, page_size=20):
+        """Return one page of MemberMatch records ranked by name similarity, with their latest health metrics"""
+        term = name.strip().lower()
+        return await _fetch_all(self.db, MemberMatch, queries.MEMBER_SEARCH,
+                                (term, term, f"%{queries.like_escape(term)}%", page_size, (page - 1) * page_size))
+
+    async def member_lookup_by_name(self, name, page=1, page_size=20):
+        """Search for members by name and view their health profiles"""
+        try:
+            results = await self.find_members_by_name(name, page, page_size)
+            return render.print_records(results, f"\n=== MEMBER SEARCH: '{name}' (page {page}) ===",
+                                        f"No member found with name matching '{name}'")
+
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+
+class AsyncAdminOperations:
+    """Handles all administrative database operations (asyncio)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def manage_room_booking(self, room_id, class_id, start_time, end_time):
+        """Assign room to a class with conflict checking"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                # Update class with room assignment; class_room_no_overlap
+                # rejects it if the room is booked during the class
+                await cursor.execute(queries.ASSIGN_ROOM, (room_id, class_id))
+                await conn.commit()
+            print(f"Room {room_id} successfully assigned to class {class_id}")
+            return True
+
+        except ExclusionViolation as e:
+            print(queries.conflict_message(e))
+            return False
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def create_class(self, trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity):
+        """Create a new group fitness class"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                # Insert the class; the class_trainer_no_overlap and
+                # class_room_no_overlap constraints reject conflicting times
+                await cursor.execute(queries.INSERT_CLASS, (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity))
+                class_id = (await cursor.fetchone())[0]
+                await conn.commit()
+            print(f"Class '{class_name}' created successfully! Class ID: {class_id}")
+            return True
+
+        except ExclusionViolation as e:
+            print(queries.conflict_message(e))
+            return False
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def update_class(self, class_id, field, new_value):
+        """Update class details (name, description, capacity, etc.)"""
+        allowed_fields = ['class_name', 'description', 'start_time', 'end_time', 'capacity', 'room_id', 'trainer_id']
+        if field not in allowed_fields:
+            print(f"Error: Cannot update '{field}'. Allowed fields: {', '.join(allowed_fields)}")
+            return False
+
+        query = queries.UPDATE_CLASS_FIELD.format(field=field)
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(query, (new_value, class_id))
+                if cursor.rowcount == 0:
+                    print(f"No class found with ID {class_id}")
+                    return False
+                await conn.commit()
+            print(f"Class {class_id} updated: {field} = {new_value}")
+            return True
+        except ExclusionViolation as e:
+            print(queries.conflict_message(e))
+            return False
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def cancel_class(self, class_id):
+        """Cancel/delete a class"""
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(queries.DELETE_CLASS, (class_id,))
+                if cursor.rowcount == 0:
+                    print(f"No class found with ID {class_id}")
+                    return False
+                await conn.commit()
+            print(f"Class {class_id} has been cancelled and removed.")
+            return True
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def list_all_classes(self):
+        """Return all scheduled classes with registration counts as ScheduledClass records"""
+        return await _fetch_all(self.db, ScheduledClass, queries.ALL_CLASSES)
+
+    async def list_rooms(self):
+        """Return all rooms as Room records"""
+        return await _fetch_all(self.db, Room, queries.ALL_ROOMS)
+
+    async def list_trainers(self):
+        """Return all trainers as Trainer records"""
+        return await _fetch_all(self.db, Trainer, queries.ALL_TRAINERS)
+
+    async def view_all_classes(self):
+        """View all scheduled classes with registration counts"""
+        try:
+            return render.print_records(await self.list_all_classes(), "\n=== ALL CLASSES ===", "No classes scheduled.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def view_all_rooms(self):
+        """View all available rooms"""
+        try:
+            return render.print_records(await self.list_rooms(), "\n=== AVAILABLE ROOMS ===", "No rooms available.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def view_all_trainers(self):
+        """View all trainers"""
+        try:
+            return render.print_records(await self.list_trainers(), "\n=== ALL TRAINERS ===", "No trainers found.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+
+class AsyncUtils:
+    """Utility functions for common queries and helper operations (asyncio)"""
+
+    def __init__(self, db, hasher=None):
+        self.db = db
+        self.hasher = hasher or shared_hasher()
+
+    async def list_classes(self):
+        """Return all classes with registration counts as ClassListing records"""
+        return await _fetch_all(self.db, ClassListing, queries.CLASS_LISTING)
+
+    async def list_trainer_availability(self):
+        """Return available trainer time slots as AvailabilitySlot records"""
+        return await _fetch_all(self.db, AvailabilitySlot, queries.AVAILABLE_TRAINER_SLOTS)
+
+    async def list_member_names(self):
+        """Return all member names for trainer lookup as MemberName records"""
+        return await _fetch_all(self.db, MemberName, queries.MEMBER_NAMES)
+
+    async def get_classes(self):
+        """Display all classes with registration counts"""
+        try:
+            return render.print_records(await self.list_classes(), "\n=== AVAILABLE CLASSES ===", "No classes available.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def get_trainer_availability(self):
+        """Display available trainer time slots"""
+        try:
+            return render.print_records(await self.list_trainer_availability(), "\n=== AVAILABLE TRAINER SLOTS ===",
+                                        "No trainer availability at this time.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def get_member_names_for_lookup(self):
+        """Display all member names for trainer lookup"""
+        try:
+            return render.print_records(await self.list_member_names(), "\n=== REGISTERED MEMBERS ===", "No members found.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    async def login_user(self, email, password, table):
+        """Authenticate user login"""
+        query = queries.LOGIN_USER.format(table_lower=table.lower(), table=table)
+        try:
+            async with self.db.connection() as conn, conn.cursor() as cursor:
+                await cursor.execute(query, (email,))
+                row = await cursor.fetchone()
+
+            if row is None:
+                # Spend the same hashing time so unknown emails are not detectable
+                await self.hasher.verify_async(password, None)
+                print("No account found with that email.")
+                return None
+
+            user_id, stored_password = row
+            # Hashing runs on the worker pool so the event loop keeps serving
+            matches, needs_rehash = await self.hasher.verify_async(password, stored_password)
+
+            if matches:
+                if needs_rehash:
+                    update = queries.UPDATE_PASSWORD.format(table_lower=table.lower(), table=table)
+                    password_hash = await self.hasher.hash_async(password)
+                    async with self.db.connection() as conn, conn.cursor() as cursor:
+                        await cursor.execute(update, (password_hash, user_id))
+                        await conn.commit()
+                print("Login successful!")
+                return user_id
+
+            print("Incorrect password.")
+            return None
+        except Error as e:
+            print(f"Database Error: {e}")
+            return None
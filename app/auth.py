@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import queries
+
+HASH_SCHEME = "pbkdf2_sha256"
+HASH_ITERATIONS = 600_000
+SESSION_TTL = 8 * 60 * 60
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def is_hashed(stored):
+    """True if a stored password is in the hashed format rather than legacy plaintext"""
+    return stored.startswith(HASH_SCHEME + "$")
+
+
+def hash_password(password, iterations=HASH_ITERATIONS):
+    """Hashes a password as pbkdf2_sha256$iterations$salt$digest"""
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password, stored):
+    """Checks a password against a stored value; returns (matches, needs_rehash).
+
+    Legacy plaintext values still verify but report needs_rehash, as do
+    hashes made with fewer than HASH_ITERATIONS iterations.
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        iterations = int(iterations)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _b64decode(salt), iterations)
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(digest, _b64decode(expected))
+    return matches, matches and iterations < HASH_ITERATIONS
+
+
+# Verified against when an email is unknown, so a miss costs as much as a hit
+_DUMMY_HASH = "pbkdf2_sha256$600000$eLh_rujJcXG9NYCi0KIdcA$Uj2DWMHBWMkLwFyhoq78CAdYzWUqT5Ly3uoGGshbrAU"
+
+class PasswordHasher:
+    """Runs password hashing on a bounded worker pool.
+
+    hashlib releases the GIL while hashing, so the workers run in parallel
+    and at most `workers` hashes are in flight however many requests arrive.
+    hash() and verify() still block the calling thread until their hash is
+    done; only hash_async() and verify_async() leave the caller free, which
+    keeps an event loop serving while PBKDF2 runs. Use shared_hasher()
+    rather than one instance per caller.
+    """
+
+    def __init__(self, workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2,
+                                           thread_name_prefix="password-hasher")
+
+    def hash(self, password):
+        """Blocks until the hash is computed on a worker"""
+        return self.executor.submit(hash_password, password).result()
+
+    def verify(self, password, stored):
+        """Blocks until verified; returns (matches, needs_rehash), and stored=None burns the same time and fails"""
+        if stored is None:
+            self.executor.submit(verify_password, password, _DUMMY_HASH).result()
+            return False, False
+        return self.executor.submit(verify_password, password, stored).result()
+
+    async def hash_async(self, password):
+        return await asyncio.wrap_future(self.executor.submit(hash_password, password))
+
+    async def verify_async(self, password, stored):
+        if stored is None:
+            await asyncio.wrap_future(self.executor.submit(verify_password, password, _DUMMY_HASH))
+            return False, False
+        return await asyncio.wrap_future(self.executor.submit(verify_password, password, stored))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_hasher():
+    """Returns the process-wide PasswordHasher, creating it on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PasswordHasher()
+        return _shared
+
+
+class SessionStore:
+    """In-memory sessions identified by HMAC-signed tokens.
+
+    A token carries its session id, role, user id and expiry plus a
+    signature, so authenticate() needs no database query. Sessions live
+    only in this process; the secret defaults to CLUB_SESSION_SECRET or a
+    random per-process key.
+    """
+
+    def __init__(self, secret=None, ttl=SESSION_TTL):
+        secret = secret or os.environ.get("CLUB_SESSION_SECRET")
+        self.secret = secret.encode() if secret else secrets.token_bytes(32)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    def create(self, role, user_id):
+        """Starts a session and returns its token"""
+        now = time.time()
+        session = {"sid": secrets.token_hex(16), "role": role, "user_id": user_id, "expires_at": int(now + self.ttl)}
+        payload = _b64encode(json.dumps(session, separators=(",", ":")).encode())
+        with self._lock:
+            for sid in [sid for sid, s in self._sessions.items() if s["expires_at"] <= now]:
+                del self._sessions[sid]
+            self._sessions[session["sid"]] = session
+        return f"{payload}.{self._sign(payload)}"
+
+    def authenticate(self, token):
+        """Returns the session for a valid, unexpired, unrevoked token, else None"""
+        payload, _, signature = (token or "").partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        with self._lock:
+            session = self._sessions.get(claims.get("sid"))
+        if session is None or session["expires_at"] <= time.time():
+            return None
+        return session
+
+    def revoke(self, token):
+        """Ends the session behind a token; returns False if it was not active"""
+        session = self.authenticate(token)
+        if session is None:
+            return False
+        with self._lock:
+            return self._sessions.pop(session["sid"], None) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+def migrate_passwords(db, batch_size=500):
+    """Hashes every legacy plaintext password in Admin, Member and Trainer"""
+    hasher = shared_hasher()
+    migrated = 0
+    for table in ("Admin", "Member", "Trainer"):
+        select = queries.LEGACY_PASSWORDS.format(table_lower=table.lower(), table=table)
+        update = queries.UPDATE_PASSWORD.format(table_lower=table.lower(), table=table)
+        while True:
+            with db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(select, (HASH_SCHEME + "$", batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                hashes = hasher.executor.map(hash_password, [password for _, password in rows])
+                cursor.executemany(update, [(hashed, user_id) for (user_id, _), hashed in zip(rows, hashes)])
+                conn.commit()
+            migrated += len(rows)
+            print(f"{table}: hashed {len(rows)} password(s)")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Account maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate-passwords", help="hash all remaining plaintext passwords")
+    migrate.add_argument("--batch-size", type=int, default=500)
+
+    args = parser.parse_args()
+    # Imported here so the hashing helpers load without the database driver
+    from database import Database
+
+    db = Database()
+    try:
+        if args.command == "migrate-passwords":
+            print(f"Hashed {migrate_passwords(db, args.batch_size)} password(s) in total.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+import argparse
+import contextlib
+import csv
+import inspect
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from admin_operations import AdminOperations
+from database import Database
+from member_operations import MemberOperations
+from trainer_operations import TrainerOperations
+from utils import Utils
+import datagen
+import queries
+
+# Benchmarks write their fixtures far in the future so they never collide
+# with real bookings, and delete them again afterwards.
+FIXTURE_START = datetime(2099, 1, 1)
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+
+def _print_summary(name, summary):
+    print(f"{name:<36} runs={summary['runs']:<5} mean={summary['mean_ms']:.2f}ms "
+          f"p50={summary['p50_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms"
+          + (f" statements={summary['statements']:.1f}" if "statements" in summary else ""))
+
+
+def _book_multi_statement(db, member_id, trainer_id, start_time, end_time):
+    """The original five-statement PT booking path"""
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(queries.PT_FIND_AVAILABILITY, (trainer_id, start_time, end_time))
+        if cursor.fetchone() is None:
+            return queries.PT_NOT_AVAILABLE
+        cursor.execute(queries.TRAINER_SESSION_CONFLICT, (trainer_id, start_time, end_time))
+        if cursor.fetchone():
+            return queries.PT_CONFLICT
+        cursor.execute(queries.TRAINER_CLASS_CONFLICT, (trainer_id, start_time, end_time))
+        if cursor.fetchone():
+            return queries.PT_CLASS_CONFLICT
+        cursor.execute(queries.INSERT_PT_SESSION, (member_id, trainer_id, start_time, end_time))
+        cursor.execute(queries.MARK_AVAILABILITY_BOOKED, (start_time, end_time, trainer_id))
+        conn.commit()
+    return queries.PT_BOOKED
+
+
+def _cleanup_pt_fixtures(db, trainer_id):
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM PersonalTrainingSession WHERE trainer_id = %s AND start_time >= %s;", (trainer_id, FIXTURE_START))
+        cursor.execute("UPDATE TrainerAvailability SET open_slots = open_slots - tsmultirange(tsrange(%s, NULL)) WHERE trainer_id = %s;",
+                       (FIXTURE_START, trainer_id))
+        conn.commit()
+
+
+def bench_pt_booking(db, runs, member_id, trainer_id):
+    """Compares the multi-statement PT booking path with book_pt_session()"""
+    member_ops = MemberOperations(db)
+    # One fresh 4-hour window per booking, each on its own day
+    slots = []
+    with db.connection() as conn, conn.cursor() as cursor:
+        for day in range(runs * 2):
+            window_start = FIXTURE_START + timedelta(days=day, hours=8)
+            cursor.execute(queries.ADD_TRAINER_AVAILABILITY, (trainer_id, window_start, window_start + timedelta(hours=4)))
+            slots.append((window_start + timedelta(hours=1), window_start + timedelta(hours=2)))
+        conn.commit()
+
+    timings = {"multi-statement": [], "single round trip": []}
+    try:
+        for i in range(runs):
+            start, end = slots[2 * i]
+            started = time.perf_counter()
+            result = _book_multi_statement(db, member_id, trainer_id, start, end)
+            timings["multi-statement"].append(time.perf_counter() - started)
+            assert result == queries.PT_BOOKED, result
+
+            start, end = slots[2 * i + 1]
+            started = time.perf_counter()
+            result, _ = member_ops.book_personal_training(member_id, trainer_id, start, end)
+            timings["single round trip"].append(time.perf_counter() - started)
+            assert result == queries.PT_BOOKED, result
+    finally:
+        _cleanup_pt_fixtures(db, trainer_id)
+
+    print(f"\n=== PT BOOKING ({runs} bookings per path) ===")
+    for name, samples in timings.items():
+        _print_summary(name, _summary(samples))
+
+
+def bench_registration_rush(db, registrants, capacity, trainer_id, room_id):
+    """Has registrants members register for one class at once and checks that
+    exactly capacity get seats, the rest are waitlisted, and a cancellation
+    promotes the head of the waitlist"""
+    member_ops = MemberOperations(db)
+    # Ten years past the other fixtures, clear of their windows
+    start = FIXTURE_START + timedelta(days=3650)
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT member_id FROM Member ORDER BY member_id LIMIT %s;", (registrants,))
+        members = [row[0] for row in cursor.fetchall()]
+        cursor.execute(queries.INSERT_CLASS, (trainer_id, 1, room_id, "Registration Rush", None,
+                                              start, start + timedelta(hours=1), capacity))
+        class_id = cursor.fetchone()[0]
+        conn.commit()
+
+    def register(member_id):
+        started = time.perf_counter()
+        result, _, _ = member_ops.claim_class_seat(member_id, class_id)
+        return result, time.perf_counter() - started
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=db.maxconn) as executor:
+            outcomes = list(executor.map(register, members))
+        elapsed = time.perf_counter() - started
+
+        results = [result for result, _ in outcomes]
+        seated = results.count(queries.REGISTERED)
+        with db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT registered_count FROM Class WHERE class_id = %s;", (class_id,))
+            registered_count = cursor.fetchone()[0]
+            cursor.execute("SELECT member_id FROM ClassWaitlist WHERE class_id = %s ORDER BY waitlist_id LIMIT 1;", (class_id,))
+            head = cursor.fetchone()
+        assert seated == registered_count == min(capacity, len(members)), (seated, registered_count)
+        assert results.count(queries.WAITLISTED) == len(members) - seated, results
+
+        if head is not None:
+            seated_member = members[results.index(queries.REGISTERED)]
+            member_ops.cancel_class_registration(seated_member, class_id)
+            with db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM ClassRegistration WHERE class_id = %s AND member_id = %s;", (class_id, head[0]))
+                assert cursor.fetchone() is not None, "the head of the waitlist was not promoted"
+    finally:
+        with db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.DELETE_CLASS, (class_id,))
+            conn.commit()
+
+    print(f"\n=== REGISTRATION RUSH ({len(members)} members, capacity {capacity}, {db.maxconn} connections) ===")
+    print(f"{seated} registered, {len(members) - seated} waitlisted, no overbooking; "
+          f"{len(members) / elapsed:.0f} registrations/s")
+    _print_summary("register_for_class()", _summary([latency for _, latency in outcomes]))
+
+
+def bench_prepared(db, runs, member_id, trainer_id, email):
+    """Compares plain execution with the prepared-statement registry"""
+    db.register_statement("bench_trainer_class_conflict", queries.TRAINER_CLASS_CONFLICT)
+    window = (FIXTURE_START, FIXTURE_START + timedelta(hours=1))
+    cases = [
+        ("member dashboard", queries.MEMBER_DASHBOARD, "member_dashboard", (member_id,)),
+        ("member login", queries.PREPARED_STATEMENTS["login_member"], "login_member", (email,)),
+        ("trainer class overlap", queries.TRAINER_CLASS_CONFLICT, "bench_trainer_class_conflict", (trainer_id, *window)),
+    ]
+
+    print(f"\n=== PREPARED STATEMENTS ({runs} executions per path) ===")
+    # One connection for everything, so the only difference is parse/plan
+    with db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+        for label, sql, name, params in cases:
+            db.execute_prepared(cursor, name, params)
+            cursor.fetchall()
+
+            plain = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                plain.append(time.perf_counter() - started)
+
+            prepared = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                db.execute_prepared(cursor, name, params)
+                cursor.fetchall()
+                prepared.append(time.perf_counter() - started)
+
+            _print_summary(f"{label} (plain)", _summary(plain))
+            _print_summary(f"{label} (prepared)", _summary(prepared))
+
+
+class _SuiteFixtures:
+    """Argument factories for the suite: random ids from the generated dataset
+    and fresh far-future time windows, so write benchmarks never conflict"""
+
+    def __init__(self, db, counts, seed):
+        self.db = db
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.sequence = itertools.count()
+
+    def member(self):
+        return self.rng.randint(1, self.counts["members"])
+
+    def trainer(self):
+        return self.rng.randint(1, self.counts["trainers"])
+
+    def room(self):
+        return self.rng.randint(1, self.counts["rooms"])
+
+    def class_id(self):
+        return self.rng.randint(1, self.counts["classes"])
+
+    def unique(self):
+        return next(self.sequence)
+
+    def window(self):
+        start = FIXTURE_START + timedelta(hours=2 * self.unique())
+        return start, start + timedelta(hours=1)
+
+    def series(self):
+        """Arguments for an 8-week series in a quiet stretch of its own"""
+        start = FIXTURE_START + timedelta(days=365, weeks=9 * self.unique())
+        return (self.trainer(), 1, self.room(), "Benchmark Series", None, start, start + timedelta(hours=1), 20,
+                start.date() + timedelta(weeks=7))
+
+    def name(self):
+        return self.rng.choice(datagen.LAST_NAMES)
+
+    def member_email(self):
+        # The generated emails are first.last.id, so look one up
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT email FROM Member WHERE member_id = %s;", (self.member(),))
+            return cursor.fetchone()[0]
+
+    def availability(self):
+        """Opens a fresh 1-hour availability window and returns PT booking args for it"""
+        trainer_id = self.trainer()
+        start, end = self.window()
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.ADD_TRAINER_AVAILABILITY, (trainer_id, start, end))
+            conn.commit()
+        return self.member(), trainer_id, start, end
+
+    def fixture_class(self):
+        """Creates a class in a fresh window and returns (class_id, start, end)"""
+        start, end = self.window()
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.INSERT_CLASS, (self.trainer(), 1, self.room(), "Benchmark Class", None, start, end, 50))
+            class_id = cursor.fetchone()[0]
+            conn.commit()
+        return class_id, start, end
+
+    def registration(self):
+        """Registers a member for a fresh class and returns (member_id, class_id)"""
+        member_id, (class_id, _, _) = self.member(), self.fixture_class()
+        with self.db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+            cursor.execute(queries.REGISTER_FOR_CLASS, (member_id, class_id, False))
+        return member_id, class_id
+
+
+def _fixture_room_booking(f):
+    class_id, start, end = f.fixture_class()
+    return f.room(), class_id, start, end
+
+
+def _unique_member(f, with_created_at):
+    n = f.unique()
+    args = ("Bench", f"Member{n}", f"bench.{n}.{time.time_ns()}@fitclub.test", "1990-01-01", "F", "555-0000", "Get faster")
+    return (*args, datetime.now()) if with_created_at else (*args, "bench123")
+
+
+# "Class.method": argument factory, reads first so they see the generated data
+# unchanged. Factories run outside the timed region.
+SUITE_CASES = {
+    "MemberOperations.get_member_dashboard": lambda f: (f.member(),),
+    "MemberOperations.fetch_member_dashboard": lambda f: (f.member(),),
+    "MemberOperations.get_health_trends": lambda f: (f.member(),),
+    "TrainerOperations.get_schedule": lambda f: (f.trainer(),),
+    "TrainerOperations.page_pt_sessions": lambda f: (f.trainer(),),
+    "TrainerOperations.page_classes": lambda f: (f.trainer(),),
+    "TrainerOperations.view_schedule": lambda f: (f.trainer(),),
+    "TrainerOperations.find_members_by_name": lambda f: (f.name(),),
+    "TrainerOperations.member_lookup_by_name": lambda f: (f.name(),),
+    "AdminOperations.get_class_times": lambda f: (f.class_id(),),
+    "AdminOperations.list_all_classes": lambda f: (),
+    "AdminOperations.page_all_classes": lambda f: (),
+    "AdminOperations.iter_all_classes": lambda f: (),
+    "AdminOperations.list_rooms": lambda f: (),
+    "AdminOperations.list_trainers": lambda f: (),
+    "AdminOperations.load_room_management": lambda f: (),
+    "AdminOperations.load_class_setup": lambda f: (),
+    "AdminOperations.view_room_management": lambda f: (),
+    "AdminOperations.view_class_setup": lambda f: (),
+    "AdminOperations.view_all_classes": lambda f: (),
+    "AdminOperations.view_all_rooms": lambda f: (),
+    "AdminOperations.view_all_trainers": lambda f: (),
+    "AdminOperations.check_registration_counts": lambda f: (),
+    "Utils.list_classes": lambda f: (),
+    "Utils.list_classes_between": lambda f: (datetime.now(), datetime.now() + timedelta(days=1)),
+    "Utils.list_trainer_availability": lambda f: (),
+    "Utils.list_member_names": lambda f: (),
+    "Utils.page_classes": lambda f: (),
+    "Utils.page_trainer_availability": lambda f: (),
+    "Utils.page_member_names": lambda f: (),
+    "Utils.iter_classes": lambda f: (),
+    "Utils.iter_trainer_availability": lambda f: (),
+    "Utils.iter_member_names": lambda f: (),
+    "Utils.suggest_member_names": lambda f: (f.name()[:3],),
+    "Utils.find_pt_slots": lambda f: (60,),
+    "Utils.show_pt_slots": lambda f: (60,),
+    "Utils.get_classes": lambda f: (),
+    "Utils.get_trainer_availability": lambda f: (),
+    "Utils.get_member_names_for_lookup": lambda f: (),
+    "Utils.login_user": lambda f: (f.member_email(), "member123", "Member"),
+    "MemberOperations.register_member_to_class": lambda f: (f.member(), f.fixture_class()[0]),
+    "MemberOperations.claim_class_seat": lambda f: (f.member(), f.fixture_class()[0]),
+    "MemberOperations.cancel_class_registration": lambda f: f.registration(),
+    "MemberOperations.add_user": lambda f: _unique_member(f, True),
+    "MemberOperations.register_member": lambda f: _unique_member(f, False),
+    "MemberOperations.update_personal_details": lambda f: (f.member(), "phone", f"555-{f.unique() % 10000:04d}"),
+    "MemberOperations.update_fitness_goal": lambda f: (f.member(), "Benchmark goal"),
+    "MemberOperations.input_new_health_metric": lambda f: (f.member(), datetime.now(), 72.5, 21.0, 64, 118, 76),
+    "MemberOperations.book_personal_training": lambda f: f.availability(),
+    "MemberOperations.schedule_personal_training_session": lambda f: f.availability(),
+    "TrainerOperations.set_trainer_availability": lambda f: (f.trainer(), *f.window()),
+    "AdminOperations.book_class_series": lambda f: f.series(),
+    "AdminOperations.create_class_series": lambda f: f.series(),
+    "AdminOperations.create_class": lambda f: (f.trainer(), 1, f.room(), "Benchmark Class", None, *f.window(), 20),
+    "AdminOperations.update_class": lambda f: (f.class_id(), "description", "Updated by benchmark"),
+    "AdminOperations.manage_room_booking": _fixture_room_booking,
+    "AdminOperations.cancel_class": lambda f: (f.fixture_class()[0],),
+}
+
+def _public_methods(*instances):
+    """Yields (qualified name, bound method) for every public method of the instances"""
+    for instance in instances:
+        for name, method in inspect.getmembers(instance, inspect.ismethod):
+            if not name.startswith("_"):
+                yield f"{type(instance).__name__}.{name}", method
+
+
+def _write_metric_export(path, members, rows=1000):
+    """Writes a CSV export for the import_health_metrics case"""
+    rng = random.Random(0)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(("member_id", "recorded_at", "weight_kg", "body_fat_pct", "resting_heart_rate", "systolic_bp", "diastolic_bp"))
+        for n in range(rows):
+            writer.writerow((rng.randint(1, members), datetime.now() - timedelta(minutes=n), 70.0, 20.0, 65, 120, 80))
+
+
+def bench_suite(db, runs, scales, years, seed):
+    """Times every public operation method at each dataset scale; returns the results"""
+    results = {"started_at": datetime.now().isoformat(timespec="seconds"), "runs": runs, "years": years,
+               "seed": seed, "python": platform.python_version(), "scales": []}
+    for scale in scales:
+        print(f"\n=== SUITE: SCALE {scale} ===")
+        started = time.perf_counter()
+        counts = datagen.generate(db, scale, years, seed)
+        generated_in = time.perf_counter() - started
+
+        fixtures = _SuiteFixtures(db, counts, seed)
+        member_ops = MemberOperations(db)
+        methods = dict(_public_methods(member_ops, TrainerOperations(db), AdminOperations(db), Utils(db)))
+        export = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        export.close()
+        _write_metric_export(export.name, counts["members"])
+        cases = dict(SUITE_CASES, **{"MemberOperations.import_health_metrics": lambda f: (export.name,)})
+
+        timings = {}
+        try:
+            for name, make_args in cases.items():
+                samples = []
+                for _ in range(runs):
+                    args = make_args(fixtures)
+                    # The print-based methods write to a throwaway buffer
+                    with contextlib.redirect_stdout(io.StringIO()), db.operation(f"{scale}:{name}"):
+                        started = time.perf_counter()
+                        result = methods[name](*args)
+                        if inspect.isgenerator(result):
+                            for _ in result:
+                                pass
+                        samples.append(time.perf_counter() - started)
+                timings[name] = _summary(samples)
+                # Round trips per call, as counted by the query tracer
+                timings[name]["statements"] = db.query_stats()["operations"][f"{scale}:{name}"]["avg_statements"]
+                _print_summary(name.split(".", 1)[1], timings[name])
+        finally:
+            os.unlink(export.name)
+
+        skipped = sorted(set(methods) - set(cases))
+        for name in skipped:
+            print(f"{name}: no benchmark case, skipped")
+        results["scales"].append({"scale": scale, "counts": counts, "generate_seconds": generated_in,
+                                  "methods": timings, "skipped": skipped})
+    return results
+
+
+def compare_results(current, baseline):
+    """Prints the p50 change per method for scales present in both result files"""
+    previous = {entry["scale"]: entry["methods"] for entry in baseline["scales"]}
+    for entry in current["scales"]:
+        if entry["scale"] not in previous:
+            continue
+        print(f"\n=== SCALE {entry['scale']}: p50 vs {baseline['started_at']} ===")
+        for name, summary in entry["methods"].items():
+            before = previous[entry["scale"]].get(name)
+            if before:
+                change = (summary["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+                print(f"{name:<56} {before['p50_ms']:>9.2f}ms -> {summary['p50_ms']:>9.2f}ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitness club query benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    pt = subparsers.add_parser("pt-booking", help="multi-statement vs single round trip PT booking")
+    pt.add_argument("--runs", type=int, default=200)
+    pt.add_argument("--member-id", type=int, default=1)
+    pt.add_argument("--trainer-id", type=int, default=1)
+
+    prepared = subparsers.add_parser("prepared", help="plain vs prepared execution of hot statements")
+    prepared.add_argument("--runs", type=int, default=2000)
+    prepared.add_argument("--member-id", type=int, default=1)
+    prepared.add_argument("--trainer-id", type=int, default=1)
+    prepared.add_argument("--email", default="sarah.member@fitclub.com")
+
+    rush = subparsers.add_parser("registration-rush", help="concurrent registrations for one class; checks capacity and the waitlist")
+    rush.add_argument("--registrants", type=int, default=200)
+    rush.add_argument("--capacity", type=int, default=20)
+    rush.add_argument("--trainer-id", type=int, default=1)
+    rush.add_argument("--room-id", type=int, default=1)
+
+    suite = subparsers.add_parser("suite", help="time every public operation method on generated datasets (replaces ALL data)")
+    suite.add_argument("--scales", type=float, nargs="+", default=[1.0])
+    suite.add_argument("--years", type=float, default=1.0)
+    suite.add_argument("--runs", type=int, default=20)
+    suite.add_argument("--seed", type=int, default=42)
+    suite.add_argument("--output", default="benchmark-results.json")
+    suite.add_argument("--compare", help="earlier --output file to compare p50 latencies against")
+    suite.add_argument("--yes", action="store_true", help="confirm that existing data may be deleted")
+
+    args = parser.parse_args()
+    if args.benchmark == "suite" and not args.yes:
+        parser.error("the suite reloads the database with synthetic data; pass --yes to continue")
+    db = Database()
+    try:
+        if args.benchmark == "pt-booking":
+            bench_pt_booking(db, args.runs, args.member_id, args.trainer_id)
+        elif args.benchmark == "prepared":
+            bench_prepared(db, args.runs, args.member_id, args.trainer_id, args.email)
+        elif args.benchmark == "registration-rush":
+            bench_registration_rush(db, args.registrants, args.capacity, args.trainer_id, args.room_id)
+        elif args.benchmark == "suite":
+            results = bench_suite(db, args.runs, args.scales, args.years, args.seed)
+            with open(args.output, "w", encoding="utf-8") as handle:
+                json.dump(results, handle, indent=2)
+            print(f"\nResults written to {args.output}")
+            if args.compare:
+                with open(args.compare, encoding="utf-8") as handle:
+                    compare_results(results, json.load(handle))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
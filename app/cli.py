@@ -0,0 +1,232 @@
+"""One-shot command line for scripts and cron jobs.
+
+Nothing beyond the standard library is imported until the arguments
+parse; each subcommand then imports only the operations module it needs,
+opens a single connection, prints one JSON document and exits:
+
+    python app/cli.py classes --day tomorrow
+    python app/cli.py register 42 7
+    python app/cli.py import-health-metrics export.csv --rejects rejects.csv
+
+The document is {"ok": ..., "result": ..., "messages": [...]}, where
+messages holds whatever the operation printed. Commands that return rows
+also take --format csv, which writes the rows as CSV instead and sends
+the messages and any error to stderr. The exit status is 0 on success, 1
+when the operation was refused or failed, 2 for invalid arguments and 3
+when the database cannot be reached.
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+EXIT_REFUSED = 1
+EXIT_INVALID = 2
+EXIT_UNAVAILABLE = 3
+
+def _day(text):
+    if text == "today":
+        return date.today()
+    if text == "tomorrow":
+        return date.today() + timedelta(days=1)
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected today, tomorrow or YYYY-MM-DD")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Subcommand handlers take (db, args) and return (ok, result)
+def classes(db, args):
+    from utils import Utils
+    start = datetime.combine(args.day, datetime.min.time())
+    return True, Utils(db).list_classes_between(start, start + timedelta(days=args.days))
+
+
+def register(db, args):
+    from member_operations import MemberOperations
+    import queries
+    result, registration_id, position = MemberOperations(db).claim_class_seat(args.member_id, args.class_id, args.waitlist)
+    # Joining the waitlist is what was asked for unless --no-waitlist is given
+    ok = result in (queries.REGISTERED, queries.WAITLISTED)
+    return ok, {"result": result, "registration_id": registration_id, "waitlist_position": position}
+
+
+def cancel_registration(db, args):
+    from member_operations import MemberOperations
+    outcome = MemberOperations(db).cancel_class_registration(args.member_id, args.class_id)
+    return outcome.ok, outcome
+
+
+def book_pt(db, args):
+    from member_operations import MemberOperations
+    import queries
+    result, session_id = MemberOperations(db).book_personal_training(args.member_id, args.trainer_id, args.start_time, args.end_time)
+    return result == queries.PT_BOOKED, {"result": result, "session_id": session_id}
+
+
+def pt_slots(db, args):
+    from utils import Utils
+    return True, Utils(db).find_pt_slots(args.duration, args.start_time, args.end_time, args.specialty, args.limit)
+
+
+def dashboard(db, args):
+    from member_operations import MemberOperations
+    rows = MemberOperations(db).get_member_dashboard(args.member_id)
+    return bool(rows), rows[0] if rows else None
+
+
+def trainer_schedule(db, args):
+    from trainer_operations import TrainerOperations
+    return True, TrainerOperations(db).get_schedule(args.trainer_id)
+
+
+def set_availability(db, args):
+    from trainer_operations import TrainerOperations
+    outcome = TrainerOperations(db).set_trainer_availability(args.trainer_id, args.start_time, args.end_time)
+    return outcome.ok, outcome
+
+
+def check_registrations(db, args):
+    from admin_operations import AdminOperations
+    return AdminOperations(db).check_registration_counts(args.repair), None
+
+
+def import_health_metrics(db, args):
+    import metric_import
+    chunk_size = args.chunk_size or metric_import.DEFAULT_CHUNK_SIZE
+    return True, metric_import.import_health_metrics(db, args.path, args.input_format, chunk_size, args.rejects)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run one fitness club operation and print the result as JSON")
+    parser.add_argument("--pretty", action="store_true", help="indent the JSON output")
+    parser.add_argument("--timing", action="store_true", help="include import and run times in the output")
+    parser.add_argument("--format", choices=("json", "csv"), default="json",
+                        help="csv writes the result rows of classes, pt-slots and dashboard as CSV")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    command = subparsers.add_parser("classes", help="classes starting on a day")
+    command.add_argument("--day", type=_day, default=date.today(), help="today, tomorrow or YYYY-MM-DD (default today)")
+    command.add_argument("--days", type=int, default=1, help="number of days from --day")
+    command.set_defaults(handler=classes, rows=True)
+
+    command = subparsers.add_parser("register", help="register a member for a class")
+    command.add_argument("member_id", type=int)
+    command.add_argument("class_id", type=int)
+    command.add_argument("--no-waitlist", dest="waitlist", action="store_false", help="do not join the waitlist of a full class")
+    command.set_defaults(handler=register)
+
+    command = subparsers.add_parser("cancel-registration", help="cancel a class registration or leave its waitlist")
+    command.add_argument("member_id", type=int)
+    command.add_argument("class_id", type=int)
+    command.set_defaults(handler=cancel_registration)
+
+    command = subparsers.add_parser("book-pt", help="book a personal training session")
+    command.add_argument("member_id", type=int)
+    command.add_argument("trainer_id", type=int)
+    command.add_argument("start_time", help="YYYY-MM-DD HH:MM")
+    command.add_argument("end_time", help="YYYY-MM-DD HH:MM")
+    command.set_defaults(handler=book_pt)
+
+    command = subparsers.add_parser("pt-slots", help="earliest open personal training slots")
+    command.add_argument("--duration", type=int, default=60, help="minutes")
+    command.add_argument("--from", dest="start_time")
+    command.add_argument("--to", dest="end_time")
+    command.add_argument("--specialty")
+    command.add_argument("--limit", type=int, default=5)
+    command.set_defaults(handler=pt_slots, rows=True)
+
+    command = subparsers.add_parser("dashboard", help="a member's dashboard")
+    command.add_argument("member_id", type=int)
+    command.set_defaults(handler=dashboard, rows=True)
+
+    command = subparsers.add_parser("trainer-schedule", help="a trainer's PT sessions and classes")
+    command.add_argument("trainer_id", type=int)
+    command.set_defaults(handler=trainer_schedule)
+
+    command = subparsers.add_parser("set-availability", help="add an availability window for a trainer")
+    command.add_argument("trainer_id", type=int)
+    command.add_argument("start_time", help="YYYY-MM-DD HH:MM")
+    command.add_argument("end_time", help="YYYY-MM-DD HH:MM")
+    command.set_defaults(handler=set_availability)
+
+    command = subparsers.add_parser("check-registrations", help="report classes whose registered_count has drifted")
+    command.add_argument("--repair", action="store_true")
+    command.set_defaults(handler=check_registrations)
+
+    command = subparsers.add_parser("import-health-metrics", help="import health metrics from a CSV or NDJSON export")
+    command.add_argument("path")
+    command.add_argument("--input-format", choices=("csv", "ndjson"), help="defaults to the file extension")
+    command.add_argument("--chunk-size", type=int, help="rows per COPY chunk (default 5000)")
+    command.add_argument("--rejects", help="write rejected rows to this CSV file")
+    command.set_defaults(handler=import_health_metrics)
+    return parser
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.format == "csv" and not getattr(args, "rows", False):
+        parser.error(f"{args.command} does not return rows; use --format json")
+    output = io.StringIO()
+    timing = {}
+    # Operations print their progress; it is returned as messages so
+    # stdout carries only the JSON document or CSV rows
+    with contextlib.redirect_stdout(output):
+        from psycopg2 import Error
+        from database import Database
+        import render
+
+        timing["import_ms"] = (time.perf_counter() - started) * 1000
+        # A single connection, and plain statements: PREPARE only pays off on reuse
+        db = Database(minconn=1, maxconn=1, slow_query_ms=None, prepare_statements=False)
+        run_started = time.perf_counter()
+        try:
+            db.connect()
+        except Error as e:
+            payload, status = {"ok": False, "error": f"Failed to connect to database: {e}".strip()}, EXIT_UNAVAILABLE
+        else:
+            try:
+                ok, result = args.handler(db, args)
+                payload, status = {"ok": ok, "result": result}, 0 if ok else EXIT_REFUSED
+            except Error as e:
+                payload, status = {"ok": False, "error": f"Database Error: {e}".strip()}, EXIT_REFUSED
+            except (ValueError, OSError) as e:
+                payload, status = {"ok": False, "error": str(e)}, EXIT_INVALID
+            finally:
+                db.close()
+        timing["run_ms"] = (time.perf_counter() - run_started) * 1000
+
+    payload["messages"] = output.getvalue().splitlines()
+    if args.timing:
+        timing["total_ms"] = (time.perf_counter() - started) * 1000
+        payload["timing"] = timing
+    if args.format == "csv":
+        for line in payload["messages"] + ([payload["error"]] if "error" in payload else []):
+            print(line, file=sys.stderr)
+        if status == 0:
+            result = payload["result"]
+            # dashboard returns a single record
+            render.write_csv([result] if hasattr(result, "_fields") else result, sys.stdout)
+        if args.timing:
+            print(json.dumps(timing), file=sys.stderr)
+        return status
+    print(json.dumps(render.jsonable(payload), default=_json_default, indent=2 if args.pretty else None))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,277 @@
 import psycopg2
 from psycopg2 import pool
-import sys
+from psycopg2.extensions import connection as _PgConnection, cursor as _PgCursor
+from contextlib import contextmanager
+import re
+import threading
+import time
+import queries
+from query_trace import DEFAULT_SLOW_QUERY_MS, QueryTracer, traced_cursor_class
+
+# Statements that write even though they start with SELECT or WITH
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|SHARE|NEXTVAL|SETVAL|"
+                     + "|".join(queries.WRITING_FUNCTIONS) + r")\b", re.IGNORECASE)
+
+class PreparingConnection(_PgConnection):
+    """Connection that remembers which registry statements it has prepared.
+
+    Its cursors, whatever their cursor_factory, report each statement to
+    the tracer set by Database while the connection is checked out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.tracer = None
+        # A connection that was just opened needs no health check
+        self.opened_at = time.monotonic()
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or self.cursor_factory or _PgCursor
+        kwargs["cursor_factory"] = traced_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+
+def _server_placeholders(sql):
+    """Rewrites %s placeholders as $1, $2, ... for PREPARE"""
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group() == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return re.sub(r"%%|%s", number, sql.strip().rstrip(";")), count
+
 
 class Database:
-    """Manages database connection and cursor operations"""
-    
-    def __init__(self):
+    """Manages a thread-safe pool of database connections.
+
+    The pool is opened by connect(), or by the first checkout if connect()
+    was never called, so constructing a Database costs no round trips.
+    With prepare_statements=False, execute_prepared() runs registry
+    statements as plain SQL, which saves the PREPARE round trip for
+    short-lived processes that run each statement once.
+    """
+
+    def __init__(self, minconn=1, maxconn=10, health_check_interval=30.0,
+                 dbname="Final Project", user="postgres", password="postgres",
+                 host="localhost", port="5432", statements=None,
+                 slow_query_ms=DEFAULT_SLOW_QUERY_MS, explain_slow=False, prepare_statements=True):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        # The semaphore makes callers wait for a free connection instead of
+        # getting a PoolError when all maxconn connections are checked out
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "checkout_time": 0.0,
+            "max_checkout_time": 0.0,
+            "health_check_failures": 0,
+            "in_use": 0,
+            "prepares": 0,
+            "prepared_executions": 0,
+        }
+        self._statements = {}
+        # slow_query_ms=None turns the slow-query log off; statistics are always kept
+        self.tracer = QueryTracer(slow_query_ms, self._explain if explain_slow else None)
+        self.prepare_statements = prepare_statements
+        for name, sql in (queries.PREPARED_STATEMENTS if statements is None else statements).items():
+            self.register_statement(name, sql)
+        self._connect_args = {"dbname": dbname, "user": user, "password": password, "host": host, "port": port}
+        self.pool = None
+
+    def connect(self):
+        """Opens the connection pool if it is not open yet.
+
+        Raises psycopg2.OperationalError when the server cannot be reached.
+        """
+        with self._lock:
+            if self.pool is None:
+                self.pool = pool.ThreadedConnectionPool(
+                    self.minconn,
+                    self.maxconn,
+                    connection_factory=PreparingConnection,
+                    **self._connect_args
+                )
+
+    def _is_healthy(self, conn):
+        """Checks a connection before handing it out"""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn), conn.opened_at)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        """Takes a healthy connection from the pool, waiting if none are free"""
+        if self.pool is None:
+            self.connect()
+        started = time.monotonic()
+        waited = not self._slots.acquire(blocking=False)
+        if waited:
+            self._slots.acquire()
         try:
-            self.connection = psycopg2.connect(
-                dbname="Final Project",
-                user="postgres",
-                password="postgres",
-                host="localhost",
-                port="5432"
-            )
-            self.cursor = self.connection.cursor()
-            print("Database connection established successfully.")
-        except psycopg2.Error as e:
-            print(f"Failed to connect to database: {e}")
-            sys.exit(1)
-    
-    def get_cursor(self):
-        """Returns the database cursor"""
-        return self.cursor
-    
-    def get_connection(self):
-        """Returns the database connection"""
-        return self.connection
-    
-    def commit(self):
-        """Commits the current transaction"""
-        self.connection.commit()
-    
-    def rollback(self):
-        """Rolls back the current transaction"""
-        self.connection.rollback()
-    
+            while True:
+                conn = self.pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                self._last_used.pop(id(conn), None)
+                self.pool.putconn(conn, close=True)
+        except Exception:
+            self._slots.release()
+            raise
+
+        conn.tracer = self.tracer
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["checkout_time"] += elapsed
+            self._stats["max_checkout_time"] = max(self._stats["max_checkout_time"], elapsed)
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_time"] += elapsed
+        return conn
+
+    def _return(self, conn):
+        """Hands a connection back to the pool"""
+        self._last_used[id(conn)] = time.monotonic()
+        # Health checks run untraced
+        conn.tracer = None
+        try:
+            self.pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, autocommit=False):
+        """Checks out a connection for one operation and returns it afterwards.
+
+        Any open transaction is rolled back if the block raises. With
+        autocommit=True each statement commits on its own for the duration
+        of the block.
+        """
+        conn = self._checkout()
+        try:
+            if autocommit:
+                conn.autocommit = True
+            yield conn
+        except Exception:
+            if not conn.closed and not conn.autocommit:
+                conn.rollback()
+            raise
+        finally:
+            if autocommit and not conn.closed:
+                conn.autocommit = False
+            self._return(conn)
+
+    def register_statement(self, name, sql):
+        """Adds a statement to the registry so execute_prepared() can run it by name"""
+        if not name.isidentifier():
+            raise ValueError(f"Invalid statement name: {name!r}")
+        self._statements[name] = (*_server_placeholders(sql), sql)
+
+    def execute_prepared(self, cursor, name, params=()):
+        """Executes a registered statement by name on the cursor's connection.
+
+        The statement is PREPAREd the first time a connection runs it.
+        Prepared names are tracked on the connection object, so a
+        connection replaced after a failed health check or reconnect
+        starts empty and prepares again transparently. Without
+        prepare_statements the original SQL is executed instead.
+        """
+        sql, param_count, original = self._statements[name]
+        if len(params) != param_count:
+            raise ValueError(f"Statement {name} expects {param_count} parameters, got {len(params)}")
+        if not self.prepare_statements:
+            cursor.execute(original, params)
+            return
+        conn = cursor.connection
+        if name not in conn.prepared:
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            conn.prepared.add(name)
+            with self._lock:
+                self._stats["prepares"] += 1
+        try:
+            if params:
+                cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+            else:
+                cursor.execute(f"EXECUTE {name}")
+        except psycopg2.errors.InvalidSqlStatementName:
+            # Deallocated behind our back (e.g. DISCARD ALL); the next call re-prepares
+            conn.prepared.clear()
+            raise
+        with self._lock:
+            self._stats["prepared_executions"] += 1
+
+    def operation(self, name):
+        """Context manager counting the statements this thread runs as one logical operation"""
+        return self.tracer.operation(name)
+
+    def _explain(self, query, params):
+        """EXPLAIN a slow SELECT in a transaction that is rolled back.
+
+        ANALYZE runs the statement again, so it is only used for reads; a
+        SELECT that writes (a data-modifying CTE, a locking clause or a
+        call to one of queries.WRITING_FUNCTIONS) gets the estimated plan.
+        """
+        sql = query.decode() if isinstance(query, bytes) else str(query)
+        words = sql.split(None, 2)
+        if words and words[0].upper() == "EXECUTE":
+            # Registry statements are explained from their original text
+            sql = self._statements[words[1]][2]
+            words = sql.split(None, 1)
+        if not words or words[0].upper() not in ("SELECT", "WITH"):
+            return "not captured: only SELECT statements are explained"
+        analyze = _WRITES.search(sql) is None
+        with self.connection() as conn:
+            conn.tracer = None
+            try:
+                with conn.cursor() as cursor:
+                    if analyze:
+                        # A backstop in case a write slipped past _WRITES
+                        cursor.execute("SET TRANSACTION READ ONLY;")
+                        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    else:
+                        cursor.execute(f"EXPLAIN {sql}", params)
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                return plan if analyze else f"estimated plan; not analyzed because the statement writes\n{plan}"
+            finally:
+                conn.rollback()
+
+    def query_stats(self):
+        """Returns the tracer's statement, operation and slow-query statistics"""
+        return self.tracer.snapshot()
+
+    def stats(self):
+        """Returns a snapshot of pool usage statistics"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        checkouts = snapshot["checkouts"]
+        snapshot["avg_checkout_time"] = snapshot["checkout_time"] / checkouts if checkouts else 0.0
+        snapshot["max_size"] = self.maxconn
+        return snapshot
+
     def close(self):
-        """Closes cursor and connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-        print("Database connection closed.")
\ No newline at end of file
+        """Closes all pooled connections"""
+        if self.pool and not self.pool.closed:
+            self.pool.closeall()
@@ -0,0 +1,213 @@
+"""Synthetic dataset generator for benchmarking at realistic sizes.
+
+Every table is wiped and reloaded with COPY, sized by a scale factor:
+scale 1 is a club of 1,000 members, 25 trainers, 10 rooms and 2,000
+classes, and --years controls how much health-metric history each member
+has. Rows are drawn from a seeded RNG, so the same arguments always
+produce the same dataset.
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from itertools import islice
+
+import queries
+from auth import hash_password
+
+# Row counts at scale 1
+BASE_COUNTS = {"admins": 2, "members": 1000, "trainers": 25, "rooms": 10, "classes": 2000}
+COPY_CHUNK_SIZE = 50000
+# Classes run hourly from 07:00 to 18:00 and PT availability is 19:00-22:00,
+# so generated PT sessions never overlap a trainer's classes
+CLASS_HOURS = range(7, 19)
+AVAILABILITY_HOURS = (19, 22)
+
+FIRST_NAMES = ["Sarah", "James", "Lena", "Omar", "Priya", "Daniel", "Mei", "Lucas", "Amara", "Noah",
+               "Sofia", "Ethan", "Aisha", "Mateo", "Hana", "Liam", "Chloe", "Yusuf", "Emma", "Ravi",
+               "Olivia", "Kenji", "Zara", "Felix", "Nadia", "Owen", "Ingrid", "Tariq", "Maya", "Jonah"]
+LAST_NAMES = ["Ali", "Kim", "Patel", "Nguyen", "Lopez", "Reed", "Stone", "Khan", "Chen", "Garcia",
+              "Smith", "Martin", "Okafor", "Haddad", "Tanaka", "Novak", "Silva", "Brown", "Cohen", "Singh",
+              "Murphy", "Rossi", "Dubois", "Larsen", "Yilmaz", "Ahmed", "Walker", "Moreau", "Ivanova", "Park"]
+FITNESS_GOALS = ["Lose 5kg and improve cardio", "Gain muscle mass", "Improve flexibility",
+                 "Run a half marathon", "Lower resting heart rate", "Build core strength", None]
+SPECIALTIES = ["Strength Training", "Yoga", "HIIT/Cardio", "Pilates", "Boxing", "Mobility", "Spin"]
+ROOM_TYPES = ["Yoga Studio", "HIIT Room", "Strength Training", "Spin Studio", "Multipurpose"]
+CLASS_NAMES = ["Strength 101", "Morning Yoga Flow", "HIIT Blast", "Core Pilates", "Boxing Basics",
+               "Mobility Reset", "Spin Express", "Power Lifting", "Evening Stretch", "Circuit Burn"]
+
+def dataset_counts(scale):
+    """Returns the base row counts for a scale factor"""
+    counts = {name: max(1, round(base * scale)) for name, base in BASE_COUNTS.items()}
+    # Every room hosts a class in each hourly slot, which needs a distinct trainer per room
+    counts["rooms"] = min(counts["rooms"], counts["trainers"])
+    return counts
+
+
+def _copy(cursor, sql, rows, chunk_size=COPY_CHUNK_SIZE):
+    """COPYs an iterable of rows in chunks; returns the number of rows loaded"""
+    rows = iter(rows)
+    loaded = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return loaded
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(chunk)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        loaded += len(chunk)
+
+
+def _person(rng, n):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return first, last, f"{first.lower()}.{last.lower()}.{n}"
+
+
+def _members(rng, count, password):
+    today = date.today()
+    for n in range(1, count + 1):
+        first, last, handle = _person(rng, n)
+        born = today - timedelta(days=rng.randint(18 * 365, 70 * 365))
+        joined = datetime.now() - timedelta(days=rng.randint(0, 5 * 365))
+        yield (first, last, f"{handle}@member.fitclub.com", born, rng.choice("MF"),
+               f"555-{rng.randint(1000, 9999)}", rng.choice(FITNESS_GOALS), joined, password)
+
+
+def _trainers(rng, count, password):
+    for n in range(1, count + 1):
+        first, last, handle = _person(rng, n)
+        yield (first, last, f"{handle}@trainer.fitclub.com", rng.choice(SPECIALTIES),
+               rng.choice((45, 50, 55, 60, 70, 80)), password)
+
+
+def _classes(rng, counts, first_day):
+    rooms, trainers = counts["rooms"], counts["trainers"]
+    for i in range(counts["classes"]):
+        slot, room = divmod(i, rooms)
+        day, hour = divmod(slot, len(CLASS_HOURS))
+        start = datetime.combine(first_day + timedelta(days=day), dt_time(CLASS_HOURS[hour]))
+        # Consecutive ids within a slot map to distinct trainers because rooms <= trainers
+        trainer = (slot * rooms + room) % trainers + 1
+        yield (trainer, rng.randint(1, counts["admins"]), room + 1, rng.choice(CLASS_NAMES), "Generated class",
+               start, start + timedelta(hours=1), rng.choice((10, 15, 20, 25, 30)))
+
+
+def _registrations(rng, capacities, members, fill):
+    for class_id, capacity in enumerate(capacities, start=1):
+        taken = min(members, capacity, round(capacity * fill * rng.uniform(0.5, 1.5)))
+        for member_id in rng.sample(range(1, members + 1), taken):
+            yield class_id, member_id
+
+
+def _health_metrics(rng, members, years, interval_days):
+    samples = max(1, int(365 * years / interval_days))
+    first = datetime.now() - timedelta(days=samples * interval_days)
+    for member_id in range(1, members + 1):
+        weight = rng.uniform(50, 110)
+        body_fat = rng.uniform(12, 35)
+        heart_rate = rng.randint(55, 85)
+        for n in range(samples):
+            weight = min(200, max(40, weight + rng.gauss(-0.05, 0.4)))
+            body_fat = min(50, max(5, body_fat + rng.gauss(-0.02, 0.2)))
+            recorded = first + timedelta(days=n * interval_days, minutes=rng.randint(6 * 60, 21 * 60))
+            yield (member_id, recorded, round(weight, 2), round(body_fat, 2),
+                   heart_rate + rng.randint(-4, 4), rng.randint(105, 135), rng.randint(65, 88))
+
+
+def generate(db, scale=1.0, years=1.0, seed=42, fill=0.6, pt_fill=0.3, metric_interval_days=7):
+    """Replaces all data with a synthetic dataset; returns the row count per table.
+
+    fill is the average fraction of class seats taken, pt_fill the fraction
+    of availability windows booked as PT sessions, and each member gets a
+    health metric every metric_interval_days over the last `years` years.
+    """
+    rng = random.Random(seed)
+    counts = dataset_counts(scale)
+    # One hash per role: hashing a password per row would dominate the load time
+    passwords = {role: hash_password(f"{role}123") for role in ("admin", "member", "trainer")}
+    class_days = math.ceil(counts["classes"] / (counts["rooms"] * len(CLASS_HOURS)))
+    first_day = date.today() - timedelta(days=class_days // 2)
+
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(queries.RESET_DATASET)
+
+        def load(table, sql, rows):
+            started = time.perf_counter()
+            counts[table] = _copy(cursor, sql, rows)
+            print(f"{table:<15} {counts[table]:>10} rows in {time.perf_counter() - started:.1f}s")
+
+        load("admins", queries.COPY_ADMINS,
+             ((*_person(rng, n)[:2], f"admin{n}@fitclub.com", f"555-{1000 + n}", passwords["admin"])
+              for n in range(1, counts["admins"] + 1)))
+        load("members", queries.COPY_MEMBERS, _members(rng, counts["members"], passwords["member"]))
+        load("trainers", queries.COPY_TRAINERS, _trainers(rng, counts["trainers"], passwords["trainer"]))
+        load("rooms", queries.COPY_ROOMS,
+             ((f"Room {n}", rng.choice(ROOM_TYPES), rng.choice((15, 20, 25, 30)), f"Floor {n % 3 + 1}")
+              for n in range(1, counts["rooms"] + 1)))
+
+        classes = list(_classes(rng, counts, first_day))
+        load("classes", queries.COPY_CLASSES, classes)
+        load("registrations", queries.COPY_REGISTRATIONS,
+             _registrations(rng, [row[-1] for row in classes], counts["members"], fill))
+
+        # One evening window per trainer per class day; pt_fill of them are booked
+        windows = []
+        for day in range(class_days):
+            opens = datetime.combine(first_day + timedelta(days=day), dt_time(AVAILABILITY_HOURS[0]))
+            closes = datetime.combine(first_day + timedelta(days=day), dt_time(AVAILABILITY_HOURS[1]))
+            for trainer_id in range(1, counts["trainers"] + 1):
+                windows.append((trainer_id, opens, closes, rng.random() < pt_fill))
+        load("pt_sessions", queries.COPY_PT_SESSIONS,
+             ((rng.randint(1, counts["members"]), trainer_id, opens, opens + timedelta(hours=1), "scheduled")
+              for trainer_id, opens, _, booked in windows if booked))
+        # Each trainer's open time is one multirange; a booked window keeps
+        # the part after its 1-hour session
+        open_slots = {}
+        for trainer_id, opens, closes, booked in windows:
+            opens = opens + timedelta(hours=1) if booked else opens
+            open_slots.setdefault(trainer_id, []).append(f'["{opens}","{closes}")')
+        load("availability", queries.COPY_AVAILABILITY,
+             ((trainer_id, "{" + ",".join(ranges) + "}") for trainer_id, ranges in open_slots.items()))
+
+        metrics_from = datetime.now() - timedelta(days=365 * years + metric_interval_days)
+        cursor.execute(queries.ENSURE_METRIC_PARTITIONS, (metrics_from.date(), date.today()))
+        load("health_metrics", queries.COPY_HEALTH_METRICS,
+             _health_metrics(rng, counts["members"], years, metric_interval_days))
+        conn.commit()
+
+    # Fresh statistics so the planner sees the new table sizes
+    with db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+        cursor.execute("ANALYZE;")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a synthetic fitness club dataset (replaces ALL existing data)")
+    parser.add_argument("--scale", type=float, default=1.0, help="1 = 1,000 members, 25 trainers, 10 rooms, 2,000 classes")
+    parser.add_argument("--years", type=float, default=1.0, help="years of weekly health metrics per member")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fill", type=float, default=0.6, help="average fraction of class seats taken")
+    parser.add_argument("--pt-fill", type=float, default=0.3, help="fraction of availability windows booked")
+    parser.add_argument("--yes", action="store_true", help="confirm that existing data may be deleted")
+
+    args = parser.parse_args()
+    if not args.yes:
+        parser.error("this deletes every row in the database; pass --yes to continue")
+    # Imported here so dataset_counts() and the row generators load without the driver
+    from database import Database
+
+    db = Database()
+    try:
+        started = time.perf_counter()
+        counts = generate(db, args.scale, args.years, args.seed, args.fill, args.pt_fill)
+        print(f"Loaded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Multi-process load generator for class registration, PT booking and class creation.
+
+Each worker process opens its own connection pool and runs --concurrency
+threads against the operation classes. With --rate the threads follow a
+Poisson arrival schedule and latency is measured from each request's
+scheduled arrival, so time spent queued behind a slow database counts;
+without it every thread sends its next request as soon as the last one
+returns. --hot-share of the registration and PT traffic goes to the first
+--hot-classes classes and trainers. Fixtures live in their own far-future
+span; afterwards the run checks that no class is over capacity and no
+trainer is double booked, then deletes them.
+"""
+import argparse
+import json
+import multiprocessing
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import queries
+from records import DATABASE_ERROR
+
+# Clear of benchmarks.py's fixtures, which start in 2099
+LOAD_START = datetime(2098, 1, 1)
+LOAD_END = LOAD_START + timedelta(days=90)
+# Registration targets run hourly from LOAD_START; PT bookings and new
+# classes compete for the same trainers' hours from BOOKING_START
+BOOKING_START = LOAD_START + timedelta(days=30)
+BOOKING_DAYS = 7
+BOOKING_HOURS = range(8, 20)
+MAX_CLASSES = 30 * 24
+MAX_MEMBERS = 10000
+OPERATIONS = ("register", "pt", "create_class")
+DEFAULT_MIX = "register=70,pt=20,create_class=10"
+# How long workers may take to start before the run is abandoned
+STARTUP_TIMEOUT = 60
+
+def parse_mix(text):
+    """Parses "register=70,pt=20,create_class=10" into weights in OPERATIONS order"""
+    weights = dict.fromkeys(OPERATIONS, 0.0)
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in weights:
+            raise ValueError(f"Unknown operation '{name.strip()}'; expected one of {', '.join(OPERATIONS)}")
+        weights[name.strip()] = float(weight)
+    if sum(weights.values()) <= 0:
+        raise ValueError("The mix needs at least one operation with a positive weight")
+    return [weights[name] for name in OPERATIONS]
+
+
+def _skewed(rng, items, hot, hot_share):
+    """Picks from the first hot items with probability hot_share, otherwise from the rest"""
+    if len(items) <= hot or rng.random() < hot_share:
+        return rng.choice(items[:hot] or items)
+    return rng.choice(items[hot:])
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def cleanup(db):
+    """Deletes every load-test fixture, including leftovers from a --keep run"""
+    span = (LOAD_START, LOAD_END)
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM PersonalTrainingSession WHERE slot && tsrange(%s, %s);", span)
+        cursor.execute("DELETE FROM Class WHERE slot && tsrange(%s, %s);", span)
+        cursor.execute("UPDATE TrainerAvailability SET open_slots = open_slots - tsmultirange(tsrange(%s, %s)) "
+                       "WHERE open_slots && tsrange(%s, %s);", span * 2)
+        conn.commit()
+
+
+def prepare(db, classes, capacity):
+    """Creates the target classes and opens every trainer's booking hours; returns the plan workers share"""
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT member_id FROM Member ORDER BY member_id LIMIT %s;", (MAX_MEMBERS,))
+        members = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT trainer_id FROM Trainer ORDER BY trainer_id;")
+        trainers = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT room_id FROM Room ORDER BY room_id;")
+        rooms = [row[0] for row in cursor.fetchall()]
+        if not (members and trainers and rooms):
+            raise ValueError("The database needs members, trainers and rooms; load some with datagen.py")
+
+        class_ids = []
+        for n in range(classes):
+            # One class per hour, so the targets never conflict with each other
+            start = LOAD_START + timedelta(hours=n)
+            cursor.execute(queries.INSERT_CLASS, (trainers[n % len(trainers)], 1, rooms[n % len(rooms)], "Load Test Class",
+                                                  None, start, start + timedelta(hours=1), capacity))
+            class_ids.append(cursor.fetchone()[0])
+        for trainer_id in trainers:
+            for day in range(BOOKING_DAYS):
+                opens = BOOKING_START + timedelta(days=day, hours=BOOKING_HOURS[0])
+                cursor.execute(queries.ADD_TRAINER_AVAILABILITY, (trainer_id, opens, opens + timedelta(hours=len(BOOKING_HOURS))))
+        conn.commit()
+    return {"members": members, "trainers": trainers, "rooms": rooms, "classes": class_ids}
+
+
+def _attempt(operation, rng, plan, config, member_ops, admin_ops):
+    """Runs one operation and returns its outcome label"""
+    try:
+        if operation == "register":
+            class_id = _skewed(rng, plan["classes"], config["hot_classes"], config["hot_share"])
+            result, _, _ = member_ops.claim_class_seat(rng.choice(plan["members"]), class_id)
+            return result
+
+        start = BOOKING_START + timedelta(days=rng.randrange(BOOKING_DAYS), hours=rng.choice(BOOKING_HOURS))
+        end = start + timedelta(hours=1)
+        if operation == "pt":
+            trainer_id = _skewed(rng, plan["trainers"], config["hot_classes"], config["hot_share"])
+            result, _ = member_ops.book_personal_training(rng.choice(plan["members"]), trainer_id, start, end)
+            return result
+
+        created = admin_ops.create_class(rng.choice(plan["trainers"]), 1, rng.choice(plan["rooms"]), "Load Test Class",
+                                         None, start, end, config["capacity"])
+        if created.ok:
+            return "created"
+        return "database_error" if created.code == DATABASE_ERROR else created.message
+    except Exception as e:
+        return f"exception: {type(e).__name__}"
+
+
+def _run_process(config, plan, index, barrier, results):
+    """Worker process body: sends the process's share of the load and queues its samples"""
+    # Imported here so the parent's argument parsing works without the driver
+    from psycopg2 import Error
+    from admin_operations import AdminOperations
+    from database import Database
+    from member_operations import MemberOperations
+
+    db = Database(maxconn=config["concurrency"], slow_query_ms=None)
+    try:
+        db.connect()
+    except Error:
+        barrier.abort()
+        results.put((index, None))
+        return
+    member_ops, admin_ops = MemberOperations(db), AdminOperations(db)
+    weights = parse_mix(config["mix"])
+    # Requests per second for each thread when the arrival rate is fixed
+    rate = config["rate"] / (config["processes"] * config["concurrency"]) if config["rate"] else None
+    samples = []
+    samples_lock = threading.Lock()
+
+    def run(thread_index, started, deadline):
+        rng = random.Random(f"{config['seed']}:{index}:{thread_index}")
+        local = []
+        arrival = started
+        while True:
+            if rate:
+                arrival += rng.expovariate(rate)
+                if arrival >= deadline:
+                    break
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                arrival = time.perf_counter()
+                if arrival >= deadline:
+                    break
+            operation = rng.choices(OPERATIONS, weights)[0]
+            outcome = _attempt(operation, rng, plan, config, member_ops, admin_ops)
+            local.append((operation, outcome, time.perf_counter() - arrival))
+        with samples_lock:
+            samples.extend(local)
+
+    try:
+        # Every process starts sending at the same moment
+        try:
+            barrier.wait(STARTUP_TIMEOUT)
+        except threading.BrokenBarrierError:
+            # Another worker failed to start and reports the reason
+            results.put((index, []))
+            return
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run, args=(n, started, started + config["duration"]))
+                   for n in range(config["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.put((index, samples))
+    finally:
+        db.close()
+
+
+def run_load(config, plan):
+    """Runs the worker processes; returns every (operation, outcome, latency) sample"""
+    # spawn, so no worker inherits the parent's pooled connections
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(config["processes"])
+    results = context.Queue()
+    processes = [context.Process(target=_run_process, args=(config, plan, n, barrier, results), daemon=True)
+                 for n in range(config["processes"])]
+    for process in processes:
+        process.start()
+
+    samples = []
+    try:
+        for _ in processes:
+            index, process_samples = results.get(timeout=STARTUP_TIMEOUT + config["duration"] * 2)
+            if process_samples is None:
+                raise RuntimeError(f"Worker {index} could not connect to the database")
+            samples.extend(process_samples)
+    except queue.Empty:
+        raise RuntimeError("A worker stopped without reporting its results")
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+    return samples
+
+
+def summarize(samples, duration):
+    """Per-operation throughput, latency percentiles and outcome counts"""
+    by_operation = defaultdict(list)
+    for operation, outcome, latency in samples:
+        by_operation[operation].append((outcome, latency))
+
+    report = {}
+    for operation in OPERATIONS:
+        rows = by_operation.get(operation)
+        if not rows:
+            continue
+        latencies = sorted(latency for _, latency in rows)
+        outcomes = Counter(outcome for outcome, _ in rows)
+        report[operation] = {
+            "count": len(rows),
+            "throughput": len(rows) / duration,
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "errors": sum(count for outcome, count in outcomes.items()
+                          if outcome == "database_error" or outcome.startswith("exception:")),
+            "outcomes": dict(outcomes.most_common()),
+        }
+    return report
+
+
+def check_invariants(db):
+    """Finds over-capacity classes and overlapping bookings for one trainer in the load-test span"""
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(queries.OVERBOOKED_CLASSES, (LOAD_START, LOAD_END))
+        overbooked = cursor.fetchall()
+        cursor.execute(queries.TRAINER_DOUBLE_BOOKINGS, (LOAD_START, LOAD_END) * 2)
+        double_bookings = cursor.fetchall()
+    return {
+        "overbooked_classes": [
+            {"class_id": class_id, "capacity": capacity, "registered_count": count, "registrations": registrations}
+            for class_id, capacity, count, registrations in overbooked
+        ],
+        "trainer_double_bookings": [
+            {"trainer_id": trainer_id, "first": [kind_a, id_a], "second": [kind_b, id_b]}
+            for trainer_id, kind_a, id_a, kind_b, id_b in double_bookings
+        ],
+    }
+
+
+def print_report(report, invariants, duration):
+    total = sum(stats["count"] for stats in report.values())
+    print(f"\n=== LOAD TEST ({total} requests in {duration:.0f}s, {total / duration:.1f} req/s) ===")
+    for operation, stats in report.items():
+        print(f"{operation:<14} n={stats['count']:<7} {stats['throughput']:>8.1f}/s "
+              f"p50={stats['p50_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+              f"max={stats['max_ms']:.1f}ms errors={stats['errors']}")
+        for outcome, count in stats["outcomes"].items():
+            print(f"    {outcome:<60} {count:>7}")
+
+    print("\n=== INVARIANTS ===")
+    for name, violations in invariants.items():
+        print(f"{name}: {'OK' if not violations else f'{len(violations)} VIOLATION(S)'}")
+        for violation in violations[:10]:
+            print(f"    {violation}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for registration, PT booking and class creation")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8, help="threads (and pooled connections) per process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="total arrivals per second across all processes; 0 sends back to back")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument("--classes", type=int, default=50, help="classes to register for")
+    parser.add_argument("--capacity", type=int, default=20, help="capacity of each class")
+    parser.add_argument("--hot-classes", type=int, default=3,
+                        help="classes (and trainers, for PT) that receive the --hot-share of traffic")
+    parser.add_argument("--hot-share", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--keep", action="store_true", help="leave the fixtures in place for inspection")
+
+    args = parser.parse_args()
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if not 1 <= args.classes <= MAX_CLASSES:
+        parser.error(f"--classes must be between 1 and {MAX_CLASSES}")
+    if not 0 <= args.hot_share <= 1:
+        parser.error("--hot-share must be between 0 and 1")
+    config = {"processes": args.processes, "concurrency": args.concurrency, "duration": args.duration,
+              "rate": args.rate, "mix": args.mix, "capacity": args.capacity, "hot_classes": args.hot_classes,
+              "hot_share": args.hot_share, "seed": args.seed}
+    # Imported here so --help and argument errors work without the driver
+    from database import Database
+
+    db = Database(maxconn=2)
+    try:
+        cleanup(db)
+        plan = prepare(db, args.classes, args.capacity)
+        print(f"Running {args.processes} process(es) x {args.concurrency} thread(s) for {args.duration:.0f}s...")
+        samples = run_load(config, plan)
+        report = summarize(samples, args.duration)
+        invariants = check_invariants(db)
+        if not args.keep:
+            cleanup(db)
+    finally:
+        db.close()
+
+    print_report(report, invariants, args.duration)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump({"config": config, "operations": report, "invariants": invariants}, handle, indent=2)
+        print(f"\nReport written to {args.output}")
+    if any(invariants.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,192 +1,221 @@
-from psycopg2 import IntegrityError, Error
+from psycopg2 import DataError, IntegrityError, Error
+from psycopg2.errors import ForeignKeyViolation, UniqueViolation
+from auth import shared_hasher
+from records import DATABASE_ERROR, DONE, DUPLICATE, INVALID, NOT_FOUND, Dashboard, HealthTrend, Outcome
+import metric_import
+import pagination
+import queries
+import read_cache
+import render
 
 class MemberOperations:
     """Handles all member-related database operations"""
     
-    def __init__(self, db):
+    def __init__(self, db, schedule=None, cache=None, hasher=None):
         self.db = db
-        self.cursor = db.get_cursor()
-        self.connection = db.get_connection()
+        self.schedule = schedule
+        self.cache = cache
+        self.hasher = hasher or shared_hasher()
+
+    def get_member_dashboard(self, member_id):
+        """Return the member's Dashboard records"""
+        with self.db.connection() as conn, conn.cursor(cursor_factory=pagination.record_cursor(Dashboard)) as cursor:
+            self.db.execute_prepared(cursor, "member_dashboard", (member_id,))
+            return cursor.fetchall()
+
+    def get_health_trends(self, member_id, weekly=False, limit=30):
+        """Return the member's most recent daily or weekly health-metric rollups as HealthTrend records"""
+        query = queries.MEMBER_WEEKLY_TREND if weekly else queries.MEMBER_DAILY_TREND
+        with self.db.connection() as conn, conn.cursor(cursor_factory=pagination.record_cursor(HealthTrend)) as cursor:
+            cursor.execute(query, (member_id, limit))
+            return cursor.fetchall()
     
     def fetch_member_dashboard(self, member_id):
         """Display member dashboard with health metrics, goals, and activity summary"""
-        query = "SELECT * FROM member_dashboard WHERE member_id = %s;"
         try:
-            self.cursor.execute(query, (member_id,))
-            results = self.cursor.fetchall()
-            if results:
-                print("\n=== MEMBER DASHBOARD ===")
-                for row in results:
-                    print(f"ID: {row[0]}")
-                    print(f"Name: {row[1]}")
-                    print(f"Fitness Goal: {row[2]}")
-                    print(f"Classes Registered: {row[3]}")
-                    print(f"Training Sessions: {row[4]}")
-                    print(f"Last Metric Update: {row[5]}")
-                    print(f"Weight: {row[6]} kg")
-                    print(f"Body Fat: {row[7]}%")
-                return True
-            else:
-                print("No dashboard data found.")
-                return False
+            return render.print_records(self.get_member_dashboard(member_id), "\n=== MEMBER DASHBOARD ===",
+                                        "No dashboard data found.")
         except Error as e:
             print(f"Error fetching dashboard: {e}")
             return False
     
-    def register_member_to_class(self, member_id, class_id):
-        """Register a member to a group fitness class"""
-        query = """
-        INSERT INTO ClassRegistration (class_id, member_id)
-        VALUES (%s, %s);
+    def claim_class_seat(self, member_id, class_id, waitlist=True):
+        """Register a member for a class in a single round trip.
+
+        Returns (result_code, registration_id, waitlist_position) where
+        result_code is one of the queries.REGISTERED-style codes. A full
+        class puts the member on its waitlist unless waitlist is False.
         """
+        with self.db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+            self.db.execute_prepared(cursor, "register_for_class", (member_id, class_id, waitlist))
+            result, registration_id, position = cursor.fetchone()
+        # Both class listings show registration counts
+        if result == queries.REGISTERED and self.cache is not None:
+            self.cache.invalidate(read_cache.CLASSES, read_cache.ALL_CLASSES)
+        return result, registration_id, position
+
+    def register_member_to_class(self, member_id, class_id, waitlist=True):
+        """Register a member to a group fitness class"""
         try:
-            self.cursor.execute(query, (class_id, member_id))
-            self.connection.commit()
-            print(f"Successfully registered to class {class_id}!")
-            return True
-        except IntegrityError as e:
-            print(f"Registration failed: {e}")
-            print("You may already be registered or the class is full.")
-            self.connection.rollback()
-            return False
+            result, _, position = self.claim_class_seat(member_id, class_id, waitlist)
         except Error as e:
             print(f"Database Error: {e}")
-            self.connection.rollback()
             return False
+
+        if result == queries.WAITLISTED:
+            print(f"Class {class_id} is full. You are number {position} on the waitlist.")
+            return False
+        if result != queries.REGISTERED:
+            print(queries.REGISTRATION_MESSAGES[result])
+            return False
+
+        print(f"Successfully registered to class {class_id}!")
+        return True
+
+    def cancel_class_registration(self, member_id, class_id):
+        """Cancel a class registration or leave its waitlist; a freed seat goes to the next waitlisted member"""
+        try:
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(queries.CANCEL_CLASS_REGISTRATION, (class_id, member_id, class_id, member_id))
+                registrations, waitlisted = cursor.fetchone()
+                conn.commit()
+        except Error as e:
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
+
+        if registrations:
+            if self.cache is not None:
+                self.cache.invalidate(read_cache.CLASSES, read_cache.ALL_CLASSES)
+            return Outcome(True, DONE, f"Registration for class {class_id} cancelled.")
+        if waitlisted:
+            return Outcome(True, DONE, f"Removed from the waitlist for class {class_id}.")
+        return Outcome(False, NOT_FOUND, f"No registration found for class {class_id}.")
     
     def add_user(self, first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at):
         """Register a new member to the system"""
-        query = """
-        INSERT INTO Member (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-        """
         try:
-            self.cursor.execute(query, (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at))
-            self.connection.commit()
-            print("User registration successful!")
-            return True
-        except IntegrityError as e:
-            print(f"Registration failed - Email already exists: {e}")
-            self.connection.rollback()
-            return False
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(queries.ADD_MEMBER, (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at))
+                conn.commit()
+            return Outcome(True, DONE, "User registration successful!")
+        except UniqueViolation:
+            return Outcome(False, DUPLICATE, "Registration failed - Email already exists.")
+        except (IntegrityError, DataError) as e:
+            return Outcome(False, INVALID, f"Invalid value: {e.diag.message_primary}")
         except Error as e:
-            print(f"Database Error: {e}")
-            self.connection.rollback()
-            return False
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
+
+    def register_member(self, first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password):
+        """Create a member account with a login password"""
+        # Blocks this thread while PBKDF2 runs on the shared pool
+        password_hash = self.hasher.hash(password)
+        try:
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(queries.REGISTER_MEMBER_WITH_PASSWORD, (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password_hash))
+                conn.commit()
+            return Outcome(True, DONE, "Registration successful! Please log in.")
+        except UniqueViolation:
+            return Outcome(False, DUPLICATE, "Registration failed - Email already exists.")
+        except (IntegrityError, DataError) as e:
+            return Outcome(False, INVALID, f"Invalid value: {e.diag.message_primary}")
+        except Error as e:
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
     
     def update_personal_details(self, member_id, trait, updated_value):
         """Update member personal information (name, email, phone)"""
         allowed_traits = ['first_name', 'last_name', 'email', 'phone', 'date_of_birth', 'gender']
         if trait not in allowed_traits:
-            print(f"Error: Cannot update '{trait}'. Allowed fields: {', '.join(allowed_traits)}")
-            return False
+            return Outcome(False, INVALID, f"Error: Cannot update '{trait}'. Allowed fields: {', '.join(allowed_traits)}")
         
-        query = f"UPDATE Member SET {trait} = %s WHERE member_id = %s;"
+        query = queries.UPDATE_MEMBER_FIELD.format(field=trait)
         try:
-            self.cursor.execute(query, (updated_value, member_id))
-            self.connection.commit()
-            print(f"Successfully updated {trait} to '{updated_value}'")
-            return True
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(query, (updated_value, member_id))
+                if cursor.rowcount == 0:
+                    return Outcome(False, NOT_FOUND, f"No member found with ID {member_id}")
+                conn.commit()
+            return Outcome(True, DONE, f"Successfully updated {trait} to '{updated_value}'")
+        except UniqueViolation:
+            return Outcome(False, DUPLICATE, "Update failed - Email already exists.")
+        except (IntegrityError, DataError) as e:
+            return Outcome(False, INVALID, f"Invalid value: {e.diag.message_primary}")
         except Error as e:
-            print(f"Database Error: {e}")
-            self.connection.rollback()
-            return False
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
     
     def update_fitness_goal(self, member_id, fitness_goal):
         """Update member's fitness goal"""
-        query = "UPDATE Member SET fitness_goal = %s WHERE member_id = %s;"
         try:
-            self.cursor.execute(query, (fitness_goal, member_id))
-            self.connection.commit()
-            print(f"Fitness goal updated to: '{fitness_goal}'")
-            return True
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(queries.UPDATE_FITNESS_GOAL, (fitness_goal, member_id))
+                if cursor.rowcount == 0:
+                    return Outcome(False, NOT_FOUND, f"No member found with ID {member_id}")
+                conn.commit()
+            return Outcome(True, DONE, f"Fitness goal updated to: '{fitness_goal}'")
         except Error as e:
-            print(f"Database Error: {e}")
-            self.connection.rollback()
-            return False
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
     
     def input_new_health_metric(self, member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp):
         """Log new health metrics for progress tracking"""
-        query = """
-        INSERT INTO HealthMetric (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s);
-        """
         try:
-            self.cursor.execute(query, (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp))
-            self.connection.commit()
-            print("Health metrics recorded successfully!")
-            return True
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(queries.INSERT_HEALTH_METRIC, (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp))
+                conn.commit()
+            return Outcome(True, DONE, "Health metrics recorded successfully!")
+        except ForeignKeyViolation:
+            return Outcome(False, NOT_FOUND, f"No member found with ID {member_id}")
+        except (IntegrityError, DataError) as e:
+            return Outcome(False, INVALID, f"Invalid value: {e.diag.message_primary}")
         except Error as e:
-            print(f"Database Error: {e}")
-            self.connection.rollback()
+            return Outcome(False, DATABASE_ERROR, f"Database Error: {e}")
+
+    def import_health_metrics(self, path, fmt=None, chunk_size=metric_import.DEFAULT_CHUNK_SIZE, rejects_path=None):
+        """Bulk import health metrics from a CSV or NDJSON export"""
+        try:
+            report = metric_import.import_health_metrics(self.db, path, fmt, chunk_size, rejects_path)
+        except (Error, OSError) as e:
+            print(f"Import Error: {e}")
             return False
+
+        print(f"Read {report['read']} rows in {report['chunks']} chunks: "
+              f"{report['inserted']} imported, {report['rejected']} rejected.")
+        for line_no, reason in report["rejections"]:
+            print(f"  line {line_no}: {reason}")
+        if report["rejected"] > len(report["rejections"]):
+            print(f"  ... and {report['rejected'] - len(report['rejections'])} more"
+                  + (f" (see {rejects_path})" if rejects_path else ""))
+        return True
+
+    def book_personal_training(self, member_id, trainer_id, start_time, end_time):
+        """Book a PT session in a single round trip.
+
+        Returns (result_code, session_id) where result_code is one of the
+        queries.PT_* codes and session_id is None unless it is PT_BOOKED.
+        """
+        if self.schedule is not None:
+            conflict = self.schedule.pt_session_conflict(trainer_id, start_time, end_time)
+            if conflict:
+                return conflict, None
+
+        # Autocommit lets the function run as its own transaction, so no
+        # separate BEGIN/COMMIT round trips are needed
+        with self.db.connection(autocommit=True) as conn, conn.cursor() as cursor:
+            self.db.execute_prepared(cursor, "book_pt_session", (member_id, trainer_id, start_time, end_time))
+            result, session_id = cursor.fetchone()
+
+        if result == queries.PT_BOOKED and self.schedule is not None:
+            self.schedule.record_pt_session(session_id, trainer_id, start_time, end_time)
+        return result, session_id
     
     def schedule_personal_training_session(self, member_id, trainer_id, start_time, end_time):
         """Schedule a personal training session with availability validation"""
         try:
-            # 1. Validate trainer availability window
-            self.cursor.execute("""
-                SELECT availability_id
-                FROM TrainerAvailability
-                WHERE trainer_id = %s
-                  AND %s >= start_time
-                  AND %s <= end_time
-                  AND is_booked = FALSE
-                LIMIT 1;
-            """, (trainer_id, start_time, end_time))
-
-            availability = self.cursor.fetchone()
-            if availability is None:
-                print("Error: Trainer is not available at this time.")
-                return False
-
-            availability_id = availability[0]
-
-            # 2. Check trainer PT session conflicts
-            self.cursor.execute("""
-                SELECT 1
-                FROM PersonalTrainingSession
-                WHERE trainer_id = %s
-                  AND (%s < end_time AND %s > start_time);
-            """, (trainer_id, end_time, start_time))
-
-            if self.cursor.fetchone():
-                print("Error: Trainer already has a PT session during this time.")
-                return False
-            
-            # 3. Check class conflicts for trainer
-            self.cursor.execute("""
-                SELECT 1
-                FROM Class
-                WHERE trainer_id = %s
-                  AND (%s < end_time AND %s > start_time);
-            """, (trainer_id, end_time, start_time))
-
-            if self.cursor.fetchone():
-                print("Error: Trainer already has a class during this time.")
-                return False
-
-            # 4. Insert PT session
-            self.cursor.execute("""
-                INSERT INTO PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
-                VALUES (%s, %s, %s, %s, 'scheduled')
-                RETURNING session_id;
-            """, (member_id, trainer_id, start_time, end_time))
-
-            new_session_id = self.cursor.fetchone()[0]
-
-            # 5. Mark availability as booked
-            self.cursor.execute("""
-                UPDATE TrainerAvailability
-                SET is_booked = TRUE
-                WHERE availability_id = %s;
-            """, (availability_id,))
-
-            self.connection.commit()
-            print(f"PT session booked successfully! Session ID: {new_session_id}")
-            return True
-
+            result, session_id = self.book_personal_training(member_id, trainer_id, start_time, end_time)
         except Exception as e:
-            self.connection.rollback()
             print(f"Database Error: {e}")
-            return False
\ No newline at end of file
+            return False
+
+        if result != queries.PT_BOOKED:
+            print(queries.PT_BOOKING_MESSAGES[result])
+            return False
+
+        print(f"PT session booked successfully! Session ID: {session_id}")
+        return True
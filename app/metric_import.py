@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+from contextlib import nullcontext
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import queries
+
+COLUMNS = ("member_id", "recorded_at", "weight_kg", "body_fat_pct", "resting_heart_rate", "systolic_bp", "diastolic_bp")
+REQUIRED = ("member_id", "recorded_at")
+DEFAULT_CHUNK_SIZE = 5000
+# The report keeps only the first few rejections; the rest go to the rejects file
+MAX_REPORTED_REJECTIONS = 20
+
+def _timestamp(value):
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).strip())
+    # recorded_at has no time zone: offsets are converted to local time,
+    # so a file mixing both forms still compares and sorts
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _decimal(value):
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(value)
+    if not number.is_finite():
+        raise ValueError(value)
+    return number
+
+
+def _integer(value):
+    number = _decimal(value)
+    if number != number.to_integral_value():
+        raise ValueError(value)
+    return int(number)
+
+
+# Largest value of a PostgreSQL INTEGER column
+MAX_INTEGER = 2147483647
+
+# field: (parser, lowest, highest), mirroring the HealthMetric column types
+FIELD_RULES = {
+    "member_id": (_integer, 1, MAX_INTEGER),
+    "recorded_at": (_timestamp, None, None),
+    "weight_kg": (_decimal, 0, Decimal("999.99")),
+    "body_fat_pct": (_decimal, 0, 100),
+    "resting_heart_rate": (_integer, 20, 250),
+    "systolic_bp": (_integer, 50, 300),
+    "diastolic_bp": (_integer, 30, 200),
+}
+
+def _read_csv(handle):
+    """Yields (line number, record) for each data row of a CSV export"""
+    for line_no, record in enumerate(csv.DictReader(handle), start=2):
+        yield line_no, record
+
+
+def _read_ndjson(handle):
+    """Yields (line number, record) for each non-blank NDJSON line"""
+    for line_no, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, line.rstrip("\n")
+
+
+READERS = {"csv": _read_csv, "ndjson": _read_ndjson}
+
+def detect_format(path):
+    """Picks the reader from the file extension"""
+    if path.lower().endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def _validate_chunk(chunk):
+    """Splits a chunk of records into COPY-ready rows and rejections"""
+    accepted, rejected = [], []
+    for line_no, record in chunk:
+        if not isinstance(record, dict):
+            rejected.append((line_no, "not a JSON object", record))
+            continue
+        row, reason = [line_no], None
+        for field in COLUMNS:
+            value = record.get(field)
+            if value is None or str(value).strip() == "":
+                if field in REQUIRED:
+                    reason = f"missing {field}"
+                    break
+                row.append(None)
+                continue
+            parse, lowest, highest = FIELD_RULES[field]
+            try:
+                value = parse(value)
+            except (TypeError, ValueError):
+                reason = f"invalid {field}"
+                break
+            if (lowest is not None and value < lowest) or (highest is not None and value > highest):
+                reason = f"{field} out of range"
+                break
+            row.append(value)
+        if reason:
+            rejected.append((line_no, reason, record))
+        else:
+            accepted.append(row)
+    return accepted, rejected
+
+
+def import_health_metrics(db, path, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, rejects_path=None):
+    """Streams a CSV or NDJSON export into HealthMetric in committed chunks.
+
+    Only one chunk is held in memory at a time. Rejected rows are written
+    to rejects_path (if given) as line, reason and the original record.
+    Returns a report dict with the read/inserted/rejected counts.
+    """
+    reader = READERS[fmt or detect_format(path)]
+    report = {"read": 0, "inserted": 0, "rejected": 0, "chunks": 0, "rejections": []}
+
+    def reject(rejects, line_no, reason, record):
+        report["rejected"] += 1
+        if len(report["rejections"]) < MAX_REPORTED_REJECTIONS:
+            report["rejections"].append((line_no, reason))
+        if rejects is not None:
+            raw = record if isinstance(record, str) else json.dumps(record, default=str)
+            rejects.writerow((line_no, reason, raw))
+
+    with open(path, newline="", encoding="utf-8") as handle, \
+            (open(rejects_path, "w", newline="", encoding="utf-8") if rejects_path else nullcontext()) as rejects_file, \
+            db.connection() as conn, conn.cursor() as cursor:
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects:
+            rejects.writerow(("line", "reason", "record"))
+        cursor.execute(queries.CREATE_METRIC_STAGING)
+        conn.commit()
+
+        records = reader(handle)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            report["read"] += len(chunk)
+            report["chunks"] += 1
+            accepted, rejected = _validate_chunk(chunk)
+            for line_no, reason, record in rejected:
+                reject(rejects, line_no, reason, record)
+            if not accepted:
+                continue
+
+            # Make sure the monthly partitions exist so rows skip the default one
+            recorded = [row[2] for row in accepted]
+            cursor.execute(queries.ENSURE_METRIC_PARTITIONS, (min(recorded).date(), max(recorded).date()))
+
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(accepted)
+            buffer.seek(0)
+            cursor.copy_expert(queries.COPY_METRIC_STAGING, buffer)
+            cursor.execute(queries.STAGED_METRICS_UNKNOWN_MEMBER)
+            unknown = [line_no for (line_no,) in cursor.fetchall()]
+            cursor.execute(queries.INSERT_STAGED_METRICS)
+            report["inserted"] += cursor.rowcount
+            # Committing also empties the ON COMMIT DELETE ROWS staging table
+            conn.commit()
+
+            if unknown:
+                records_by_line = {line_no: record for line_no, record in chunk}
+                for line_no in unknown:
+                    reject(rejects, line_no, "unknown member_id", records_by_line[line_no])
+    return report
+
@@ -0,0 +1,114 @@
+"""Keyset pagination and streaming helpers for the listing operations.
+
+Page queries in queries.py end with a keyset predicate of the form
+``(%s IS NULL OR (key1, key2, ...) > (%s, %s, ...))`` followed by
+``LIMIT %s``, so the first key is passed twice: once for the NULL test on
+the first page and once in the row comparison. Rows come back as the
+namedtuple record type given for the query (see records.py).
+
+Sort keys are typed by name: ``*_id`` keys are integers, ``*_time`` keys
+are timestamps and any other key is text.
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+
+from psycopg2.extensions import cursor as _PgCursor
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_ITERSIZE = 2000
+MAX_PAGE_SIZE = 500
+
+# Largest value of an INT (SERIAL) id column
+MAX_ID = 2147483647
+
+_record_cursors = {}
+
+class _RecordCursor(_PgCursor):
+    record = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        return None if row is None else self.record._make(row)
+
+    def fetchmany(self, *args, **kwargs):
+        return list(map(self.record._make, super().fetchmany(*args, **kwargs)))
+
+    def fetchall(self):
+        return list(map(self.record._make, super().fetchall()))
+
+    # The base cursor is its own iterator (__iter__ returns self), so rows
+    # are converted in __next__
+    def __next__(self):
+        return self.record._make(super().__next__())
+
+
+def record_cursor(record):
+    """Returns a cursor class whose rows are instances of the namedtuple type record"""
+    cursor_class = _record_cursors.get(record)
+    if cursor_class is None:
+        cursor_class = type(f"{record.__name__}Cursor", (_RecordCursor,), {"record": record})
+        cursor_class = _record_cursors.setdefault(record, cursor_class)
+    return cursor_class
+
+
+def encode_cursor(row, keys):
+    """Builds an opaque cursor from the sort-key values of the last row on a page"""
+    values = [getattr(row, key) for key in keys]
+    payload = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    """Turns a cursor from encode_cursor back into key values; raises ValueError if invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid page cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid page cursor")
+    return [_key_value(key, value) for key, value in zip(keys, values)]
+
+
+def _key_value(key, value):
+    """Checks one decoded sort-key value against its key's type"""
+    if key.endswith("_id"):
+        if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_ID:
+            return value
+    elif key.endswith("_time"):
+        if isinstance(value, str):
+            try:
+                stamp = datetime.fromisoformat(value)
+            except ValueError:
+                stamp = None
+            if stamp is not None and stamp.tzinfo is None:
+                return stamp
+    elif isinstance(value, str):
+        return value
+    raise ValueError("Invalid page cursor")
+
+
+def fetch_page(db, record, query, params, keys, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+    """Runs a keyset page query; returns (records, next_cursor) with next_cursor None on the last page"""
+    after = decode_cursor(cursor, keys) if cursor else [None] * len(keys)
+    with db.connection() as conn, conn.cursor(cursor_factory=record_cursor(record)) as cur:
+        # One extra row tells us whether another page follows
+        cur.execute(query, (*params, after[0], *after, page_size + 1))
+        rows = cur.fetchall()
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1], keys)
+    return rows, None
+
+
+def stream(db, record, query, params=(), itersize=DEFAULT_ITERSIZE):
+    """Yields records through a named server-side cursor, itersize rows per round trip"""
+    with db.connection() as conn:
+        with conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=record_cursor(record)) as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            yield from cur
+        conn.commit()
@@ -0,0 +1,661 @@
+"""SQL statements shared by the sync and async operation classes.
+
+Both psycopg2 and psycopg 3 use %s placeholders, so the same text runs
+unchanged on either driver.
+"""
+
+# Messages for the exclusion constraints in FinalProjectDDL.sql, which
+# reject overlapping bookings per room and per trainer
+CONSTRAINT_MESSAGES = {
+    "class_trainer_no_overlap": "Error: Trainer has conflicting class during this time.",
+    "class_room_no_overlap": "Error: Room is already booked during this time.",
+    "pt_session_trainer_no_overlap": "Error: Trainer already has a PT session during this time.",
+}
+
+def conflict_message(error):
+    """Maps an ExclusionViolation to the user-facing conflict message"""
+    return CONSTRAINT_MESSAGES.get(error.diag.constraint_name, f"Database Error: {error}")
+
+def like_escape(text):
+    """Escapes LIKE wildcards so user input only matches literally"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+# Member operations
+MEMBER_DASHBOARD = "SELECT * FROM member_dashboard WHERE member_id = %s;"
+
+REGISTERED = "registered"
+ALREADY_REGISTERED = "duplicate"
+WAITLISTED = "waitlisted"
+CLASS_FULL = "full"
+CLASS_NOT_FOUND = "not_found"
+
+REGISTRATION_MESSAGES = {
+    ALREADY_REGISTERED: "You are already registered for this class.",
+    CLASS_FULL: "Registration failed: the class is full.",
+    CLASS_NOT_FOUND: "Registration failed: no such class or member.",
+}
+
+# Registers, or waitlists when the third parameter is true, in one round trip
+REGISTER_FOR_CLASS = """
+SELECT result_code, new_registration_id, waitlist_position
+FROM register_for_class(%s, %s, %s);
+"""
+
+# Frees the member's seat (the seat trigger promotes the next waitlisted
+# member) or their waitlist place; returns how many of each were removed
+CANCEL_CLASS_REGISTRATION = """
+WITH registration AS (
+    DELETE FROM ClassRegistration WHERE class_id = %s AND member_id = %s RETURNING 1
+), waitlisted AS (
+    DELETE FROM ClassWaitlist WHERE class_id = %s AND member_id = %s RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM registration), (SELECT COUNT(*) FROM waitlisted);
+"""
+
+ADD_MEMBER = """
+INSERT INTO Member (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+"""
+
+REGISTER_MEMBER_WITH_PASSWORD = """
+INSERT INTO Member (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+"""
+
+# Formatted with a field name from MemberOperations' allow-list
+UPDATE_MEMBER_FIELD = "UPDATE Member SET {field} = %s WHERE member_id = %s;"
+
+UPDATE_FITNESS_GOAL = "UPDATE Member SET fitness_goal = %s WHERE member_id = %s;"
+
+INSERT_HEALTH_METRIC = """
+INSERT INTO HealthMetric (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
+VALUES (%s, %s, %s, %s, %s, %s, %s);
+"""
+
+# Daily/weekly rollups maintained by the HealthMetric triggers
+MEMBER_DAILY_TREND = """
+SELECT day AS period_start, samples, avg_weight_kg, min_weight_kg, max_weight_kg,
+    avg_body_fat_pct, avg_resting_heart_rate, avg_systolic_bp, avg_diastolic_bp
+FROM HealthMetricDaily
+WHERE member_id = %s
+ORDER BY day DESC
+LIMIT %s;
+"""
+
+MEMBER_WEEKLY_TREND = """
+SELECT week_start AS period_start, samples, avg_weight_kg, min_weight_kg, max_weight_kg,
+    avg_body_fat_pct, avg_resting_heart_rate, avg_systolic_bp, avg_diastolic_bp
+FROM HealthMetricWeekly
+WHERE member_id = %s
+ORDER BY week_start DESC
+LIMIT %s;
+"""
+
+ENSURE_METRIC_PARTITIONS = "SELECT create_health_metric_partitions(%s, %s);"
+
+# Bulk health-metric import: each chunk is COPYed into a per-connection
+# staging table, then moved into HealthMetric with one INSERT ... SELECT
+CREATE_METRIC_STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS health_metric_staging (
+    line_no            INT NOT NULL,
+    member_id          INT NOT NULL,
+    recorded_at        TIMESTAMP NOT NULL,
+    weight_kg          NUMERIC(5,2),
+    body_fat_pct       NUMERIC(5,2),
+    resting_heart_rate INT,
+    systolic_bp        INT,
+    diastolic_bp       INT
+) ON COMMIT DELETE ROWS;
+"""
+
+COPY_METRIC_STAGING = """
+COPY health_metric_staging (line_no, member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
+FROM STDIN WITH (FORMAT csv);
+"""
+
+STAGED_METRICS_UNKNOWN_MEMBER = """
+SELECT s.line_no FROM health_metric_staging s
+WHERE NOT EXISTS (SELECT 1 FROM Member m WHERE m.member_id = s.member_id)
+ORDER BY s.line_no;
+"""
+
+INSERT_STAGED_METRICS = """
+INSERT INTO HealthMetric (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
+SELECT s.member_id, s.recorded_at, s.weight_kg, s.body_fat_pct, s.resting_heart_rate, s.systolic_bp, s.diastolic_bp
+FROM health_metric_staging s
+JOIN Member m ON m.member_id = s.member_id;
+"""
+
+# Personal training booking
+# Result codes returned by the book_pt_session() database function
+PT_BOOKED = "booked"
+PT_NOT_AVAILABLE = "not_available"
+PT_CONFLICT = "pt_conflict"
+PT_CLASS_CONFLICT = "class_conflict"
+
+PT_BOOKING_MESSAGES = {
+    PT_NOT_AVAILABLE: "Error: Trainer is not available at this time.",
+    PT_CONFLICT: "Error: Trainer already has a PT session during this time.",
+    PT_CLASS_CONFLICT: "Error: Trainer already has a class during this time.",
+}
+
+# Runs the whole booking server-side in one round trip
+BOOK_PT_SESSION = "SELECT result_code, new_session_id FROM book_pt_session(%s, %s, %s, %s);"
+
+# The statements below make up the original multi-statement booking path,
+# kept for benchmarks.py's comparison against BOOK_PT_SESSION
+PT_FIND_AVAILABILITY = """
+SELECT trainer_id
+FROM TrainerAvailability
+WHERE trainer_id = %s
+  AND open_slots @> tsrange(%s, %s)
+FOR UPDATE;
+"""
+
+TRAINER_SESSION_CONFLICT = """
+SELECT 1
+FROM PersonalTrainingSession
+WHERE trainer_id = %s
+  AND slot && tsrange(%s, %s);
+"""
+
+TRAINER_CLASS_CONFLICT = """
+SELECT 1
+FROM Class
+WHERE trainer_id = %s
+  AND slot && tsrange(%s, %s);
+"""
+
+INSERT_PT_SESSION = """
+INSERT INTO PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
+VALUES (%s, %s, %s, %s, 'scheduled')
+RETURNING session_id;
+"""
+
+MARK_AVAILABILITY_BOOKED = """
+UPDATE TrainerAvailability
+SET open_slots = open_slots - tsmultirange(tsrange(%s, %s))
+WHERE trainer_id = %s;
+"""
+
+# Trainer operations
+# Merges a window into the trainer's open time, leaving out any part
+# already taken by a PT session; returns the trainer's resulting windows,
+# or no rows if the window was empty. Params: trainer, start, end
+ADD_TRAINER_AVAILABILITY = """
+WITH added AS (
+    SELECT %s::int AS trainer_id, tsrange(%s, %s) AS slot
+),
+merged AS (
+    INSERT INTO TrainerAvailability (trainer_id, open_slots)
+    SELECT a.trainer_id,
+        tsmultirange(a.slot)
+        - coalesce((SELECT range_agg(s.slot) FROM PersonalTrainingSession s
+                    WHERE s.trainer_id = a.trainer_id AND s.slot && a.slot), '{}')
+    FROM added a
+    WHERE NOT isempty(a.slot)
+    ON CONFLICT (trainer_id) DO UPDATE
+    SET open_slots = TrainerAvailability.open_slots + EXCLUDED.open_slots
+    RETURNING open_slots
+)
+SELECT lower(r) AS start_time, upper(r) AS end_time
+FROM merged, unnest(merged.open_slots) AS r
+ORDER BY 1;
+"""
+
+TRAINER_PT_SESSIONS = """
+SELECT pts.session_id, m.first_name, m.last_name, pts.start_time, pts.end_time, pts.status
+FROM PersonalTrainingSession pts
+JOIN Member m ON pts.member_id = m.member_id
+WHERE pts.trainer_id = %s
+ORDER BY pts.start_time, pts.session_id;
+"""
+
+TRAINER_PT_SESSIONS_PAGE = """
+SELECT pts.session_id, m.first_name, m.last_name, pts.start_time, pts.end_time, pts.status
+FROM PersonalTrainingSession pts
+JOIN Member m ON pts.member_id = m.member_id
+WHERE pts.trainer_id = %s
+  AND (%s IS NULL OR (pts.start_time, pts.session_id) > (%s, %s))
+ORDER BY pts.start_time, pts.session_id
+LIMIT %s;
+"""
+
+TRAINER_CLASSES = """
+SELECT c.class_id, c.class_name, c.start_time, c.end_time, r.room_name, c.capacity
+FROM Class c
+LEFT JOIN Room r ON c.room_id = r.room_id
+WHERE c.trainer_id = %s
+ORDER BY c.start_time, c.class_id;
+"""
+
+TRAINER_CLASSES_PAGE = """
+SELECT c.class_id, c.class_name, c.start_time, c.end_time, r.room_name, c.capacity
+FROM Class c
+LEFT JOIN Room r ON c.room_id = r.room_id
+WHERE c.trainer_id = %s
+  AND (%s IS NULL OR (c.start_time, c.class_id) > (%s, %s))
+ORDER BY c.start_time, c.class_id
+LIMIT %s;
+"""
+
+# Ranked fuzzy search over lower(first_name || ' ' || last_name), served by
+# the trigram index; latest metrics are only fetched for the returned page.
+# Params: term, term, LIKE pattern, limit, offset
+MEMBER_SEARCH = """
+WITH matches AS (
+    SELECT m.member_id, m.first_name, m.last_name, m.email, m.fitness_goal,
+        word_similarity(%s, lower(m.first_name || ' ' || m.last_name)) AS score
+    FROM Member m
+    WHERE %s <%% lower(m.first_name || ' ' || m.last_name)
+       OR lower(m.first_name || ' ' || m.last_name) LIKE %s
+    ORDER BY score DESC, m.last_name, m.first_name, m.member_id
+    LIMIT %s OFFSET %s
+)
+SELECT
+    matches.member_id,
+    matches.first_name,
+    matches.last_name,
+    matches.email,
+    matches.fitness_goal,
+    h.weight_kg,
+    h.body_fat_pct,
+    h.resting_heart_rate,
+    h.systolic_bp,
+    h.diastolic_bp,
+    h.recorded_at,
+    matches.score
+FROM matches
+LEFT JOIN LATERAL (
+    SELECT weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp, recorded_at
+    FROM HealthMetric
+    WHERE member_id = matches.member_id
+    ORDER BY recorded_at DESC
+    LIMIT 1
+) h ON TRUE
+ORDER BY matches.score DESC, matches.last_name, matches.first_name, matches.member_id;
+"""
+
+# Prefix match on full or last name via the text_pattern_ops indexes.
+# Params: full-name pattern, last-name pattern, limit
+MEMBER_TYPEAHEAD = """
+SELECT member_id, first_name, last_name
+FROM Member
+WHERE lower(first_name || ' ' || last_name) LIKE %s
+   OR lower(last_name) LIKE %s
+ORDER BY last_name, first_name, member_id
+LIMIT %s;
+"""
+
+# Admin operations
+ASSIGN_ROOM = """
+UPDATE Class
+SET room_id = %s
+WHERE class_id = %s;
+"""
+
+INSERT_CLASS = """
+INSERT INTO Class (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+RETURNING class_id;
+"""
+
+# Class series: occurrences are passed as parallel start/end arrays.
+# Every occurrence is checked against the trainer's classes and PT
+# sessions and the room's classes in one statement, using the exclusion
+# constraints' GiST indexes. Params: starts, ends, trainer, room, trainer
+CLASS_SERIES_CONFLICTS = """
+WITH occurrence AS (
+    SELECT o.start_time, tsrange(o.start_time, o.end_time) AS slot
+    FROM unnest(%s::timestamp[], %s::timestamp[]) AS o(start_time, end_time)
+)
+SELECT o.start_time, 'trainer_class' AS conflict, c.class_id AS booking_id, c.class_name AS detail
+FROM occurrence o
+JOIN Class c ON c.trainer_id = %s AND c.slot && o.slot
+UNION ALL
+SELECT o.start_time, 'room_class', c.class_id, c.class_name
+FROM occurrence o
+JOIN Class c ON c.room_id = %s AND c.slot && o.slot
+UNION ALL
+SELECT o.start_time, 'trainer_session', s.session_id, s.status
+FROM occurrence o
+JOIN PersonalTrainingSession s ON s.trainer_id = %s AND s.slot && o.slot
+ORDER BY 1, 2;
+"""
+
+# Params: trainer, admin, room, name, description, capacity, starts, ends
+INSERT_CLASS_SERIES = """
+INSERT INTO Class (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity)
+SELECT %s, %s, %s, %s, %s, o.start_time, o.end_time, %s
+FROM unnest(%s::timestamp[], %s::timestamp[]) AS o(start_time, end_time)
+RETURNING class_id, start_time, end_time;
+"""
+
+SERIES_CONFLICT_MESSAGES = {
+    "trainer_class": "trainer teaches class {booking_id} ({detail})",
+    "room_class": "room is booked by class {booking_id} ({detail})",
+    "trainer_session": "trainer has PT session {booking_id}",
+}
+
+# Formatted with a field name from AdminOperations' allow-list
+UPDATE_CLASS_FIELD = "UPDATE Class SET {field} = %s WHERE class_id = %s;"
+
+# Capacity may not drop below the seats already taken
+UPDATE_CLASS_CAPACITY = "UPDATE Class SET capacity = %s WHERE class_id = %s AND registered_count <= %s;"
+
+CLASS_REGISTERED_COUNT = "SELECT registered_count FROM Class WHERE class_id = %s;"
+
+DELETE_CLASS = "DELETE FROM Class WHERE class_id = %s;"
+
+CLASS_TIMES = "SELECT start_time, end_time FROM Class WHERE class_id = %s;"
+
+CLASS_SLOT = "SELECT trainer_id, room_id, start_time, end_time FROM Class WHERE class_id = %s;"
+
+ALL_CLASSES = """
+SELECT
+    c.class_id,
+    c.class_name,
+    t.first_name || ' ' || t.last_name AS trainer_name,
+    r.room_name,
+    c.start_time,
+    c.end_time,
+    c.registered_count AS registered,
+    c.capacity
+FROM Class c
+LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
+LEFT JOIN Room r ON c.room_id = r.room_id
+ORDER BY c.start_time, c.class_id;
+"""
+
+ALL_CLASSES_PAGE = """
+SELECT
+    c.class_id,
+    c.class_name,
+    t.first_name || ' ' || t.last_name AS trainer_name,
+    r.room_name,
+    c.start_time,
+    c.end_time,
+    c.registered_count AS registered,
+    c.capacity
+FROM Class c
+LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
+LEFT JOIN Room r ON c.room_id = r.room_id
+WHERE %s IS NULL OR (c.start_time, c.class_id) > (%s, %s)
+ORDER BY c.start_time, c.class_id
+LIMIT %s;
+"""
+
+# Classes whose registered_count no longer matches ClassRegistration
+REGISTRATION_COUNT_DRIFT = """
+SELECT c.class_id, c.registered_count, COUNT(cr.registration_id) AS actual_count
+FROM Class c
+LEFT JOIN ClassRegistration cr ON c.class_id = cr.class_id
+GROUP BY c.class_id, c.registered_count
+HAVING c.registered_count <> COUNT(cr.registration_id)
+ORDER BY c.class_id;
+"""
+
+REPAIR_REGISTRATION_COUNTS = """
+UPDATE Class c
+SET registered_count = counts.actual_count
+FROM (
+    SELECT c2.class_id, COUNT(cr.registration_id) AS actual_count
+    FROM Class c2
+    LEFT JOIN ClassRegistration cr ON c2.class_id = cr.class_id
+    GROUP BY c2.class_id
+) counts
+WHERE c.class_id = counts.class_id
+  AND c.registered_count <> counts.actual_count;
+"""
+
+ALL_ROOMS = "SELECT room_id, room_name, room_type, capacity, location FROM Room ORDER BY room_id;"
+
+ALL_TRAINERS = """
+SELECT trainer_id, first_name, last_name, specialty, hourly_rate, email
+FROM Trainer
+ORDER BY trainer_id;
+"""
+
+# Utils
+CLASS_LISTING = """
+SELECT
+    c.class_id,
+    c.class_name,
+    c.start_time,
+    c.end_time,
+    c.registered_count AS total_registered,
+    c.capacity,
+    t.first_name || ' ' || t.last_name AS trainer_name
+FROM Class c
+LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
+ORDER BY c.start_time, c.class_id;
+"""
+
+CLASS_LISTING_PAGE = """
+SELECT
+    c.class_id,
+    c.class_name,
+    c.start_time,
+    c.end_time,
+    c.registered_count AS total_registered,
+    c.capacity,
+    t.first_name || ' ' || t.last_name AS trainer_name
+FROM Class c
+LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
+WHERE %s IS NULL OR (c.start_time, c.class_id) > (%s, %s)
+ORDER BY c.start_time, c.class_id
+LIMIT %s;
+"""
+
+# Classes starting in [start, end), served by idx_class_start_id
+CLASSES_BETWEEN = """
+SELECT
+    c.class_id,
+    c.class_name,
+    c.start_time,
+    c.end_time,
+    c.registered_count AS total_registered,
+    c.capacity,
+    t.first_name || ' ' || t.last_name AS trainer_name
+FROM Class c
+LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
+WHERE c.start_time >= %s AND c.start_time < %s
+ORDER BY c.start_time, c.class_id;
+"""
+
+# Open windows, one row per range in each trainer's open_slots
+AVAILABLE_TRAINER_SLOTS = """
+SELECT
+    t.trainer_id,
+    t.first_name,
+    t.last_name,
+    t.specialty,
+    lower(r) AS start_time,
+    upper(r) AS end_time
+FROM TrainerAvailability ta
+CROSS JOIN LATERAL unnest(ta.open_slots) AS r
+JOIN Trainer t ON ta.trainer_id = t.trainer_id
+ORDER BY start_time, t.trainer_id;
+"""
+
+# A trainer's windows never overlap, so (start_time, trainer_id) is unique
+AVAILABLE_TRAINER_SLOTS_PAGE = """
+SELECT *
+FROM (
+    SELECT
+        t.trainer_id,
+        t.first_name,
+        t.last_name,
+        t.specialty,
+        lower(r) AS start_time,
+        upper(r) AS end_time
+    FROM TrainerAvailability ta
+    CROSS JOIN LATERAL unnest(ta.open_slots) AS r
+    JOIN Trainer t ON ta.trainer_id = t.trainer_id
+) w
+WHERE %s IS NULL OR (w.start_time, w.trainer_id) > (%s, %s)
+ORDER BY w.start_time, w.trainer_id
+LIMIT %s;
+"""
+
+# Earliest PT slots across all trainers: each trainer's open time,
+# clipped to the search span, minus their PT sessions and classes leaves
+# free gaps; candidate starts step through each gap.
+# Params: span start, span end, duration, step, specialty ILIKE pattern or NULL, limit
+EARLIEST_PT_SLOTS = """
+WITH bounds AS (
+    SELECT tsrange(%s, %s) AS span, %s::interval AS duration, %s::interval AS step, %s::text AS specialty
+),
+free AS (
+    SELECT a.trainer_id,
+        unnest(
+            a.open_slots * tsmultirange(b.span)
+            - coalesce((SELECT range_agg(s.slot) FROM PersonalTrainingSession s
+                        WHERE s.trainer_id = a.trainer_id AND s.slot && b.span), '{}')
+            - coalesce((SELECT range_agg(c.slot) FROM Class c
+                        WHERE c.trainer_id = a.trainer_id AND c.slot && b.span), '{}')
+        ) AS gap
+    FROM bounds b
+    JOIN TrainerAvailability a ON a.open_slots && b.span
+    JOIN Trainer t ON t.trainer_id = a.trainer_id
+    WHERE b.specialty IS NULL OR t.specialty ILIKE b.specialty
+)
+SELECT t.trainer_id, t.first_name, t.last_name, t.specialty, t.hourly_rate,
+    s.start_time, s.start_time + b.duration AS end_time
+FROM bounds b
+JOIN free f ON upper(f.gap) - lower(f.gap) >= b.duration
+CROSS JOIN LATERAL generate_series(lower(f.gap), upper(f.gap) - b.duration, b.step) AS s(start_time)
+JOIN Trainer t ON t.trainer_id = f.trainer_id
+ORDER BY s.start_time, t.trainer_id
+LIMIT %s;
+"""
+
+MEMBER_NAMES = "SELECT member_id, first_name, last_name FROM Member ORDER BY last_name, first_name, member_id;"
+
+MEMBER_NAMES_PAGE = """
+SELECT member_id, first_name, last_name
+FROM Member
+WHERE %s IS NULL OR (last_name, first_name, member_id) > (%s, %s, %s)
+ORDER BY last_name, first_name, member_id
+LIMIT %s;
+"""
+
+# Formatted with one of the Admin, Member or Trainer table names
+LOGIN_USER = "SELECT {table_lower}_id, password FROM {table} WHERE email = %s;"
+
+# Formatted like LOGIN_USER; used to store upgraded password hashes
+UPDATE_PASSWORD = "UPDATE {table} SET password = %s WHERE {table_lower}_id = %s;"
+
+# Plaintext passwords left over from before hashing, params: hash prefix, batch size
+LEGACY_PASSWORDS = """
+SELECT {table_lower}_id, password
+FROM {table}
+WHERE NOT starts_with(password, %s)
+ORDER BY {table_lower}_id
+LIMIT %s;
+"""
+
+# Synthetic dataset loading (datagen.py); RESTART IDENTITY makes the
+# generated rows take ids 1..n in load order
+RESET_DATASET = """
+TRUNCATE Admin, Member, Trainer, Room, Class, ClassRegistration, ClassWaitlist, TrainerAvailability,
+    PersonalTrainingSession, HealthMetric, MemberDashboard, HealthMetricDaily, HealthMetricWeekly
+RESTART IDENTITY CASCADE;
+"""
+
+COPY_ADMINS = "COPY Admin (first_name, last_name, email, phone, password) FROM STDIN WITH (FORMAT csv);"
+
+COPY_MEMBERS = """
+COPY Member (first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, created_at, password)
+FROM STDIN WITH (FORMAT csv);
+"""
+
+COPY_TRAINERS = "COPY Trainer (first_name, last_name, email, specialty, hourly_rate, password) FROM STDIN WITH (FORMAT csv);"
+
+COPY_ROOMS = "COPY Room (room_name, room_type, capacity, location) FROM STDIN WITH (FORMAT csv);"
+
+COPY_CLASSES = """
+COPY Class (trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity)
+FROM STDIN WITH (FORMAT csv);
+"""
+
+COPY_REGISTRATIONS = "COPY ClassRegistration (class_id, member_id) FROM STDIN WITH (FORMAT csv);"
+
+COPY_AVAILABILITY = "COPY TrainerAvailability (trainer_id, open_slots) FROM STDIN WITH (FORMAT csv);"
+
+COPY_PT_SESSIONS = """
+COPY PersonalTrainingSession (member_id, trainer_id, start_time, end_time, status)
+FROM STDIN WITH (FORMAT csv);
+"""
+
+COPY_HEALTH_METRICS = """
+COPY HealthMetric (member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
+FROM STDIN WITH (FORMAT csv);
+"""
+
+# Load-test invariants (loadtest.py), checked over the test's time span;
+# params: span start, span end (twice for the double bookings)
+OVERBOOKED_CLASSES = """
+SELECT c.class_id, c.capacity, c.registered_count, COUNT(r.registration_id) AS registrations
+FROM Class c
+LEFT JOIN ClassRegistration r ON r.class_id = c.class_id
+WHERE c.slot && tsrange(%s, %s)
+GROUP BY c.class_id
+HAVING COUNT(r.registration_id) > c.capacity OR COUNT(r.registration_id) <> c.registered_count;
+"""
+
+TRAINER_DOUBLE_BOOKINGS = """
+WITH bookings AS (
+    SELECT trainer_id, 'class' AS kind, class_id AS booking_id, slot
+    FROM Class WHERE slot && tsrange(%s, %s)
+    UNION ALL
+    SELECT trainer_id, 'pt_session', session_id, slot
+    FROM PersonalTrainingSession WHERE slot && tsrange(%s, %s)
+)
+SELECT a.trainer_id, a.kind, a.booking_id, b.kind, b.booking_id
+FROM bookings a
+JOIN bookings b ON a.trainer_id = b.trainer_id AND a.slot && b.slot
+  AND (a.kind, a.booking_id) < (b.kind, b.booking_id);
+"""
+
+# Schedule index
+SCHEDULE_CLASSES = "SELECT class_id, trainer_id, room_id, start_time, end_time FROM Class;"
+
+SCHEDULE_SESSIONS = "SELECT session_id, trainer_id, start_time, end_time FROM PersonalTrainingSession;"
+
+SCHEDULE_AVAILABILITY = "SELECT trainer_id, lower(r), upper(r) FROM TrainerAvailability, unnest(open_slots) AS r ORDER BY 1, 2;"
+
+# Re-reads of the rows behind a conflict the index reports
+SCHEDULE_CLASSES_BY_ID = "SELECT class_id, trainer_id, room_id, start_time, end_time FROM Class WHERE class_id = ANY(%s);"
+
+SCHEDULE_SESSIONS_BY_ID = "SELECT session_id, trainer_id, start_time, end_time FROM PersonalTrainingSession WHERE session_id = ANY(%s);"
+
+SCHEDULE_TRAINER_AVAILABILITY = "SELECT lower(r), upper(r) FROM TrainerAvailability, unnest(open_slots) AS r WHERE trainer_id = %s ORDER BY 1;"
+
+# Database functions that write; Database only EXPLAIN ANALYZEs slow
+# statements that call none of them
+WRITING_FUNCTIONS = ("book_pt_session", "register_for_class", "create_health_metric_partitions", "rollup_health_metrics")
+
+# Screen loaders (screens.py): each listing becomes one JSON array column,
+# so all of a screen's result sets come back as a single row. The arrays
+# are cast to text so screens.py can parse numerics as Decimal.
+def listings_as_json(listings):
+    """Combines (name, query) pairs into one SELECT; params are the queries' params in order"""
+    columns = ",\n    ".join(
+        # json_agg takes the rows in the order of the sorted subquery
+        f"(SELECT coalesce(json_agg(q), '[]')::text FROM ({sql.strip().rstrip(';')}) q) AS {name}"
+        for name, sql in listings)
+    return f"SELECT\n    {columns};"
+
+# Hot statements that Database prepares once per connection and executes by
+# name, skipping the parse/plan step on repeat calls
+PREPARED_STATEMENTS = {
+    "member_dashboard": MEMBER_DASHBOARD,
+    "book_pt_session": BOOK_PT_SESSION,
+    "register_for_class": REGISTER_FOR_CLASS,
+    "add_trainer_availability": ADD_TRAINER_AVAILABILITY,
+    "insert_class": INSERT_CLASS,
+    "login_member": LOGIN_USER.format(table_lower="member", table="Member"),
+    "login_trainer": LOGIN_USER.format(table_lower="trainer", table="Trainer"),
+    "login_admin": LOGIN_USER.format(table_lower="admin", table="Admin"),
+}
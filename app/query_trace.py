@@ -0,0 +1,213 @@
+"""Per-statement tracing and the slow-query log for Database.
+
+Every cursor handed out by a pooled connection reports each execute()
+here: latency and rows per distinct SQL string (the MAX_STATEMENTS most
+recently run), statement counts per logical operation (a
+Database.operation() scope, e.g. one HTTP request), and a log entry for statements slower than the threshold. Recording is a
+couple of clock reads and a dict update under a lock, so it stays on in
+production; EXPLAIN captures run later on a background thread.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("fitclub.slow_queries")
+
+DEFAULT_SLOW_QUERY_MS = 250.0
+RECENT_SLOW_QUERIES = 50
+TOP_STATEMENTS = 20
+# Distinct SQL strings kept; the least recently run is dropped beyond this,
+# so ad-hoc statements cannot grow the table without bound
+MAX_STATEMENTS = 500
+# Slow statements waiting for EXPLAIN; further ones are logged without a plan
+EXPLAIN_QUEUE_SIZE = 16
+
+_traced_classes = {}
+
+def traced_cursor_class(base):
+    """Returns a subclass of the cursor class base that reports to its connection's tracer"""
+    traced = _traced_classes.get(base)
+    if traced is None:
+        class TracedCursor(base):
+            def execute(self, query, vars=None):
+                tracer = self.connection.tracer
+                if tracer is None:
+                    return super().execute(query, vars)
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    tracer.record(query, vars, time.perf_counter() - started, self.rowcount)
+
+            def executemany(self, query, vars_list):
+                tracer = self.connection.tracer
+                if tracer is None:
+                    return super().executemany(query, vars_list)
+                started = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    tracer.record(query, None, time.perf_counter() - started, self.rowcount)
+
+        TracedCursor.__name__ = f"Traced{base.__name__}"
+        traced = _traced_classes.setdefault(base, TracedCursor)
+    return traced
+
+
+def param_shape(params):
+    """Describes parameters by type only, so logs never contain values such as passwords"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def _display(query):
+    text = query.decode() if isinstance(query, bytes) else str(query)
+    return " ".join(text.split())
+
+
+class QueryTracer:
+    """Collects statement and operation statistics and logs slow statements.
+
+    explain, if given, is called as explain(query, params) for each slow
+    statement on a background thread and returns the text to log as its
+    plan.
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, explain=None):
+        self.slow_query_ms = slow_query_ms
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._statements = OrderedDict()
+        self._evicted = 0
+        self._operations = {}
+        self._slow = deque(maxlen=RECENT_SLOW_QUERIES)
+        self._slow_count = 0
+        self._explain_queue = None
+
+    @contextmanager
+    def operation(self, name):
+        """Attributes the statements run by this thread inside the block to one logical operation.
+
+        Nested scopes fold into the outermost one.
+        """
+        if getattr(self._local, "operation", None) is not None:
+            yield
+            return
+        current = self._local.operation = {"statements": 0, "db_time": 0.0}
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._local.operation = None
+            with self._lock:
+                stats = self._operations.get(name)
+                if stats is None:
+                    stats = self._operations[name] = {"calls": 0, "statements": 0, "max_statements": 0, "db_time": 0.0, "time": 0.0}
+                stats["calls"] += 1
+                stats["statements"] += current["statements"]
+                stats["max_statements"] = max(stats["max_statements"], current["statements"])
+                stats["db_time"] += current["db_time"]
+                stats["time"] += elapsed
+
+    def record(self, query, params, elapsed, rowcount):
+        """Called by traced cursors after every statement"""
+        current = getattr(self._local, "operation", None)
+        if current is not None:
+            current["statements"] += 1
+            current["db_time"] += elapsed
+        with self._lock:
+            stats = self._statements.get(query)
+            if stats is None:
+                stats = self._statements[query] = {"calls": 0, "time": 0.0, "max_time": 0.0, "rows": 0}
+                if len(self._statements) > MAX_STATEMENTS:
+                    self._statements.popitem(last=False)
+                    self._evicted += 1
+            else:
+                self._statements.move_to_end(query)
+            stats["calls"] += 1
+            stats["time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["rows"] += max(rowcount, 0)
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            self._log_slow(query, params, elapsed, rowcount)
+
+    def _log_slow(self, query, params, elapsed, rowcount):
+        entry = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round(elapsed * 1000, 2),
+            "rows": rowcount,
+            "sql": _display(query),
+            "params": param_shape(params),
+        }
+        with self._lock:
+            self._slow_count += 1
+            self._slow.append(entry)
+        if self.explain is not None:
+            try:
+                self._explain_worker().put_nowait((entry, query, params))
+                return
+            except queue.Full:
+                entry["plan"] = "skipped: EXPLAIN queue full"
+        logger.warning("slow query %s", json.dumps(entry, default=str))
+
+    def _explain_worker(self):
+        with self._lock:
+            if self._explain_queue is None:
+                self._explain_queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+                threading.Thread(target=self._run_explains, name="slow-query-explain", daemon=True).start()
+            return self._explain_queue
+
+    def _run_explains(self):
+        while True:
+            entry, query, params = self._explain_queue.get()
+            try:
+                plan = self.explain(query, params)
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+            with self._lock:
+                entry["plan"] = plan
+            logger.warning("slow query %s", json.dumps(entry, default=str))
+
+    def snapshot(self):
+        """Returns the slowest statements by total time, per-operation round trips and recent slow queries"""
+        with self._lock:
+            statements = [(query, dict(stats)) for query, stats in self._statements.items()]
+            operations = {name: dict(stats) for name, stats in self._operations.items()}
+            slow = [dict(entry) for entry in self._slow]
+            slow_count = self._slow_count
+            evicted = self._evicted
+        statements.sort(key=lambda item: item[1]["time"], reverse=True)
+        return {
+            "statements": [
+                {
+                    "sql": _display(query)[:200],
+                    "calls": stats["calls"],
+                    "total_ms": stats["time"] * 1000,
+                    "avg_ms": stats["time"] / stats["calls"] * 1000,
+                    "max_ms": stats["max_time"] * 1000,
+                    "avg_rows": stats["rows"] / stats["calls"],
+                }
+                for query, stats in statements[:TOP_STATEMENTS]
+            ],
+            "statements_evicted": evicted,
+            "operations": {
+                name: {
+                    "calls": stats["calls"],
+                    "avg_statements": stats["statements"] / stats["calls"],
+                    "max_statements": stats["max_statements"],
+                    "avg_db_ms": stats["db_time"] / stats["calls"] * 1000,
+                    "avg_ms": stats["time"] / stats["calls"] * 1000,
+                }
+                for name, stats in operations.items()
+            },
+            "slow_queries": {"threshold_ms": self.slow_query_ms, "count": slow_count, "recent": slow},
+        }
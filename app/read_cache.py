@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Cache namespaces; each key's first element is its namespace, and writes
+# invalidate whole namespaces
+CLASSES = "classes"
+ALL_CLASSES = "all_classes"
+ROOMS = "rooms"
+TRAINERS = "trainers"
+
+class ReadCache:
+    """In-process TTL and LRU cache for catalog reads.
+
+    Entries expire after ttl seconds and the least recently used entry is
+    evicted once max_entries is exceeded. Write methods call invalidate()
+    with the namespaces they change. Cached rows are shared between
+    callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Bumped on every invalidation so a load that raced a write is not stored
+        self._generations = {}
+        self._stats = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "invalidations": 0}
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for key, calling loader() on a miss"""
+        namespace = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            generation = self._generations.get(namespace, 0)
+
+        value = loader()
+
+        with self._lock:
+            if self._generations.get(namespace, 0) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, *namespaces):
+        """Drops every entry in the given namespaces"""
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            stale = [key for key in self._entries if key[0] in namespaces]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+
+    def stats(self):
+        """Returns a snapshot of cache counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
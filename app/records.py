@@ -0,0 +1,60 @@
+"""Row types returned by the operation classes.
+
+Each record is a namedtuple whose fields follow the SELECT list of the
+queries noted beside it, so a row maps onto it by position. Records are
+plain tuples with names: they cost no more memory than the driver's
+tuples, work with both psycopg2 and psycopg, and are rendered as text,
+JSON or CSV by render.py. Write operations return an Outcome instead of
+printing their result.
+"""
+from collections import namedtuple
+
+# CLASS_LISTING, CLASS_LISTING_PAGE, CLASSES_BETWEEN
+ClassListing = namedtuple("ClassListing", "class_id class_name start_time end_time total_registered capacity trainer_name")
+
+# ALL_CLASSES, ALL_CLASSES_PAGE
+ScheduledClass = namedtuple("ScheduledClass", "class_id class_name trainer_name room_name start_time end_time registered capacity")
+
+# ALL_ROOMS
+Room = namedtuple("Room", "room_id room_name room_type capacity location")
+
+# ALL_TRAINERS
+Trainer = namedtuple("Trainer", "trainer_id first_name last_name specialty hourly_rate email")
+
+# TRAINER_PT_SESSIONS, TRAINER_PT_SESSIONS_PAGE
+Session = namedtuple("Session", "session_id first_name last_name start_time end_time status")
+
+# TRAINER_CLASSES, TRAINER_CLASSES_PAGE
+TrainerClass = namedtuple("TrainerClass", "class_id class_name start_time end_time room_name capacity")
+
+# AVAILABLE_TRAINER_SLOTS, AVAILABLE_TRAINER_SLOTS_PAGE
+AvailabilitySlot = namedtuple("AvailabilitySlot", "trainer_id first_name last_name specialty start_time end_time")
+
+# EARLIEST_PT_SLOTS
+PtSlot = namedtuple("PtSlot", "trainer_id first_name last_name specialty hourly_rate start_time end_time")
+
+# MEMBER_NAMES, MEMBER_NAMES_PAGE, MEMBER_TYPEAHEAD
+MemberName = namedtuple("MemberName", "member_id first_name last_name")
+
+# MEMBER_SEARCH; the metric fields are None for members with no metrics
+MemberMatch = namedtuple("MemberMatch", "member_id first_name last_name email fitness_goal weight_kg body_fat_pct "
+                                        "resting_heart_rate systolic_bp diastolic_bp recorded_at score")
+
+# MEMBER_DASHBOARD (the member_dashboard view)
+Dashboard = namedtuple("Dashboard", "member_id full_name fitness_goal total_classes_registered total_training_sessions "
+                                    "last_metric_timestamp weight_kg body_fat_pct")
+
+# MEMBER_DAILY_TREND, MEMBER_WEEKLY_TREND (one daily or weekly rollup row)
+HealthTrend = namedtuple("HealthTrend", "period_start samples avg_weight_kg min_weight_kg max_weight_kg "
+                                        "avg_body_fat_pct avg_resting_heart_rate avg_systolic_bp avg_diastolic_bp")
+
+# The result of a write: whether it succeeded, one of the codes below and
+# the message to show the user
+Outcome = namedtuple("Outcome", "ok code message")
+
+DONE = "done"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+CONFLICT = "conflict"
+DUPLICATE = "duplicate"
+DATABASE_ERROR = "database_error"
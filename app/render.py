@@ -0,0 +1,114 @@
+"""Presentation of the records in records.py as terminal text, JSON and CSV.
+
+The operation classes return records (or lazy iterators of them) and
+leave formatting to this module, so the interactive menus, the HTTP API
+and the command mode all share one set of queries.
+"""
+import csv
+
+import records
+
+# Text lines per record type, formatted with the record's fields; an
+# empty string prints a blank line after the record
+TEXT_FORMATS = {
+    records.ClassListing: ("ID: {class_id} | {class_name} | Trainer: {trainer_name}",
+                           "  Time: {start_time} to {end_time}",
+                           "  Registered: {total_registered}/{capacity}",
+                           ""),
+    records.ScheduledClass: ("ID: {class_id} | {class_name} | Trainer: {trainer_name} | Room: {room_name}",
+                             "  Time: {start_time} to {end_time} | Registered: {registered}/{capacity}",
+                             ""),
+    records.Room: ("ID: {room_id} | {room_name} | Type: {room_type} | Capacity: {capacity} | Location: {location}",),
+    records.Trainer: ("ID: {trainer_id} | {first_name} {last_name} | Specialty: {specialty} | Rate: ${hourly_rate}/hr | Email: {email}",),
+    records.Session: ("Session {session_id}: {first_name} {last_name} | {start_time} to {end_time} | Status: {status}",),
+    records.TrainerClass: ("Class {class_id}: {class_name} | {start_time} to {end_time} | Room: {room_name} | Capacity: {capacity}",),
+    records.AvailabilitySlot: ("Trainer ID: {trainer_id} | {first_name} {last_name} | Specialty: {specialty}",
+                               "  Available: {start_time} to {end_time}",
+                               ""),
+    records.PtSlot: ("Trainer ID: {trainer_id} | {first_name} {last_name} | Specialty: {specialty}",
+                     "  {start_time} to {end_time}"),
+    records.MemberName: ("ID: {member_id} | {first_name} {last_name}",),
+    records.Dashboard: ("ID: {member_id}",
+                        "Name: {full_name}",
+                        "Fitness Goal: {fitness_goal}",
+                        "Classes Registered: {total_classes_registered}",
+                        "Training Sessions: {total_training_sessions}",
+                        "Last Metric Update: {last_metric_timestamp}",
+                        "Weight: {weight_kg} kg",
+                        "Body Fat: {body_fat_pct}%"),
+    records.HealthTrend: ("{period_start}: {samples} sample(s) | Weight: {avg_weight_kg} kg "
+                          "({min_weight_kg}-{max_weight_kg}) | Body Fat: {avg_body_fat_pct}% | "
+                          "Resting HR: {avg_resting_heart_rate} bpm | BP: {avg_systolic_bp}/{avg_diastolic_bp} mmHg",),
+    records.Outcome: ("{message}",),
+}
+
+MEMBER_MATCH_FORMAT = ("\nMember ID: {member_id}",
+                       "Name: {first_name} {last_name}",
+                       "Email: {email}",
+                       "Fitness Goal: {fitness_goal}")
+MEMBER_METRICS_FORMAT = ("Latest Health Metrics (as of {recorded_at}):",
+                         "  Weight: {weight_kg} kg",
+                         "  Body Fat: {body_fat_pct}%",
+                         "  Resting Heart Rate: {resting_heart_rate} bpm",
+                         "  Blood Pressure: {systolic_bp}/{diastolic_bp} mmHg")
+
+def text_lines(record):
+    """Returns the terminal lines for one record"""
+    fields = record._asdict()
+    if isinstance(record, records.MemberMatch):
+        lines = [line.format_map(fields) for line in MEMBER_MATCH_FORMAT]
+        if record.weight_kg:
+            return lines + [line.format_map(fields) for line in MEMBER_METRICS_FORMAT]
+        return lines + ["No health metrics recorded yet."]
+    template = TEXT_FORMATS.get(type(record))
+    if template is None:
+        return [" | ".join(f"{name}: {value}" for name, value in fields.items())]
+    return [line.format_map(fields) for line in template]
+
+
+def print_records(rows, heading, empty_message):
+    """Prints heading and then each record, or empty_message if there are none; returns whether any were printed.
+
+    rows may be a lazy iterator: the heading is printed with the first
+    record, so nothing is buffered.
+    """
+    found = False
+    for row in rows:
+        if not found:
+            print(heading)
+            found = True
+        for line in text_lines(row):
+            print(line)
+    if not found:
+        print(empty_message)
+    return found
+
+
+def print_outcome(outcome):
+    """Prints the message of a write's Outcome; returns whether the write succeeded"""
+    for line in text_lines(outcome):
+        print(line)
+    return outcome.ok
+
+
+def jsonable(value):
+    """Converts records, including ones nested in lists, tuples and dicts, to dicts for json.dumps"""
+    if hasattr(value, "_asdict"):
+        return {name: jsonable(field) for name, field in value._asdict().items()}
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return value
+
+
+def write_csv(rows, stream):
+    """Writes records as CSV with a header row taken from the record's fields; returns the number of rows"""
+    writer = csv.writer(stream)
+    count = 0
+    for row in rows:
+        if not count:
+            writer.writerow(row._fields)
+        writer.writerow(row)
+        count += 1
+    return count
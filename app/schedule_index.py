@@ -0,0 +1,304 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+import threading
+from psycopg2 import Error
+import queries
+
+def _as_datetime(value):
+    """Returns value as a naive datetime, or None if it cannot be parsed or has a time zone.
+
+    The schedule columns have no time zone, and PostgreSQL drops the offset
+    of a timestamp string but converts a zoned datetime parameter, so a
+    zoned value is left to the database rather than guessed at.
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+    return value if value.tzinfo is None else None
+
+
+class IntervalIndex:
+    """Per-key sorted arrays of [start, end) intervals.
+
+    Each key (a room or trainer id) keeps its intervals sorted by start
+    together with a running maximum of the end times, so an overlap or
+    containment query is a binary search followed by a walk that stops as
+    soon as no earlier interval can still reach the query. An interval is
+    found for removal by bisecting on its start, and adding or removing one
+    only updates the running maxima up to the point where they stop
+    changing.
+    """
+
+    def __init__(self):
+        self._timelines = {}
+        self._keys = {}
+
+    def add(self, key, item_id, start, end):
+        """Adds (or replaces) an interval under key"""
+        if item_id in self._keys:
+            self.remove(item_id)
+        starts, ends, ids, max_ends = self._timelines.setdefault(key, ([], [], [], []))
+        pos = bisect_right(starts, start)
+        starts.insert(pos, start)
+        ends.insert(pos, end)
+        ids.insert(pos, item_id)
+        max_ends.insert(pos, end if pos == 0 or max_ends[pos - 1] < end else max_ends[pos - 1])
+        # Later maxima only grow, and only until one already reaches end
+        i = pos + 1
+        while i < len(max_ends) and max_ends[i] < end:
+            max_ends[i] = end
+            i += 1
+        self._keys[item_id] = (key, start)
+
+    def remove(self, item_id):
+        """Removes an interval; unknown ids are ignored"""
+        entry = self._keys.pop(item_id, None)
+        if entry is None:
+            return
+        key, start = entry
+        starts, ends, ids, max_ends = self._timelines[key]
+        pos = bisect_left(starts, start)
+        while ids[pos] != item_id:
+            pos += 1
+        for column in (starts, ends, ids, max_ends):
+            del column[pos]
+        self._rebuild_max(max_ends, ends, pos)
+
+    @staticmethod
+    def _rebuild_max(max_ends, ends, pos):
+        """Recomputes the running maxima from pos after a removal"""
+        running = max_ends[pos - 1] if pos > 0 else None
+        for i in range(pos, len(ends)):
+            running = ends[i] if running is None or ends[i] > running else running
+            if max_ends[i] == running:
+                # Every later maximum is unchanged from here on
+                return
+            max_ends[i] = running
+
+    def overlapping(self, key, start, end):
+        """Yields ids of intervals under key that overlap [start, end)"""
+        timeline = self._timelines.get(key)
+        if timeline is None:
+            return
+        starts, ends, ids, max_ends = timeline
+        i = bisect_left(starts, end) - 1
+        while i >= 0 and max_ends[i] > start:
+            if ends[i] > start:
+                yield ids[i]
+            i -= 1
+
+    def overlaps(self, key, start, end, exclude=None):
+        return any(item_id != exclude for item_id in self.overlapping(key, start, end))
+
+    def containing(self, key, start, end):
+        """Yields ids of intervals under key that fully contain [start, end]"""
+        timeline = self._timelines.get(key)
+        if timeline is None:
+            return
+        starts, ends, ids, max_ends = timeline
+        i = bisect_right(starts, start) - 1
+        while i >= 0 and max_ends[i] >= end:
+            if ends[i] >= end:
+                yield ids[i]
+            i -= 1
+
+
+class ScheduleIndex:
+    """In-memory view of room and trainer bookings for conflict checks.
+
+    The operation classes consult it before a booking and update it after
+    each successful commit. The index is advisory: a request it finds free
+    goes straight to the database, whose exclusion constraints remain
+    authoritative, and a conflict it reports is confirmed by re-reading the
+    clashing rows before the request is rejected. Rows changed by other
+    processes are corrected as they are re-read; refresh() reloads
+    everything.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.room_classes = IntervalIndex()
+        self.trainer_classes = IntervalIndex()
+        self.trainer_sessions = IntervalIndex()
+        self.open_windows = IntervalIndex()
+        self._windows = {}
+        self._classes = {}
+
+    def refresh(self):
+        """(Re)loads every class, PT session and availability window"""
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.SCHEDULE_CLASSES)
+            classes = cursor.fetchall()
+            cursor.execute(queries.SCHEDULE_SESSIONS)
+            sessions = cursor.fetchall()
+            cursor.execute(queries.SCHEDULE_AVAILABILITY)
+            windows = cursor.fetchall()
+
+        with self._lock:
+            self._reset()
+            for class_id, trainer_id, room_id, start, end in classes:
+                self.record_class(class_id, trainer_id, room_id, start, end)
+            for session_id, trainer_id, start, end in sessions:
+                self.trainer_sessions.add(trainer_id, session_id, start, end)
+            by_trainer = {}
+            for trainer_id, start, end in windows:
+                by_trainer.setdefault(trainer_id, []).append((start, end))
+            for trainer_id, trainer_windows in by_trainer.items():
+                self.record_availability(trainer_id, trainer_windows)
+
+    # Re-reads of the rows behind a reported conflict
+    def _reload_classes(self, class_ids):
+        """Replaces the given classes with their database rows, dropping deleted ones"""
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.SCHEDULE_CLASSES_BY_ID, (list(class_ids),))
+            rows = cursor.fetchall()
+        with self._lock:
+            for class_id in class_ids:
+                self.remove_class(class_id)
+            for class_id, trainer_id, room_id, start, end in rows:
+                self.record_class(class_id, trainer_id, room_id, start, end)
+
+    def _reload_sessions(self, session_ids):
+        """Replaces the given PT sessions with their database rows, dropping deleted ones"""
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.SCHEDULE_SESSIONS_BY_ID, (list(session_ids),))
+            rows = cursor.fetchall()
+        with self._lock:
+            for session_id in session_ids:
+                self.trainer_sessions.remove(session_id)
+            for session_id, trainer_id, start, end in rows:
+                self.trainer_sessions.add(trainer_id, session_id, start, end)
+
+    def _reload_windows(self, trainer_id):
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(queries.SCHEDULE_TRAINER_AVAILABILITY, (trainer_id,))
+            windows = cursor.fetchall()
+        self.record_availability(trainer_id, windows)
+
+    def _class_clashes(self, trainer_id, room_id, start, end, class_id):
+        with self._lock:
+            trainer_ids = [i for i in self.trainer_classes.overlapping(trainer_id, start, end) if i != class_id] \
+                if trainer_id is not None else []
+            room_ids = [i for i in self.room_classes.overlapping(room_id, start, end) if i != class_id] \
+                if room_id is not None else []
+        return trainer_ids, room_ids
+
+    # Conflict checks: each returns the error message the database path
+    # would print, or None if the request looks bookable. A conflict is
+    # only reported once the database rows behind it have been re-read; if
+    # that fails, or the times cannot be compared, the request is left to
+    # the database to decide.
+    def class_conflict(self, trainer_id, room_id, start_time, end_time, class_id=None):
+        start, end = _as_datetime(start_time), _as_datetime(end_time)
+        if start is None or end is None:
+            return None
+        try:
+            trainer_ids, room_ids = self._class_clashes(trainer_id, room_id, start, end, class_id)
+            if not trainer_ids and not room_ids:
+                return None
+            self._reload_classes(trainer_ids + room_ids)
+            trainer_ids, room_ids = self._class_clashes(trainer_id, room_id, start, end, class_id)
+        except (Error, TypeError):
+            return None
+        if trainer_ids:
+            return "Error: Trainer has conflicting class during this time."
+        if room_ids:
+            return "Error: Room is already booked during this time."
+        return None
+
+    def room_conflict(self, room_id, class_id, start_time, end_time):
+        return self.class_conflict(None, room_id, start_time, end_time, class_id)
+
+    def pt_session_conflict(self, trainer_id, start_time, end_time):
+        """Returns the book_pt_session() result code the request would hit, or None"""
+        start, end = _as_datetime(start_time), _as_datetime(end_time)
+        if start is None or end is None:
+            return None
+        try:
+            # Same order as book_pt_session(): booked time is no longer open,
+            # so sessions come before the availability check
+            with self._lock:
+                session_ids = list(self.trainer_sessions.overlapping(trainer_id, start, end))
+            if session_ids:
+                self._reload_sessions(session_ids)
+                with self._lock:
+                    if self.trainer_sessions.overlaps(trainer_id, start, end):
+                        return queries.PT_CONFLICT
+
+            with self._lock:
+                available = next(self.open_windows.containing(trainer_id, start, end), None) is not None
+            if not available:
+                self._reload_windows(trainer_id)
+                with self._lock:
+                    if next(self.open_windows.containing(trainer_id, start, end), None) is None:
+                        return queries.PT_NOT_AVAILABLE
+
+            if self.class_conflict(trainer_id, None, start, end):
+                return queries.PT_CLASS_CONFLICT
+        except (Error, TypeError):
+            return None
+        return None
+
+    def class_times(self, class_id):
+        """Returns (start_time, end_time) of a class, or None if the index does not hold it"""
+        with self._lock:
+            slot = self._classes.get(class_id)
+        return None if slot is None else slot[2:]
+
+    # Write-through updates, called after a successful commit
+    def record_class(self, class_id, trainer_id, room_id, start_time, end_time):
+        start, end = _as_datetime(start_time), _as_datetime(end_time)
+        with self._lock:
+            self.remove_class(class_id)
+            if start is None or end is None:
+                return
+            self._classes[class_id] = (trainer_id, room_id, start, end)
+            self.trainer_classes.add(trainer_id, class_id, start, end)
+            if room_id is not None:
+                self.room_classes.add(room_id, class_id, start, end)
+
+    def move_class_room(self, class_id, room_id):
+        with self._lock:
+            slot = self._classes.get(class_id)
+            if slot is not None:
+                trainer_id, _, start, end = slot
+                self.record_class(class_id, trainer_id, room_id, start, end)
+
+    def remove_class(self, class_id):
+        with self._lock:
+            self._classes.pop(class_id, None)
+            self.trainer_classes.remove(class_id)
+            self.room_classes.remove(class_id)
+
+    def record_availability(self, trainer_id, windows):
+        """Replaces the trainer's open windows with [(start, end), ...]"""
+        with self._lock:
+            for window in self._windows.pop(trainer_id, []):
+                self.open_windows.remove((trainer_id, window[0]))
+            self._windows[trainer_id] = sorted(windows)
+            for start, end in self._windows[trainer_id]:
+                self.open_windows.add(trainer_id, (trainer_id, start), start, end)
+
+    def record_pt_session(self, session_id, trainer_id, start_time, end_time):
+        start, end = _as_datetime(start_time), _as_datetime(end_time)
+        if start is None or end is None:
+            return
+        with self._lock:
+            self.trainer_sessions.add(trainer_id, session_id, start, end)
+            # Mirror book_pt_session(): only the booked interval leaves the open time
+            remaining = []
+            for window_start, window_end in self._windows.get(trainer_id, []):
+                if window_end <= start or window_start >= end:
+                    remaining.append((window_start, window_end))
+                    continue
+                if window_start < start:
+                    remaining.append((window_start, start))
+                if end < window_end:
+                    remaining.append((end, window_end))
+            self.record_availability(trainer_id, remaining)
@@ -0,0 +1,90 @@
+"""Screen loaders: every listing a menu screen shows, in one round trip.
+
+A screen is a tuple of Listings. load() runs them as a single statement
+built by queries.listings_as_json(), which returns one JSON array per
+listing, and turns each array back into the listing's records. On a
+remote database this costs one network round trip per screen instead of
+one per listing.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+
+from records import Room, ScheduledClass, Session, Trainer, TrainerClass
+import queries
+import read_cache
+
+# name is the key in load()'s result; cache_key, for listings without
+# parameters, is the read cache key of the matching list_* method
+Listing = namedtuple("Listing", "name record query cache_key")
+
+# Timestamps arrive as ISO-8601 strings and are parsed back into datetimes
+TIMESTAMP_FIELDS = frozenset({"start_time", "end_time", "recorded_at", "last_metric_timestamp"})
+
+# Params: trainer, trainer
+TRAINER_SCHEDULE = (
+    Listing("pt_sessions", Session, queries.TRAINER_PT_SESSIONS, None),
+    Listing("classes", TrainerClass, queries.TRAINER_CLASSES, None),
+)
+
+ROOM_MANAGEMENT = (
+    Listing("rooms", Room, queries.ALL_ROOMS, (read_cache.ROOMS,)),
+    Listing("classes", ScheduledClass, queries.ALL_CLASSES, (read_cache.ALL_CLASSES,)),
+)
+
+CLASS_SETUP = (
+    Listing("trainers", Trainer, queries.ALL_TRAINERS, (read_cache.TRAINERS,)),
+    Listing("rooms", Room, queries.ALL_ROOMS, (read_cache.ROOMS,)),
+)
+
+_statements = {}
+
+def _statement(screen):
+    sql = _statements.get(screen)
+    if sql is None:
+        sql = _statements.setdefault(screen, queries.listings_as_json([(listing.name, listing.query) for listing in screen]))
+    return sql
+
+
+def _records(listing, text):
+    """Parses one listing's JSON array into records"""
+    rows = json.loads(text, parse_float=Decimal)
+    stamps = [field for field in listing.record._fields if field in TIMESTAMP_FIELDS]
+    for row in rows:
+        for field in stamps:
+            if row[field] is not None:
+                row[field] = datetime.fromisoformat(row[field])
+    return [listing.record(**row) for row in rows]
+
+
+def fetch(db, screen, params=()):
+    """Runs every listing of screen in one statement; returns {name: [records]}"""
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(_statement(screen), params)
+        row = cursor.fetchone()
+    return {listing.name: _records(listing, text) for listing, text in zip(screen, row)}
+
+
+def load(db, screen, params=(), cache=None):
+    """Returns {name: [records]} for every listing of screen in at most one round trip.
+
+    With a read cache, listings with a cache_key are served from it; the
+    first listing that misses loads the whole screen, and the loaded rows
+    fill the cache for the listings that missed.
+    """
+    loaded = {}
+
+    def load_listing(name):
+        if not loaded:
+            loaded.update(fetch(db, screen, params))
+        return loaded[name]
+
+    results = {}
+    for listing in screen:
+        if cache is not None and listing.cache_key is not None:
+            results[listing.name] = cache.get_or_load(listing.cache_key, partial(load_listing, listing.name))
+        else:
+            results[listing.name] = load_listing(listing.name)
+    return results
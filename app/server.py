@@ -0,0 +1,528 @@
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from psycopg2 import DataError, Error
+
+from database import Database
+from query_trace import DEFAULT_SLOW_QUERY_MS
+import pagination
+import queries
+import render
+from records import CONFLICT, DATABASE_ERROR, DUPLICATE, INVALID, NOT_FOUND
+from service import build_service
+
+logger = logging.getLogger("fitclub.server")
+
+# Largest request body read; bigger ones are refused with 413
+MAX_BODY_BYTES = 1024 * 1024
+
+class LatencyTracker:
+    """Keeps per-endpoint request counts and latency percentiles"""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, elapsed, failed):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "samples": deque(maxlen=self.window)}
+                self._endpoints[endpoint] = stats
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            stats["samples"].append(elapsed)
+
+    def snapshot(self):
+        """Returns latency figures in milliseconds for every endpoint seen"""
+        with self._lock:
+            report = {}
+            for endpoint, stats in self._endpoints.items():
+                samples = sorted(stats["samples"])
+                report[endpoint] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": stats["total"] / stats["count"] * 1000,
+                    "p50_ms": _percentile(samples, 0.50) * 1000,
+                    "p95_ms": _percentile(samples, 0.95) * 1000,
+                    "p99_ms": _percentile(samples, 0.99) * 1000,
+                    "max_ms": stats["max"] * 1000,
+                }
+            return report
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class ApiError(Exception):
+    """Raised by handlers to return a specific HTTP status, optionally with extra payload fields"""
+
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+
+# Body fields that are not plain strings; ids may arrive as numbers or digit strings
+INT_FIELDS = {"member_id", "trainer_id", "room_id", "admin_id", "capacity", "every_weeks",
+              "resting_heart_rate", "systolic_bp", "diastolic_bp"}
+NUMBER_FIELDS = {"weight_kg", "body_fat_pct"}
+BOOL_FIELDS = {"waitlist"}
+NULLABLE_FIELDS = {"description"}
+# The "value" of a PATCH may be text or a number, depending on the field it sets
+SCALAR_FIELDS = {"value"}
+LIST_FIELDS = {"exceptions"}
+
+
+def _field(body, name):
+    """Returns a body field after checking its JSON type, or raises ApiError(400)"""
+    value = body[name]
+    if name in INT_FIELDS:
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            value = int(value)
+        if type(value) is not int:
+            raise ApiError(400, f"{name} must be an integer")
+    elif name in NUMBER_FIELDS:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ApiError(400, f"{name} must be a number")
+    elif name in BOOL_FIELDS:
+        if not isinstance(value, bool):
+            raise ApiError(400, f"{name} must be true or false")
+    elif name in SCALAR_FIELDS:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ApiError(400, f"{name} must be a string or a number")
+    elif name in LIST_FIELDS:
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ApiError(400, f"{name} must be a list of strings")
+    elif not isinstance(value, str) and not (value is None and name in NULLABLE_FIELDS):
+        raise ApiError(400, f"{name} must be a string")
+    return value
+
+
+def _require(body, *fields):
+    missing = [field for field in fields if field not in body]
+    if missing:
+        raise ApiError(400, f"Missing fields: {', '.join(missing)}")
+    return [_field(body, field) for field in fields]
+
+
+def _optional(body, name, default):
+    return _field(body, name) if name in body else default
+
+
+def _int_param(query, name, default):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    if value < 1:
+        raise ApiError(400, f"{name} must be at least 1")
+    return value
+
+
+def _page(name, fetch, query):
+    """Runs a keyset page fetch with the limit/cursor query parameters"""
+    limit = min(_int_param(query, "limit", pagination.DEFAULT_PAGE_SIZE), pagination.MAX_PAGE_SIZE)
+    cursor = query.get("cursor", [None])[0]
+    try:
+        rows, next_cursor = fetch(limit, cursor)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return {name: rows, "next_cursor": next_cursor}
+
+
+# HTTP status for each way a write can be refused
+OUTCOME_STATUS = {NOT_FOUND: 404, INVALID: 400, CONFLICT: 409, DUPLICATE: 409, DATABASE_ERROR: 500}
+REGISTRATION_STATUS = {queries.ALREADY_REGISTERED: 409, queries.CLASS_FULL: 409, queries.CLASS_NOT_FOUND: 404}
+# Left out of the public trainer listing
+TRAINER_CONTACT_FIELDS = ("email",)
+
+
+def _outcome(outcome):
+    """Returns a successful write's Outcome as JSON, or raises ApiError with the refusal's status"""
+    if not outcome.ok:
+        raise ApiError(OUTCOME_STATUS[outcome.code], outcome.message, {"ok": False, "result": outcome.code})
+    return {"ok": True, "result": outcome.code, "message": outcome.message}
+
+
+# Roles allowed on protected routes; admins may act on any member or trainer
+ALL_ROLES = ("member", "trainer", "admin")
+MEMBER_ROLES = ("member", "admin")
+TRAINER_ROLES = ("trainer", "admin")
+STAFF_ROLES = ("trainer", "admin")
+ADMIN_ROLES = ("admin",)
+
+class ClubApi:
+    """Maps HTTP routes onto ClubService methods.
+
+    Routes registered with roles need an "Authorization: Bearer <token>"
+    header from POST /login. Owned routes also require a member or trainer
+    to be acting on their own id: the first id in the path, or for routes
+    owned by a body field, that field of the JSON body. With
+    require_auth=False every route is open, as it was before sessions
+    existed. Refused writes answer 400, 404 or 409 with the result code.
+    """
+
+    def __init__(self, service, require_auth=True):
+        self.service = service
+        self.require_auth = require_auth
+        self._request = threading.local()
+        self.latency = LatencyTracker()
+        self.routes = []
+        self._add("POST", r"/login", self.login)
+        self._add("POST", r"/logout", self.logout, roles=ALL_ROLES)
+        self._add("GET", r"/session", self.current_session, roles=ALL_ROLES)
+        self._add("POST", r"/members", self.register_member)
+        self._add("GET", r"/members/search", self.member_lookup, roles=STAFF_ROLES)
+        self._add("GET", r"/members/names", self.member_names, roles=STAFF_ROLES)
+        self._add("GET", r"/members/typeahead", self.member_typeahead, roles=STAFF_ROLES)
+        self._add("GET", r"/members/(\d+)/dashboard", self.member_dashboard, roles=MEMBER_ROLES, owned=True)
+        self._add("GET", r"/members/(\d+)/health-trends", self.health_trends, roles=MEMBER_ROLES, owned=True)
+        self._add("PATCH", r"/members/(\d+)", self.update_member, roles=MEMBER_ROLES, owned=True)
+        self._add("POST", r"/members/(\d+)/health-metrics", self.log_health_metric, roles=MEMBER_ROLES, owned=True)
+        self._add("GET", r"/classes", self.list_classes)
+        self._add("POST", r"/classes/(\d+)/registrations", self.register_for_class, roles=MEMBER_ROLES, owned="member_id")
+        self._add("DELETE", r"/classes/(\d+)/registrations", self.cancel_registration, roles=MEMBER_ROLES, owned="member_id")
+        self._add("GET", r"/trainer-availability", self.list_trainer_availability)
+        self._add("GET", r"/pt-slots", self.find_pt_slots)
+        self._add("POST", r"/pt-sessions", self.book_personal_training, roles=MEMBER_ROLES, owned="member_id")
+        self._add("POST", r"/trainers/(\d+)/availability", self.set_availability, roles=TRAINER_ROLES, owned=True)
+        self._add("GET", r"/trainers/(\d+)/schedule", self.trainer_schedule, roles=TRAINER_ROLES, owned=True)
+        self._add("GET", r"/trainers/(\d+)/pt-sessions", self.trainer_sessions, roles=TRAINER_ROLES, owned=True)
+        self._add("GET", r"/trainers/(\d+)/classes", self.trainer_classes, roles=TRAINER_ROLES, owned=True)
+        self._add("GET", r"/trainers", self.list_trainers)
+        self._add("GET", r"/rooms", self.list_rooms)
+        self._add("GET", r"/admin/classes", self.list_all_classes, roles=ADMIN_ROLES)
+        self._add("POST", r"/admin/classes", self.create_class, roles=ADMIN_ROLES)
+        self._add("POST", r"/admin/class-series", self.create_class_series, roles=ADMIN_ROLES)
+        self._add("PATCH", r"/admin/classes/(\d+)", self.update_class, roles=ADMIN_ROLES)
+        self._add("DELETE", r"/admin/classes/(\d+)", self.cancel_class, roles=ADMIN_ROLES)
+        self._add("POST", r"/admin/classes/(\d+)/room", self.book_room, roles=ADMIN_ROLES)
+        self._add("GET", r"/stats", self.stats, roles=ADMIN_ROLES)
+
+    def _add(self, method, pattern, handler, roles=None, owned=False):
+        self.routes.append((method, re.compile(pattern + r"/?$"), pattern, handler, roles, owned))
+
+    def _acting_admin(self, body):
+        """The admin a class is created by: the logged-in admin, or the body's admin_id when auth is off"""
+        session = self._request.session
+        if session is not None:
+            return session["user_id"]
+        (admin_id,) = _require(body, "admin_id")
+        return admin_id
+
+    def _authorize(self, token, roles, owned, args, body):
+        """Checks the bearer token against a route's roles without a database query"""
+        session = self.service.authenticate(token)
+        if session is None:
+            raise ApiError(401, "Login required")
+        if session["role"] not in roles:
+            raise ApiError(403, "Not allowed for this role")
+        if owned and session["role"] != "admin":
+            # owned=True means the path id; a string names the body field
+            # holding the id, which may arrive as a number or a string. A
+            # missing field is left to the handler's 400.
+            if owned is True:
+                owner = args[0]
+            elif isinstance(body, dict):
+                owner = body.get(owned, session["user_id"])
+            else:
+                owner = None
+            if str(owner) != str(session["user_id"]):
+                raise ApiError(403, "Not allowed for this account")
+        return session
+
+    def dispatch(self, method, path, query, body, authorization=None):
+        """Runs the matching handler and returns (status, payload)"""
+        token = authorization[len("Bearer "):] if authorization and authorization.startswith("Bearer ") else None
+        # Each request runs on its own thread, so handlers can read it back
+        self._request.token = token
+        self._request.session = None
+        for route_method, regex, pattern, handler, roles, owned in self.routes:
+            match = regex.match(path)
+            if match and route_method == method:
+                endpoint = f"{method} {pattern}"
+                started = time.perf_counter()
+                failed = True
+                try:
+                    args = [int(group) for group in match.groups()]
+                    if roles and self.require_auth:
+                        self._request.session = self._authorize(token, roles, owned, args, body)
+                    with self.service.db.operation(endpoint):
+                        payload = handler(*args, query=query, body=body)
+                    failed = False
+                    return 200, payload
+                except ApiError as e:
+                    return e.status, {"error": str(e), **e.details}
+                except DataError as e:
+                    # A value of the right JSON type that the column rejects, such as a malformed timestamp
+                    return 400, {"error": f"Invalid value: {e.diag.message_primary}"}
+                except Error as e:
+                    return 500, {"error": f"Database Error: {e}"}
+                except Exception:
+                    logger.exception("Unhandled error in %s", endpoint)
+                    return 500, {"error": "Internal server error"}
+                finally:
+                    self.latency.record(endpoint, time.perf_counter() - started, failed)
+        return 404, {"error": f"No route for {method} {path}"}
+
+    # Accounts
+    def login(self, query, body):
+        role, email, password = _require(body, "role", "email", "password")
+        user_id, token = self.service.start_session(role, email, password)
+        if user_id is None:
+            raise ApiError(401, "Invalid credentials")
+        return {"role": role, "user_id": user_id, "token": token}
+
+    def logout(self, query, body):
+        if not self.service.end_session(self._request.token):
+            raise ApiError(401, "Login required")
+        return {"ok": True}
+
+    def current_session(self, query, body):
+        session = self.service.authenticate(self._request.token)
+        if session is None:
+            raise ApiError(401, "Login required")
+        return {"role": session["role"], "user_id": session["user_id"], "expires_at": session["expires_at"]}
+
+    def register_member(self, query, body):
+        fields = _require(body, "first_name", "last_name", "email", "date_of_birth", "gender", "phone", "fitness_goal", "password")
+        return _outcome(self.service.register_member(*fields))
+
+    # Members
+    def member_dashboard(self, member_id, query, body):
+        return {"dashboard": self.service.member_dashboard(member_id)}
+
+    def health_trends(self, member_id, query, body):
+        period = query.get("period", ["daily"])[0]
+        if period not in ("daily", "weekly"):
+            raise ApiError(400, "period must be 'daily' or 'weekly'")
+        limit = _int_param(query, "limit", 30)
+        return {"period": period, "trends": self.service.health_trends(member_id, period == "weekly", limit)}
+
+    def update_member(self, member_id, query, body):
+        field, value = _require(body, "field", "value")
+        if field == "fitness_goal":
+            return _outcome(self.service.update_fitness_goal(member_id, value))
+        return _outcome(self.service.update_personal_details(member_id, field, value))
+
+    def log_health_metric(self, member_id, query, body):
+        fields = _require(body, "weight_kg", "body_fat_pct", "resting_heart_rate", "systolic_bp", "diastolic_bp")
+        recorded_at = _optional(body, "recorded_at", "NOW()")
+        return _outcome(self.service.log_health_metric(member_id, *fields, recorded_at=recorded_at))
+
+    def list_classes(self, query, body):
+        return _page("classes", self.service.page_classes, query)
+
+    def register_for_class(self, class_id, query, body):
+        (member_id,) = _require(body, "member_id")
+        registration = self.service.register_for_class(member_id, class_id, _optional(body, "waitlist", True))
+        status = REGISTRATION_STATUS.get(registration["result"])
+        if status is not None:
+            raise ApiError(status, queries.REGISTRATION_MESSAGES[registration["result"]], {"ok": False, **registration})
+        # Joining the waitlist is a success: the member asked for it
+        registration["ok"] = True
+        return registration
+
+    def cancel_registration(self, class_id, query, body):
+        (member_id,) = _require(body, "member_id")
+        return _outcome(self.service.cancel_class_registration(member_id, class_id))
+
+    def list_trainer_availability(self, query, body):
+        return _page("availability", self.service.page_trainer_availability, query)
+
+    def find_pt_slots(self, query, body):
+        duration = _int_param(query, "duration", 60)
+        limit = min(_int_param(query, "limit", 5), pagination.MAX_PAGE_SIZE)
+        try:
+            slots = self.service.find_pt_slots(duration, query.get("from", [None])[0], query.get("to", [None])[0],
+                                               query.get("specialty", [None])[0], limit)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        return {"slots": slots}
+
+    def book_personal_training(self, query, body):
+        fields = _require(body, "member_id", "trainer_id", "start_time", "end_time")
+        booking = self.service.book_personal_training(*fields)
+        if booking["result"] != queries.PT_BOOKED:
+            raise ApiError(409, queries.PT_BOOKING_MESSAGES[booking["result"]], {"ok": False, **booking})
+        booking["ok"] = True
+        return booking
+
+    # Trainers
+    def set_availability(self, trainer_id, query, body):
+        start_time, end_time = _require(body, "start_time", "end_time")
+        return _outcome(self.service.set_availability(trainer_id, start_time, end_time))
+
+    def trainer_schedule(self, trainer_id, query, body):
+        return self.service.trainer_schedule(trainer_id)
+
+    def trainer_sessions(self, trainer_id, query, body):
+        return _page("pt_sessions", lambda limit, cursor: self.service.page_trainer_sessions(trainer_id, limit, cursor), query)
+
+    def trainer_classes(self, trainer_id, query, body):
+        return _page("classes", lambda limit, cursor: self.service.page_trainer_classes(trainer_id, limit, cursor), query)
+
+    def member_names(self, query, body):
+        return _page("members", self.service.page_member_names, query)
+
+    def member_lookup(self, query, body):
+        name = query.get("name", [""])[0]
+        if not name:
+            raise ApiError(400, "Missing query parameter: name")
+        page = _int_param(query, "page", 1)
+        page_size = min(_int_param(query, "page_size", 20), 100)
+        return {"page": page, "members": self.service.member_lookup(name, page, page_size)}
+
+    def member_typeahead(self, query, body):
+        prefix = query.get("prefix", [""])[0]
+        if not prefix.strip():
+            return {"members": []}
+        limit = min(_int_param(query, "limit", 10), 50)
+        return {"members": self.service.member_typeahead(prefix, limit)}
+
+    # Admin
+    def list_trainers(self, query, body):
+        trainers = self.service.list_trainers()
+        if self.require_auth and self.service.authenticate(self._request.token) is None:
+            # Anonymous callers see the roster without contact details
+            trainers = [{field: value for field, value in trainer._asdict().items() if field not in TRAINER_CONTACT_FIELDS}
+                        for trainer in trainers]
+        return {"trainers": trainers}
+
+    def list_rooms(self, query, body):
+        return {"rooms": self.service.list_rooms()}
+
+    def list_all_classes(self, query, body):
+        return _page("classes", self.service.page_all_classes, query)
+
+    def create_class(self, query, body):
+        trainer_id, room_id, *details = _require(body, "trainer_id", "room_id", "class_name", "description", "start_time", "end_time", "capacity")
+        return _outcome(self.service.create_class(trainer_id, self._acting_admin(body), room_id, *details))
+
+    def create_class_series(self, query, body):
+        trainer_id, room_id, *details = _require(body, "trainer_id", "room_id", "class_name", "description", "start_time", "end_time", "capacity", "until")
+        try:
+            classes, conflicts = self.service.create_class_series(trainer_id, self._acting_admin(body), room_id, *details,
+                                                                  every_weeks=_optional(body, "every_weeks", 1),
+                                                                  exceptions=_optional(body, "exceptions", ()))
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if conflicts:
+            raise ApiError(409, f"Series not created: {len(conflicts)} conflict(s)", {"conflicts": conflicts})
+        return {"ok": True, "classes": classes}
+
+    def update_class(self, class_id, query, body):
+        field, value = _require(body, "field", "value")
+        return _outcome(self.service.update_class(class_id, field, value))
+
+    def cancel_class(self, class_id, query, body):
+        return _outcome(self.service.cancel_class(class_id))
+
+    def book_room(self, class_id, query, body):
+        (room_id,) = _require(body, "room_id")
+        return _outcome(self.service.book_room(class_id, room_id))
+
+    def stats(self, query, body):
+        stats = {"endpoints": self.latency.snapshot(), "pool": self.service.db.stats(), "queries": self.service.db.query_stats()}
+        if self.service.cache is not None:
+            stats["cache"] = self.service.cache.stats()
+        return stats
+
+
+def make_handler(api):
+    """Builds a request handler class bound to one ClubApi"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _handle(self):
+            url = urlparse(self.path)
+            body = {}
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0 or length > MAX_BODY_BYTES:
+                # The body is left unread, so the connection cannot be reused
+                self.close_connection = True
+                if length < 0:
+                    self._send(400, {"error": "Invalid Content-Length"})
+                else:
+                    self._send(413, {"error": f"Request body exceeds {MAX_BODY_BYTES} bytes"})
+                return
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self._send(400, {"error": "Request body must be JSON"})
+                    return
+                if not isinstance(body, dict):
+                    self._send(400, {"error": "Request body must be a JSON object"})
+                    return
+            status, payload = api.dispatch(self.command, url.path, parse_qs(url.query), body,
+                                           self.headers.get("Authorization"))
+            self._send(status, payload)
+
+        def _send(self, status, payload):
+            data = json.dumps(render.jsonable(payload), default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitness club JSON API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--min-connections", type=int, default=2)
+    parser.add_argument("--max-connections", type=int, default=20)
+    parser.add_argument("--cache-ttl", type=float, default=30.0, help="seconds catalog reads stay cached")
+    parser.add_argument("--no-auth", action="store_true", help="serve every route without session tokens")
+    parser.add_argument("--slow-query-ms", type=float, default=DEFAULT_SLOW_QUERY_MS, help="log statements slower than this; 0 disables")
+    parser.add_argument("--explain-slow", action="store_true", help="attach plans to slow SELECTs: EXPLAIN (ANALYZE, BUFFERS) for reads, estimated plans for ones that write")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    db = Database(minconn=args.min_connections, maxconn=args.max_connections,
+                  slow_query_ms=args.slow_query_ms or None, explain_slow=args.explain_slow)
+    try:
+        db.connect()
+    except Error as e:
+        parser.exit(1, f"Failed to connect to database: {e}\n")
+    api = ClubApi(build_service(db, cache_ttl=args.cache_ttl), require_auth=not args.no_auth)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api))
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
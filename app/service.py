@@ -0,0 +1,170 @@
+from member_operations import MemberOperations
+from trainer_operations import TrainerOperations
+from admin_operations import AdminOperations
+from utils import Utils
+from schedule_index import ScheduleIndex
+from read_cache import ReadCache
+from auth import SessionStore, shared_hasher
+from records import NOT_FOUND, Outcome
+
+ROLE_TABLES = {"member": "Member", "trainer": "Trainer", "admin": "Admin"}
+
+class ClubService:
+    """Service layer shared by the CLI and the HTTP server.
+
+    Read methods return records from records.py, which render.py turns
+    into text, JSON or CSV; write methods return an Outcome record that
+    render.print_outcome prints for the console.
+    """
+
+    def __init__(self, db, schedule=None, cache=None, sessions=None, hasher=None):
+        self.db = db
+        self.schedule = schedule
+        self.cache = cache
+        # One hashing pool for every operation class
+        self.hasher = hasher or shared_hasher()
+        self.sessions = sessions or SessionStore()
+        self.member_ops = MemberOperations(db, schedule, cache, self.hasher)
+        self.trainer_ops = TrainerOperations(db, schedule)
+        self.admin_ops = AdminOperations(db, schedule, cache)
+        self.utils = Utils(db, cache, self.hasher)
+
+    # Accounts
+    def login(self, role, email, password):
+        """Authenticate a member, trainer or admin and return their id, or None"""
+        table = ROLE_TABLES.get(role)
+        if table is None:
+            return None
+        return self.utils.login_user(email, password, table)
+
+    def start_session(self, role, email, password):
+        """Log in and return (user_id, session token), or (None, None) on failure"""
+        user_id = self.login(role, email, password)
+        if user_id is None:
+            return None, None
+        return user_id, self.sessions.create(role, user_id)
+
+    def authenticate(self, token):
+        """Return the session for a token without touching the database"""
+        return self.sessions.authenticate(token)
+
+    def end_session(self, token):
+        return self.sessions.revoke(token)
+
+    def register_member(self, first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password):
+        return self.member_ops.register_member(first_name, last_name, email, date_of_birth, gender, phone, fitness_goal, password)
+
+    # Members
+    def member_dashboard(self, member_id):
+        return self.member_ops.get_member_dashboard(member_id)
+
+    def health_trends(self, member_id, weekly=False, limit=30):
+        return self.member_ops.get_health_trends(member_id, weekly, limit)
+
+    def update_personal_details(self, member_id, field, value):
+        return self.member_ops.update_personal_details(member_id, field, value)
+
+    def update_fitness_goal(self, member_id, fitness_goal):
+        return self.member_ops.update_fitness_goal(member_id, fitness_goal)
+
+    def log_health_metric(self, member_id, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp, recorded_at="NOW()"):
+        return self.member_ops.input_new_health_metric(member_id, recorded_at, weight_kg, body_fat_pct, resting_heart_rate, systolic_bp, diastolic_bp)
+
+    def list_classes(self):
+        return self.utils.list_classes()
+
+    def page_classes(self, page_size, cursor=None):
+        return self.utils.page_classes(page_size, cursor)
+
+    def register_for_class(self, member_id, class_id, waitlist=True):
+        """Register or waitlist a member; returns the result code, registration id and waitlist position"""
+        result, registration_id, position = self.member_ops.claim_class_seat(member_id, class_id, waitlist)
+        return {"result": result, "registration_id": registration_id, "waitlist_position": position}
+
+    def cancel_class_registration(self, member_id, class_id):
+        return self.member_ops.cancel_class_registration(member_id, class_id)
+
+    def list_trainer_availability(self):
+        return self.utils.list_trainer_availability()
+
+    def page_trainer_availability(self, page_size, cursor=None):
+        return self.utils.page_trainer_availability(page_size, cursor)
+
+    def book_personal_training(self, member_id, trainer_id, start_time, end_time):
+        """Book a PT session; returns the booking result code and session id"""
+        result, session_id = self.member_ops.book_personal_training(member_id, trainer_id, start_time, end_time)
+        return {"result": result, "session_id": session_id}
+
+    # Trainers
+    def find_pt_slots(self, duration_minutes=60, start_time=None, end_time=None, specialty=None, limit=5):
+        return self.utils.find_pt_slots(duration_minutes, start_time, end_time, specialty, limit)
+
+    def set_availability(self, trainer_id, start_time, end_time):
+        return self.trainer_ops.set_trainer_availability(trainer_id, start_time, end_time)
+
+    def trainer_schedule(self, trainer_id):
+        return self.trainer_ops.get_schedule(trainer_id)
+
+    def page_trainer_sessions(self, trainer_id, page_size, cursor=None):
+        return self.trainer_ops.page_pt_sessions(trainer_id, page_size, cursor)
+
+    def page_trainer_classes(self, trainer_id, page_size, cursor=None):
+        return self.trainer_ops.page_classes(trainer_id, page_size, cursor)
+
+    def list_member_names(self):
+        return self.utils.list_member_names()
+
+    def page_member_names(self, page_size, cursor=None):
+        return self.utils.page_member_names(page_size, cursor)
+
+    def member_lookup(self, name, page=1, page_size=20):
+        return self.trainer_ops.find_members_by_name(name, page, page_size)
+
+    def member_typeahead(self, prefix, limit=10):
+        return self.utils.suggest_member_names(prefix, limit)
+
+    # Admin
+    def list_all_classes(self):
+        return self.admin_ops.list_all_classes()
+
+    def page_all_classes(self, page_size, cursor=None):
+        return self.admin_ops.page_all_classes(page_size, cursor)
+
+    def list_rooms(self):
+        return self.admin_ops.list_rooms()
+
+    def list_trainers(self):
+        return self.admin_ops.list_trainers()
+
+    def create_class(self, trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity):
+        return self.admin_ops.create_class(trainer_id, admin_id, room_id, class_name, description, start_time, end_time, capacity)
+
+    def create_class_series(self, trainer_id, admin_id, room_id, class_name, description, start_time, end_time,
+                            capacity, until, every_weeks=1, exceptions=()):
+        """Create a recurring series; returns (classes, conflicts) as AdminOperations.book_class_series"""
+        return self.admin_ops.book_class_series(trainer_id, admin_id, room_id, class_name, description,
+                                                start_time, end_time, capacity, until, every_weeks, exceptions)
+
+    def update_class(self, class_id, field, value):
+        return self.admin_ops.update_class(class_id, field, value)
+
+    def cancel_class(self, class_id):
+        return self.admin_ops.cancel_class(class_id)
+
+    def book_room(self, class_id, room_id):
+        """Assign a room to a class for the class's own time slot"""
+        # The schedule index saves the lookup round trip; the room's
+        # exclusion constraint still checks the class's stored times
+        times = self.schedule.class_times(class_id) if self.schedule is not None else None
+        if times is None:
+            times = self.admin_ops.get_class_times(class_id)
+        if times is None:
+            return Outcome(False, NOT_FOUND, f"No class found with ID {class_id}")
+        return self.admin_ops.manage_room_booking(room_id, class_id, times[0], times[1])
+
+
+def build_service(db, cache_ttl=30.0, cache_size=256):
+    """Creates a ClubService with a loaded in-memory schedule index and a catalog read cache"""
+    schedule = ScheduleIndex(db)
+    schedule.refresh()
+    return ClubService(db, schedule, ReadCache(cache_ttl, cache_size))
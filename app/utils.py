@@ -1,121 +1,158 @@
+from datetime import datetime, timedelta
 from psycopg2 import Error
+from auth import shared_hasher
+from records import AvailabilitySlot, ClassListing, MemberName, PtSlot
+import pagination
+import queries
+import read_cache
+import render
+
+# How far ahead the PT slot search looks when no end time is given
+SLOT_SEARCH_DAYS = 30
 
 class Utils:
     """Utility functions for common queries and helper operations"""
     
-    def __init__(self, db):
+    def __init__(self, db, cache=None, hasher=None):
         self.db = db
-        self.cursor = db.get_cursor()
-        self.connection = db.get_connection()
+        self.cache = cache
+        self.hasher = hasher or shared_hasher()
     
-    def get_classes(self):
-        """Display all classes with registration counts"""
-        query = """
-        SELECT 
-            c.class_id, 
-            c.class_name,
-            c.start_time,
-            c.end_time,
-            COUNT(cr.member_id) AS total_registered,
-            c.capacity,
-            t.first_name || ' ' || t.last_name AS trainer_name
-        FROM Class c
-        LEFT JOIN ClassRegistration cr ON c.class_id = cr.class_id
-        LEFT JOIN Trainer t ON c.trainer_id = t.trainer_id
-        GROUP BY c.class_id, c.class_name, c.start_time, c.end_time, c.capacity, t.first_name, t.last_name
-        ORDER BY c.start_time;
+    def _cached(self, key, loader, *args):
+        """Serve loader(*args) through the read cache when one is configured"""
+        if self.cache is None:
+            return loader(*args)
+        return self.cache.get_or_load(key, lambda: loader(*args))
+
+    def _fetch_all(self, record, query, params=()):
+        with self.db.connection() as conn, conn.cursor(cursor_factory=pagination.record_cursor(record)) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def list_classes(self):
+        """Return all classes with registration counts as ClassListing records"""
+        return self._cached((read_cache.CLASSES,), self._fetch_all, ClassListing, queries.CLASS_LISTING)
+
+    def list_classes_between(self, start_time, end_time):
+        """Return the classes starting from start_time up to but excluding end_time"""
+        return self._fetch_all(ClassListing, queries.CLASSES_BETWEEN, (start_time, end_time))
+
+    def list_trainer_availability(self):
+        """Return available trainer time slots as AvailabilitySlot records"""
+        return self._fetch_all(AvailabilitySlot, queries.AVAILABLE_TRAINER_SLOTS)
+
+    def list_member_names(self):
+        """Return all member names for trainer lookup as MemberName records"""
+        return self._fetch_all(MemberName, queries.MEMBER_NAMES)
+
+    def page_classes(self, page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None):
+        """Return one keyset page of classes and the cursor for the next page"""
+        return self._cached((read_cache.CLASSES, page_size, cursor), pagination.fetch_page,
+                            self.db, ClassListing, queries.CLASS_LISTING_PAGE, (), ("start_time", "class_id"), page_size, cursor)
+
+    def page_trainer_availability(self, page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None):
+        """Return one keyset page of available trainer slots and the next cursor"""
+        return pagination.fetch_page(self.db, AvailabilitySlot, queries.AVAILABLE_TRAINER_SLOTS_PAGE, (), ("start_time", "trainer_id"), page_size, cursor)
+
+    def page_member_names(self, page_size=pagination.DEFAULT_PAGE_SIZE, cursor=None):
+        """Return one keyset page of member names and the next cursor"""
+        return pagination.fetch_page(self.db, MemberName, queries.MEMBER_NAMES_PAGE, (), ("last_name", "first_name", "member_id"), page_size, cursor)
+
+    def iter_classes(self, itersize=pagination.DEFAULT_ITERSIZE):
+        """Stream all classes through a server-side cursor"""
+        return pagination.stream(self.db, ClassListing, queries.CLASS_LISTING, (), itersize)
+
+    def iter_trainer_availability(self, itersize=pagination.DEFAULT_ITERSIZE):
+        """Stream available trainer slots through a server-side cursor"""
+        return pagination.stream(self.db, AvailabilitySlot, queries.AVAILABLE_TRAINER_SLOTS, (), itersize)
+
+    def iter_member_names(self, itersize=pagination.DEFAULT_ITERSIZE):
+        """Stream member names through a server-side cursor"""
+        return pagination.stream(self.db, MemberName, queries.MEMBER_NAMES, (), itersize)
+
+    def suggest_member_names(self, prefix, limit=10):
+        """Return members whose full or last name starts with prefix"""
+        pattern = queries.like_escape(prefix.strip().lower()) + "%"
+        return self._fetch_all(MemberName, queries.MEMBER_TYPEAHEAD, (pattern, pattern, limit))
+
+    def find_pt_slots(self, duration_minutes=60, start_time=None, end_time=None, specialty=None, limit=5, step_minutes=30):
+        """Return the earliest bookable PT slots of the given length across all trainers.
+
+        Searches from start_time (default now) to end_time (default
+        SLOT_SEARCH_DAYS later), optionally only trainers whose specialty
+        contains specialty. Slots start every step_minutes within each free
+        gap. Raises ValueError for a non-positive duration, step or limit.
         """
+        if duration_minutes <= 0 or step_minutes <= 0 or limit <= 0:
+            raise ValueError("Duration, step and limit must be positive")
+        start = datetime.fromisoformat(start_time) if isinstance(start_time, str) else start_time or datetime.now()
+        end = datetime.fromisoformat(end_time) if isinstance(end_time, str) else end_time or start + timedelta(days=SLOT_SEARCH_DAYS)
+        pattern = f"%{queries.like_escape(specialty.strip())}%" if specialty and specialty.strip() else None
+        return self._fetch_all(PtSlot, queries.EARLIEST_PT_SLOTS, (start, end, timedelta(minutes=duration_minutes),
+                                                                   timedelta(minutes=step_minutes), pattern, limit))
+
+    def show_pt_slots(self, duration_minutes=60, specialty=None, limit=5):
+        """Display the earliest open PT slots"""
         try:
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            
-            if results:
-                print("\n=== AVAILABLE CLASSES ===")
-                for row in results:
-                    print(f"ID: {row[0]} | {row[1]} | Trainer: {row[6]}")
-                    print(f"  Time: {row[2]} to {row[3]}")
-                    print(f"  Registered: {row[4]}/{row[5]}")
-                    print()
-                return True
-            else:
-                print("No classes available.")
-                return False
+            slots = self.find_pt_slots(duration_minutes, specialty=specialty, limit=limit)
+            return render.print_records(slots, f"\n=== EARLIEST {duration_minutes}-MINUTE PT SLOTS ===",
+                                        f"No open PT slots found in the next {SLOT_SEARCH_DAYS} days.")
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
         except Error as e:
             print(f"Database Error: {e}")
             return False
     
-    def get_trainer_availability(self):
-        """Display available trainer time slots"""
-        query = """
-        SELECT 
-            t.trainer_id, 
-            t.first_name, 
-            t.last_name, 
-            t.specialty, 
-            ta.start_time, 
-            ta.end_time,
-            ta.availability_id
-        FROM TrainerAvailability ta
-        JOIN Trainer t ON ta.trainer_id = t.trainer_id
-        WHERE ta.is_booked = FALSE
-        ORDER BY ta.start_time;
-        """
+    def get_classes(self, itersize=pagination.DEFAULT_ITERSIZE):
+        """Display all classes with registration counts"""
         try:
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            
-            if results:
-                print("\n=== AVAILABLE TRAINER SLOTS ===")
-                for row in results:
-                    print(f"Trainer ID: {row[0]} | {row[1]} {row[2]} | Specialty: {row[3]}")
-                    print(f"  Available: {row[4]} to {row[5]}")
-                    print()
-                return True
-            else:
-                print("No trainer availability at this time.")
-                return False
+            # A cached listing is already in memory; otherwise stream it
+            rows = self.list_classes() if self.cache is not None else self.iter_classes(itersize)
+            return render.print_records(rows, "\n=== AVAILABLE CLASSES ===", "No classes available.")
         except Error as e:
             print(f"Database Error: {e}")
             return False
     
-    def get_member_names_for_lookup(self):
+    def get_trainer_availability(self, itersize=pagination.DEFAULT_ITERSIZE):
+        """Display available trainer time slots"""
+        try:
+            return render.print_records(self.iter_trainer_availability(itersize), "\n=== AVAILABLE TRAINER SLOTS ===",
+                                        "No trainer availability at this time.")
+        except Error as e:
+            print(f"Database Error: {e}")
+            return False
+
+    def get_member_names_for_lookup(self, itersize=pagination.DEFAULT_ITERSIZE):
         """Display all member names for trainer lookup"""
-        query = "SELECT member_id, first_name, last_name FROM Member ORDER BY last_name, first_name;"
         try:
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            
-            if results:
-                print("\n=== REGISTERED MEMBERS ===")
-                for row in results:
-                    print(f"ID: {row[0]} | {row[1]} {row[2]}")
-                return True
-            else:
-                print("No members found.")
-                return False
+            return render.print_records(self.iter_member_names(itersize), "\n=== REGISTERED MEMBERS ===", "No members found.")
         except Error as e:
             print(f"Database Error: {e}")
             return False
     
     def login_user(self, email, password, table):
-        """Authenticate user login"""
-        query = f"SELECT {table.lower()}_id, password FROM {table} WHERE email = %s;"
-        try:
-            self.cursor.execute(query, (email,))
-            row = self.cursor.fetchone()
-
-            if row is None:
-                print("No account found with that email.")
-                return None
-
-            user_id, stored_password = row
+        """Return the user's id if the email and password match, else None"""
+        with self.db.connection() as conn, conn.cursor() as cursor:
+            self.db.execute_prepared(cursor, f"login_{table.lower()}", (email,))
+            row = cursor.fetchone()
 
-            if stored_password == password:
-                print("Login successful!")
-                return user_id
+        if row is None:
+            # Spend the same hashing time so unknown emails are not detectable
+            self.hasher.verify(password, None)
+            return None
 
-            print("Incorrect password.")
+        user_id, stored_password = row
+        # Blocks this thread while PBKDF2 runs; the shared pool caps how
+        # many logins hash at once
+        matches, needs_rehash = self.hasher.verify(password, stored_password)
+        if not matches:
             return None
-        except Error as e:
-            print(f"Database Error: {e}")
-            return None
\ No newline at end of file
+
+        if needs_rehash:
+            # Upgrade legacy plaintext (or weaker) hashes on successful login
+            update = queries.UPDATE_PASSWORD.format(table_lower=table.lower(), table=table)
+            with self.db.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(update, (self.hasher.hash(password), user_id))
+                conn.commit()
+        return user_id